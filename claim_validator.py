@@ -0,0 +1,257 @@
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from search_index import ICD10_SYSTEM, CPT_SYSTEM, iter_icd10_entries, iter_cpt_entries, cpt_from_records
+
+OK = "ok"
+UNKNOWN_CODE = "unknown_code"
+WRONG_SYSTEM = "wrong_system"
+DELETED_CODE = "deleted_code"
+CATEGORY_MISMATCH = "category_mismatch"
+MALFORMED_LINE = "malformed_line"
+
+# Accepted column / key names for each field of a claim line
+DIAGNOSIS_FIELDS = ("icd10", "icd10_code", "diagnosis", "diagnosis_code", "dx")
+PROCEDURE_FIELDS = ("cpt", "cpt_code", "procedure", "procedure_code", "px")
+DIAGNOSIS_CATEGORY_FIELDS = ("icd10_category", "diagnosis_category")
+PROCEDURE_CATEGORY_FIELDS = ("cpt_category", "procedure_category")
+
+CHUNK_LINES = 50000
+SERIAL_SIZE_LIMIT = 8 * 1024 * 1024  # Smaller files are validated in-process
+
+
+def claim_key(code):
+    """Normalize a code as claims write it: upper case, no dot (E11.9 == e119)."""
+    return code.strip().upper().replace(".", "")
+
+
+def code_table(entries):
+    """{claim_key(code): category} for (code, category, description) entries."""
+    return {claim_key(code): category for code, category, _ in entries}
+
+
+class ClaimTables:
+    """Hashed lookup tables for one validation run.
+
+    `retired` holds codes that existed in a previous release but not in the
+    current one, so they can be reported as deleted rather than unknown.
+    """
+
+    def __init__(self, icd10_codes, cpt_codes, previous_icd10=None, previous_cpt=None):
+        self.tables = {
+            ICD10_SYSTEM: code_table(iter_icd10_entries(icd10_codes)),
+            CPT_SYSTEM: code_table(iter_cpt_entries(cpt_codes)),
+        }
+        self.retired = {ICD10_SYSTEM: frozenset(), CPT_SYSTEM: frozenset()}
+        if previous_icd10:
+            self.retired[ICD10_SYSTEM] = frozenset(code_table(iter_icd10_entries(previous_icd10))) - self.tables[ICD10_SYSTEM].keys()
+        if previous_cpt:
+            self.retired[CPT_SYSTEM] = frozenset(code_table(iter_cpt_entries(previous_cpt))) - self.tables[CPT_SYSTEM].keys()
+
+    def check(self, system, code, expected_category=None):
+        """Return (status, detail) for one code expected to be in system."""
+        key = claim_key(code)
+        category = self.tables[system].get(key)
+        if category is not None:
+            if expected_category and expected_category.strip() != category:
+                return CATEGORY_MISMATCH, f"{code} is in {category}"
+            return OK, None
+        other = CPT_SYSTEM if system == ICD10_SYSTEM else ICD10_SYSTEM
+        if key in self.tables[other]:
+            return WRONG_SYSTEM, f"{code} belongs to {other}"
+        if key in self.retired[system]:
+            return DELETED_CODE, f"{code} is no longer in {system}"
+        return UNKNOWN_CODE, f"{code} is not in {system}"
+
+
+def _first(record, fields):
+    for field in fields:
+        value = record.get(field)
+        if value and value.strip():
+            return value
+    return None
+
+
+def _text(value):
+    """Claim values as text: JSON numbers (a CPT code of 12345) count, nested values don't."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+
+def validate_record(tables, record):
+    """Return a list of (field, status, detail) problems for one claim line.
+
+    A line must carry both a diagnosis and a procedure code; a missing or
+    empty one is reported as MALFORMED_LINE.
+    """
+    record = {str(name).strip().lower(): _text(value) for name, value in record.items()}
+    problems = []
+    for system, field, fields, category_fields in (
+            (ICD10_SYSTEM, "diagnosis", DIAGNOSIS_FIELDS, DIAGNOSIS_CATEGORY_FIELDS),
+            (CPT_SYSTEM, "procedure", PROCEDURE_FIELDS, PROCEDURE_CATEGORY_FIELDS)):
+        code = _first(record, fields)
+        if code is None:
+            problems.append((field, MALFORMED_LINE, f"no {field} code"))
+            continue
+        status, detail = tables.check(system, code, _first(record, category_fields))
+        if status != OK:
+            problems.append((field, status, detail))
+    return problems
+
+
+# Worker processes get the tables once, through the pool initializer
+_worker_tables = None
+
+def _init_worker(tables):
+    global _worker_tables
+    _worker_tables = tables
+
+
+def validate_chunk(items, file_format, header=None, tables=None):
+    """Validate [(line number, CSV row or JSONL line)]; returns [(line number, problems)] in order."""
+    tables = tables or _worker_tables
+    results = []
+    for line_number, item in items:
+        if file_format == "csv":
+            record = dict(zip(header, item))
+        else:
+            record = _parse_json_line(item)
+        if record is None:
+            results.append((line_number, [("line", MALFORMED_LINE, "not a JSON object")]))
+        else:
+            results.append((line_number, validate_record(tables, record)))
+    return results
+
+
+def _parse_json_line(line):
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def _numbered_rows(reader):
+    """Yield (first line number, row) for each non-blank CSV row; quoted fields may span lines."""
+    first_line = reader.line_num + 1
+    for row in reader:
+        if row:
+            yield first_line, row
+        first_line = reader.line_num + 1
+
+
+def _numbered_lines(file):
+    for line_number, line in enumerate(file, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def _read_chunks(items, chunk_lines):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_lines:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_file(path, tables, workers=None, chunk_lines=CHUNK_LINES):
+    """Yield (line number, problems) for every claim line in a CSV or JSONL file.
+
+    Rows are read in chunks. CSV goes through csv.reader, so a quoted field
+    may span lines; the reported number is the row's first line. Large files
+    are sharded across a process pool with at most two chunks per worker in
+    flight, so memory stays bounded.
+    """
+    file_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+    with open(path, "r", newline="" if file_format == "csv" else None, encoding="utf-8-sig") as file:
+        header = None
+        if file_format == "csv":
+            reader = csv.reader(file)
+            header = [column.strip().lower() for column in next(reader, [])]
+            items = _numbered_rows(reader)
+        else:
+            items = _numbered_lines(file)
+        chunks = _read_chunks(items, chunk_lines)
+
+        workers = workers if workers is not None else os.cpu_count() or 1
+        if workers <= 1 or os.path.getsize(path) < SERIAL_SIZE_LIMIT:
+            for chunk in chunks:
+                yield from validate_chunk(chunk, file_format, header, tables)
+            return
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(tables,)) as pool:
+            pending = []
+            for chunk in chunks:
+                pending.append(pool.submit(validate_chunk, chunk, file_format, header))
+                if len(pending) >= workers * 2:
+                    yield from pending.pop(0).result()
+            for future in pending:
+                yield from future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate claim lines (ICD-10 diagnosis + CPT procedure) in bulk.")
+    parser.add_argument("path", help="CSV with a header row, or JSONL")
+    parser.add_argument("--output", default="-", help="Per-line results as JSONL (- for stdout)")
+    parser.add_argument("--problems-only", action="store_true", help="Only write lines with problems")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--previous-icd10", help="ICD-10 JSON file of the previous release, to report deleted codes")
+    parser.add_argument("--previous-cpt", help="CPT JSON file of the previous release, to report deleted codes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+
+    import explorer_core
+    try:
+        explorer_core.load_data()
+    except explorer_core.ConfigError as e:
+        parser.error(str(e))
+    previous_icd10 = previous_cpt = None
+    if args.previous_icd10:
+        with open(args.previous_icd10, "r") as file:
+            previous_icd10 = json.load(file)
+    if args.previous_cpt:
+        with open(args.previous_cpt, "r") as file:
+            previous_cpt = cpt_from_records(json.load(file))
+    tables = ClaimTables(explorer_core.ICD10_CODES, explorer_core.CPT_CODES, previous_icd10, previous_cpt)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    counts = Counter()
+    lines = 0
+    started = time.perf_counter()
+    try:
+        for line_number, problems in validate_file(args.path, tables, args.workers):
+            lines += 1
+            counts.update(status for _, status, _ in problems)
+            if not problems:
+                counts[OK] += 1
+                if args.problems_only:
+                    continue
+            output.write(json.dumps({
+                "line": line_number,
+                "status": problems[0][1] if problems else OK,
+                "problems": [{"field": field, "status": status, "detail": detail} for field, status, detail in problems],
+            }) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+    rate = lines / elapsed if elapsed else 0
+    summary = ", ".join(f"{status}: {count}" for status, count in counts.most_common())
+    print(f"Validated {lines} lines in {elapsed:.2f}s ({rate:,.0f} lines/sec). {summary}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Load, search, tree and save benchmarks on synthetic ICD-10/CPT code sets.
+
+Each size gets its own generated data directory and config. Start-up is
+measured in fresh interpreters (as the explorer starts), everything else in
+one process that has loaded the data. Times are taken without tracemalloc;
+each benchmark then runs once more under tracemalloc for its peak memory.
+
+    python code_benchmark.py --sizes 1000 10000 --save benchmark_baseline.json
+    python code_benchmark.py --sizes 1000 10000 --compare benchmark_baseline.json
+    python code_benchmark.py --sizes 1000000 --rounds 1 --load-rounds 1
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+
+from code_import import CodeClassifier
+from search_index import CPT_SYSTEM, cpt_to_records
+
+SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_SIZES = SIZES[:3]  # A 1M run takes ~15 minutes and over 1 GB of memory
+DEFAULT_ROUNDS = 5
+DEFAULT_LOAD_ROUNDS = 3
+REGRESSION_THRESHOLD = 0.2  # Median slower by more than this fraction
+CPT_SHARE = 0.2
+SEED = 1234
+
+ICD10_CHAPTERS = (
+    ("A00", "B99", "Infectious and Parasitic Diseases"), ("C00", "D49", "Neoplasms"),
+    ("D50", "D89", "Diseases of the Blood and Immune Mechanism"), ("E00", "E89", "Endocrine, Nutritional and Metabolic Diseases"),
+    ("F01", "F99", "Mental and Behavioral Disorders"), ("G00", "G99", "Diseases of the Nervous System"),
+    ("H00", "H59", "Diseases of the Eye and Adnexa"), ("H60", "H95", "Diseases of the Ear and Mastoid Process"),
+    ("I00", "I99", "Diseases of the Circulatory System"), ("J00", "J99", "Diseases of the Respiratory System"),
+    ("K00", "K95", "Diseases of the Digestive System"), ("L00", "L99", "Diseases of the Skin and Subcutaneous Tissue"),
+    ("M00", "M99", "Diseases of the Musculoskeletal System"), ("N00", "N99", "Diseases of the Genitourinary System"),
+    ("O00", "O99", "Pregnancy, Childbirth and the Puerperium"), ("P00", "P96", "Conditions Originating in the Perinatal Period"),
+    ("Q00", "Q99", "Congenital Malformations"), ("R00", "R99", "Symptoms, Signs and Abnormal Findings"),
+    ("S00", "T98", "Injury, Poisoning and External Causes"), ("V00", "Y99", "External Causes of Morbidity"),
+    ("Z00", "Z99", "Factors Influencing Health Status"),
+)
+DESCRIPTION_WORDS = (
+    "acute", "chronic", "unspecified", "left", "right", "bilateral", "primary", "secondary", "malignant", "benign",
+    "neoplasm", "fracture", "infection", "disorder", "syndrome", "deficiency", "anemia", "diabetes", "hypertension",
+    "pneumonia", "asthma", "femur", "tibia", "lung", "kidney", "liver", "heart", "artery", "vein", "skin", "eye", "ear",
+    "with", "without", "complication", "initial", "subsequent", "encounter", "sequela", "type", "stage", "mild",
+    "moderate", "severe", "recurrent", "episode", "obstruction", "hemorrhage", "ulcer", "lesion", "injury", "poisoning",
+    "procedure", "office", "visit", "patient", "minutes", "repair", "excision", "imaging", "contrast", "panel",
+)
+# Queries typed one character at a time (as the search box sends them), then fuzzy ones
+TYPED_QUERIES = ("diabetes", "fracture femur", "C34", "9920", "chronic kidney")
+FUZZY_QUERIES = ("diabetis", "pnuemonia", "fractur femr")
+
+
+def icd10_code_space(rng):
+    """Every ICD-10-shaped code, shallow ones first, shuffled within each depth."""
+    categories = [f"{letter}{number:02d}" for letter in "ABCDEFGHIJKLMNOPQRSTVWXYZ" for number in range(100)
+                  if any(start <= f"{letter}{number:02d}" <= end for start, end, _ in ICD10_CHAPTERS)]
+    for digits in range(4):
+        level = [category if not digits else f"{category}.{suffix:0{digits}d}"
+                 for category in categories for suffix in range(10 ** digits)]
+        rng.shuffle(level)
+        yield from level
+
+
+def cpt_code_space(rng):
+    codes = [f"{number:05d}" for number in range(100, 99608)]
+    codes += [f"{number:04d}{suffix}" for suffix in "FT" for number in range(10000)]
+    rng.shuffle(codes)
+    return codes
+
+
+def description(rng):
+    return " ".join(rng.sample(DESCRIPTION_WORDS, rng.randint(3, 7))).capitalize()
+
+
+def generate_code_sets(size, seed=SEED):
+    """Return (icd10_codes, cpt_codes) with size codes in total, about CPT_SHARE of them CPT."""
+    rng = random.Random(seed)
+    classifier = CodeClassifier(CPT_SYSTEM, ())
+    cpt_codes = {}
+    cpt_wanted = int(size * CPT_SHARE)
+    for code in cpt_code_space(rng):
+        if cpt_wanted <= 0:
+            break
+        category = classifier.classify(code)
+        if category is not None:
+            cpt_codes.setdefault(category, {})[code] = description(rng)
+            cpt_wanted -= 1
+
+    labels = {start: f"{title} ({start}–{end})" for start, end, title in ICD10_CHAPTERS}
+    starts = sorted(labels)
+    icd10_codes = {labels[start]: {} for start in starts}
+    icd10_wanted = size - sum(len(codes) for codes in cpt_codes.values())
+    for code in icd10_code_space(rng):
+        if icd10_wanted <= 0:
+            break
+        start = max(start for start in starts if start <= code[:3])
+        icd10_codes[labels[start]][code] = description(rng)
+        icd10_wanted -= 1
+    for category_codes in icd10_codes.values():
+        ordered = sorted(category_codes.items())
+        category_codes.clear()
+        category_codes.update(ordered)
+    return icd10_codes, cpt_codes
+
+
+def write_data_dir(directory, size):
+    """Write the code files, an empty user database and a config.json for one size."""
+    icd10_codes, cpt_codes = generate_code_sets(size)
+    files = {name: os.path.join(directory, name) for name in ("icd10_codes.json", "cpt_codes.json", "user_db.json")}
+    with open(files["icd10_codes.json"], "w") as file:
+        json.dump(icd10_codes, file)
+    with open(files["cpt_codes.json"], "w") as file:
+        json.dump(cpt_to_records(cpt_codes), file)
+    with open(files["user_db.json"], "w") as file:
+        json.dump({}, file)
+    config = {
+        "ICD10_FILE": files["icd10_codes.json"],
+        "CPT_FILE": files["cpt_codes.json"],
+        "USER_DB_FILE": files["user_db.json"],
+        "SNAPSHOT_FILE": os.path.join(directory, "codes.snapshot"),
+        "SETTINGS_FILE": os.path.join(directory, "settings.json"),
+        "SETTINGS_DIR": directory,
+        "DEFAULT_SETTINGS": {},
+    }
+    with open(os.path.join(directory, "config.json"), "w") as file:
+        json.dump(config, file)
+    return sum(len(codes) for codes in icd10_codes.values()), sum(len(codes) for codes in cpt_codes.values())
+
+
+def stats(times, peak=None):
+    """pytest-benchmark style summary of a list of durations in seconds."""
+    return {
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.fmean(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "median": statistics.median(times),
+        "rounds": len(times),
+        "peak_mb": peak,
+    }
+
+
+def traced_peak(fn):
+    """Run fn once under tracemalloc and return the peak traced memory in MB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+class HeadlessTree:
+    """The parts of ttk.Treeview that LazyCodeTree uses, for machines without a display."""
+
+    def __init__(self):
+        self.children = {"": []}
+        self.parents = {}
+        self.items = {}
+        self.next_id = 0
+        self.focused = ""
+
+    def bind(self, sequence, callback, add=None):
+        pass
+
+    def insert(self, parent, index, text="", open=False, **options):
+        self.next_id += 1
+        item = f"I{self.next_id:03X}"
+        self.items[item] = {"text": text, **options}
+        self.children[item] = []
+        self.children[parent].append(item)
+        self.parents[item] = parent
+        return item
+
+    def delete(self, *items):
+        for item in items:
+            for child in list(self.children.get(item, ())):
+                self.delete(child)
+            self.children[self.parents.pop(item)].remove(item)
+            del self.children[item]
+            del self.items[item]
+
+    def get_children(self, item=""):
+        return tuple(self.children[item])
+
+    def item(self, item, **options):
+        self.items[item].update(options)
+
+    def focus(self, item=None):
+        if item is None:
+            return self.focused
+        self.focused = item
+
+
+def make_tree():
+    """A withdrawn Tk Treeview when there is a display, else a HeadlessTree."""
+    try:
+        import tkinter
+        from tkinter import ttk
+        root = tkinter.Tk()
+        root.withdraw()
+        return ttk.Treeview(root), "tk"
+    except Exception:
+        return HeadlessTree(), "headless"
+
+
+def run_load():
+    """Child process: time load_data() as the explorer calls it at start-up."""
+    import explorer_core
+    started = time.perf_counter()
+    explorer_core.load_data()
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed}
+
+
+def run_operations(rounds):
+    """Child process: search, tree and save benchmarks over the loaded data."""
+    import explorer_core
+    from explorer_core import ICD10_CODES, CPT_CODES, SEARCH_ENGINE, ICD10_SYSTEM
+    from search_engine import IncrementalSearch
+    from tree_views import LazyCodeTree
+
+    explorer_core.load_data()
+    tree, tree_kind = make_tree()
+    code_tree = LazyCodeTree(tree)
+    largest = max(ICD10_CODES, key=lambda category: len(ICD10_CODES[category]))
+    session = IncrementalSearch(SEARCH_ENGINE)
+    sample_category = next(iter(ICD10_CODES))
+
+    def typed_search():
+        for query in TYPED_QUERIES:
+            session.reset()
+            for end in range(1, len(query) + 1):
+                session.search(query[:end], limit=100)
+
+    def fuzzy_search():
+        for query in FUZZY_QUERIES:
+            session.search(query, limit=100, fuzzy=True)
+
+    def expand_largest():
+        code_tree.populate(ICD10_CODES)
+        code_tree.load_children(code_tree.category_items[largest])
+
+    def store_and_remove():
+        explorer_core.store_icd10_code(sample_category, "U99.9", "Benchmark code")
+        explorer_core.remove_code(ICD10_SYSTEM, "U99.9")
+
+    benchmarks = (
+        ("search.typed", typed_search),
+        ("search.fuzzy", fuzzy_search),
+        ("search.engine", lambda: [SEARCH_ENGINE.search(query) for query in TYPED_QUERIES]),
+        ("tree.populate", lambda: code_tree.populate(ICD10_CODES)),
+        ("tree.expand_largest", expand_largest),
+        ("save.icd10", lambda: explorer_core.save_icd10_codes(ICD10_CODES)),
+        ("save.cpt", lambda: explorer_core.save_cpt_codes(CPT_CODES)),
+        ("save.single_change", store_and_remove),
+    )
+    results = {}
+    for name, fn in benchmarks:
+        fn()  # Warm-up: lazy indexes, first-use allocations
+        times = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+        results[name] = stats(times, traced_peak(fn))
+    return {"benchmarks": results, "tree": tree_kind}
+
+
+def run_child(args):
+    if args.child == "load":
+        if args.trace:
+            result = {"peak_mb": traced_peak(run_load)}
+        else:
+            result = run_load()
+    else:
+        result = run_operations(args.rounds)
+    json.dump(result, sys.stdout)
+
+
+def spawn(directory, phase, rounds=1, trace=False):
+    """Run one child phase with HOME pointing at the size's data directory."""
+    command = [sys.executable, os.path.abspath(__file__), "--child", phase, "--rounds", str(rounds)]
+    if trace:
+        command.append("--trace")
+    env = dict(os.environ, HOME=directory)
+    completed = subprocess.run(command, cwd=directory, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def benchmark_size(size, rounds, load_rounds, keep=False):
+    directory = tempfile.mkdtemp(prefix=f"icd10_bench_{size}_")
+    try:
+        started = time.perf_counter()
+        icd10_count, cpt_count = write_data_dir(directory, size)
+        print(f"{size:,} codes ({icd10_count:,} ICD-10, {cpt_count:,} CPT) generated in {time.perf_counter() - started:.1f}s in {directory}", file=sys.stderr)
+        snapshot = os.path.join(directory, "codes.snapshot")
+
+        def cold():
+            if os.path.exists(snapshot):
+                os.remove(snapshot)
+            return spawn(directory, "load")["seconds"]
+
+        benchmarks = {}
+        # First start parses the JSON files and writes the snapshot; later starts read the snapshot
+        cold_times = [cold() for _ in range(load_rounds)]
+        os.remove(snapshot)
+        benchmarks["load.json"] = stats(cold_times, spawn(directory, "load", trace=True)["peak_mb"])
+        warm_times = [spawn(directory, "load")["seconds"] for _ in range(load_rounds)]
+        benchmarks["load.snapshot"] = stats(warm_times, spawn(directory, "load", trace=True)["peak_mb"])
+        operations = spawn(directory, "operations", rounds)
+        benchmarks.update(operations["benchmarks"])
+        return {"size": size, "icd10": icd10_count, "cpt": cpt_count, "tree": operations["tree"], "benchmarks": benchmarks}
+    finally:
+        if not keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_table(result):
+    print(f"\n{result['size']:,} codes ({result['tree']} tree)")
+    print(f"{'Name':<22}{'Min ms':>11}{'Max ms':>11}{'Mean ms':>11}{'StdDev ms':>11}{'Median ms':>11}{'Rounds':>8}{'Peak MB':>10}")
+    for name, summary in result["benchmarks"].items():
+        times = "".join(f"{summary[key] * 1000:>11.2f}" for key in ("min", "max", "mean", "stddev", "median"))
+        peak = f"{summary['peak_mb']:>10.1f}" if summary["peak_mb"] is not None else f"{'-':>10}"
+        print(f"{name:<22}{times}{summary['rounds']:>8}{peak}")
+
+
+def compare(results, baseline, threshold):
+    """Print the median change against a saved baseline; return the regressed names."""
+    previous = {entry["size"]: entry["benchmarks"] for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result["size"])
+        if old is None:
+            continue
+        print(f"\n{result['size']:,} codes vs baseline")
+        print(f"{'Name':<22}{'Base ms':>11}{'Now ms':>11}{'Change':>10}")
+        for name, summary in result["benchmarks"].items():
+            if name not in old:
+                continue
+            before, after = old[name]["median"], summary["median"]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{result['size']}:{name}")
+            print(f"{name:<22}{before * 1000:>11.2f}{after * 1000:>11.2f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load, search, tree population and saves on synthetic code sets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help=f"Total codes per data set (default {' '.join(map(str, DEFAULT_SIZES))}; also {SIZES[-1]})")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed rounds per in-process benchmark")
+    parser.add_argument("--load-rounds", type=int, default=DEFAULT_LOAD_ROUNDS, help="Fresh interpreters per start-up benchmark")
+    parser.add_argument("--save", help="Write the results to this JSON baseline")
+    parser.add_argument("--compare", help="Compare medians with this JSON baseline; exits 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Median slowdown counted as a regression")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated data directories")
+    parser.add_argument("--child", choices=("load", "operations"), help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    results = []
+    for size in args.sizes:
+        result = benchmark_size(size, args.rounds, args.load_rounds, args.keep)
+        print_table(result)
+        results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nWrote {args.save}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
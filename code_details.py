@@ -0,0 +1,121 @@
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+
+from search_index import ICD10_SYSTEM, CPT_SYSTEM
+
+CodeDetail = namedtuple("CodeDetail", ["system", "code", "category", "description", "parents", "related", "tips"])
+
+DETAIL_CACHE_SIZE = 512
+RELATED_LIMIT = 10
+
+DOCUMENTATION_TIPS = {
+    ICD10_SYSTEM: (
+        "Document diagnosis with specificity.",
+        "Include relevant medical history.",
+        "Link diagnosis to treatment provided.",
+    ),
+    CPT_SYSTEM: (
+        "Document the procedure performed and why it was medically necessary.",
+        "Record time, approach and any modifiers that apply.",
+        "Link the procedure to a supporting diagnosis.",
+    ),
+}
+CPT_SUFFIX_TIPS = {
+    "F": "Category II code: reported for performance measurement, not separately paid.",
+    "T": "Category III code: emerging technology; check payer coverage before billing.",
+}
+
+
+def build_code_detail(system, code, codes, locator, hierarchy):
+    """Build the CodeDetail for code in codes ({category: {code: description}}).
+
+    ICD-10 parents are its chapter, block and 3-character category from the
+    CodeHierarchy, and related codes are its subcodes and then its siblings
+    (or its neighbours in the block when it has neither). CPT parents are just
+    the category, and related codes are its neighbours in that category, in
+    code order. Returns None for an unknown code.
+    """
+    category = locator.category_of(system, code)
+    if category is None:
+        return None
+    category_codes = codes[category]
+    tips = list(DOCUMENTATION_TIPS[system])
+    if system == ICD10_SYSTEM:
+        parents = hierarchy.path(code)[:-1]
+        children = hierarchy.children(code)
+        if children:
+            tips.insert(0, f"{code} has {len(children)} more specific codes; report the most specific one that applies.")
+        related = children + [sibling for sibling in hierarchy.children(code[:3]) if sibling != code and sibling not in children]
+        ranges = hierarchy.ranges_of(code)
+        if not related and ranges:
+            # A bare 3-character code: show the codes around it in its block
+            related = hierarchy.neighbours(code, ranges[-1].start, ranges[-1].end, RELATED_LIMIT // 2)
+    else:
+        parents = [category]
+        suffix_tip = CPT_SUFFIX_TIPS.get(code[-1:].upper())
+        if suffix_tip is not None:
+            tips.insert(0, suffix_tip)
+        related = _neighbours(locator.codes_in_category(system, category), code)
+
+    described = []
+    for related_code in related[:RELATED_LIMIT]:
+        related_category = locator.category_of(system, related_code)
+        if related_category is not None:
+            described.append((related_code, codes[related_category][related_code]))
+    return CodeDetail(system, code, category, category_codes[code], parents, described, tuple(tips))
+
+
+def _neighbours(codes, code):
+    """About RELATED_LIMIT codes around code in the sorted list codes, split before and after."""
+    position = bisect_left(codes, code)
+    if position == len(codes) or codes[position] != code:
+        return []
+    half = RELATED_LIMIT // 2
+    return codes[max(0, position - half):position] + codes[position + 1:position + 1 + half]
+
+
+def format_code_detail(detail):
+    """The text shown in the code details dialog."""
+    lines = [f"{detail.system} Code: {detail.code}", f"Description: {detail.description}"]
+    if detail.parents:
+        lines.append(f"Under: {' > '.join(detail.parents)}")
+    lines.append("")
+    lines.append("Documentation Tips:")
+    lines.extend(f"- {tip}" for tip in detail.tips)
+    if detail.related:
+        lines.append("")
+        lines.append("Related Codes:")
+        lines.extend(f"- {code}: {description}" for code, description in detail.related)
+    return "\n".join(lines)
+
+
+class CodeDetailCache:
+    """LRU cache of CodeDetail records keyed by (system, code).
+
+    Entries are tagged with the search index version they were built from,
+    like code_server.ResponseCache, so any edit drops the whole cache.
+    """
+
+    def __init__(self, size=DETAIL_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.version = None
+
+    def get(self, key, version, build):
+        """Return the cached record for key, calling build() on a miss."""
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+        detail = self.entries.get(key)
+        if detail is not None:
+            self.entries.move_to_end(key)
+            return detail
+        detail = build()
+        if detail is not None:
+            self.entries[key] = detail
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return detail
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,117 @@
+import sys
+import csv
+import json
+from contextlib import nullcontext
+
+from search_index import SearchIndex, ICD10_SYSTEM, CPT_SYSTEM, normalize_code
+
+EXPORT_COLUMNS = ("system", "category", "code", "description")
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+PARQUET_ROW_GROUP = 10000
+
+
+def parse_code_range(text):
+    """Parse "A00-B99" into ("A00", "B99"); either end may be left out."""
+    if not text:
+        return None
+    start, _, end = text.partition("-")
+    return normalize_code(start).replace(".", ""), normalize_code(end).replace(".", "")
+
+
+def in_code_range(code, code_range):
+    """Inclusive range check; the end matches as a prefix, so A00-B99 includes B99.8."""
+    start, end = code_range
+    code = normalize_code(code).replace(".", "")
+    if start and code < start:
+        return False
+    return not end or code[:len(end)] <= end
+
+
+def iter_export_rows(icd10_codes, cpt_codes, systems=None, categories=None, code_range=None, query=None, index=None, lock=None):
+    """Yield (system, category, code, description) rows in file order, filtered.
+
+    A query keeps codes the search index matches (code prefix or description
+    words); pass the app's index to avoid building one. lock, if given, is
+    held only while one category is copied, so the rows can be written from
+    another thread while the code sets are being edited.
+    """
+    lock = lock or nullcontext()
+    systems = systems or (ICD10_SYSTEM, CPT_SYSTEM)
+    matches = None
+    if query:
+        if index is None:
+            index = SearchIndex()
+            index.rebuild(icd10_codes if ICD10_SYSTEM in systems else {}, cpt_codes if CPT_SYSTEM in systems else {})
+        with index.lock:
+            matches = index.search(query)
+
+    for system in systems:
+        codes = icd10_codes if system == ICD10_SYSTEM else cpt_codes
+        with lock:
+            names = list(codes)
+        for category in names:
+            if categories and category not in categories:
+                continue
+            with lock:
+                category_codes = list(codes.get(category, {}).items())
+            for code, description in category_codes:
+                if code_range and not in_code_range(code, code_range):
+                    continue
+                if matches is not None and (system, code) not in matches:
+                    continue
+                yield system, category, code, description
+
+
+def write_csv(rows, file):
+    writer = csv.writer(file)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, file):
+    count = 0
+    for row in rows:
+        file.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+        count += 1
+    return count
+
+
+def write_parquet(rows, path, row_group=PARQUET_ROW_GROUP):
+    """Write rows as Parquet, one row group at a time. Needs pyarrow."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow)")
+
+    schema = pyarrow.schema([(column, pyarrow.string()) for column in EXPORT_COLUMNS])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= row_group:
+                writer.write_table(pyarrow.Table.from_pylist([dict(zip(EXPORT_COLUMNS, row)) for row in batch], schema))
+                count += len(batch)
+                batch = []
+        if batch or not count:
+            writer.write_table(pyarrow.Table.from_pylist([dict(zip(EXPORT_COLUMNS, row)) for row in batch], schema))
+            count += len(batch)
+    return count
+
+
+def export_codes(rows, path, export_format):
+    """Stream rows to path ("-" for stdout) and return how many were written."""
+    if export_format == "parquet":
+        if path == "-":
+            raise ValueError("Parquet export needs an output file")
+        return write_parquet(rows, path)
+    writer = write_csv if export_format == "csv" else write_jsonl
+    if path == "-":
+        return writer(rows, sys.stdout)
+    with open(path, "w", newline="" if export_format == "csv" else None, encoding="utf-8") as file:
+        return writer(rows, file)
@@ -0,0 +1,157 @@
+import re
+from bisect import bisect_left, bisect_right, insort
+
+from search_index import iter_icd10_entries
+
+# "Neoplasms (C00–D49)" -> ("C00", "D49"); the data files use an en dash
+CATEGORY_RANGE_PATTERN = re.compile(r"\(([A-Z0-9]{3})\s*[–-]\s*([A-Z0-9]{3})\)\s*$")
+
+
+def parse_category_range(label):
+    """Return the (start, end) code range in a category label, or None."""
+    match = CATEGORY_RANGE_PATTERN.search(label)
+    return (match.group(1), match.group(2)) if match else None
+
+
+def code_key(code):
+    """Sort key for an ICD-10 code: upper case without the dot (C34.1 -> C341)."""
+    return code.strip().upper().replace(".", "")
+
+
+class RangeNode:
+    """A chapter or block: a labelled, inclusive range of 3-character categories."""
+
+    __slots__ = ("start", "end", "label", "children", "child_starts")
+
+    def __init__(self, start, end, label):
+        self.start = start
+        self.end = end
+        self.label = label
+        self.children = []
+        self.child_starts = []
+
+    def covers(self, category):
+        return self.start <= category <= self.end
+
+
+class CodeHierarchy:
+    """ICD-10 chapter -> block -> category -> subcode model over sorted arrays.
+
+    Chapters and blocks are the ranges parsed from the category labels; a range
+    inside another range becomes its block. Codes are kept in one sorted array
+    of (code_key(), code) pairs, so the chapter of a code and every code in a
+    range are both found by bisection instead of scanning the categories.
+    Entries are per stored code: "A00.0" and "A000" share a key but are
+    added and removed separately.
+    """
+
+    def __init__(self, icd10_codes=None):
+        self.chapters = []
+        self.chapter_starts = []
+        self.keys = []  # sorted (code_key, code) pairs
+        self.codes = {}  # code as stored -> code_key
+        if icd10_codes is not None:
+            self.rebuild(icd10_codes)
+
+    def rebuild(self, icd10_codes):
+        self.rebuild_ranges(icd10_codes)
+        self.codes = {code: code_key(code) for code, _, _ in iter_icd10_entries(icd10_codes)}
+        self.keys = sorted((key, code) for code, key in self.codes.items())
+
+    def rebuild_ranges(self, labels):
+        """Re-parse chapters and blocks from category labels (after a category is added or removed)."""
+        nodes = []
+        for label in labels:
+            parsed = parse_category_range(label)
+            if parsed is not None:
+                nodes.append(RangeNode(parsed[0], parsed[1], label))
+        # Outer ranges sort before the ranges they contain
+        nodes.sort(key=lambda node: node.end, reverse=True)
+        nodes.sort(key=lambda node: node.start)
+        roots = []
+        stack = []
+        for node in nodes:
+            while stack and not (stack[-1].covers(node.start) and stack[-1].covers(node.end)):
+                stack.pop()
+            (stack[-1].children if stack else roots).append(node)
+            stack.append(node)
+        for node in nodes:
+            node.child_starts = [child.start for child in node.children]
+        self.chapters = roots
+        self.chapter_starts = [node.start for node in roots]
+
+    def add_code(self, code):
+        if code not in self.codes:
+            key = self.codes[code] = code_key(code)
+            insort(self.keys, (key, code))
+
+    def remove_code(self, code):
+        key = self.codes.pop(code, None)
+        if key is not None:
+            del self.keys[bisect_left(self.keys, (key, code))]
+
+    def stored_code(self, key):
+        """The first stored code with this code_key(), or None."""
+        position = bisect_left(self.keys, (key,))
+        if position < len(self.keys) and self.keys[position][0] == key:
+            return self.keys[position][1]
+        return None
+
+    def ranges_of(self, code):
+        """Return the chapter and block RangeNodes covering code, outermost first."""
+        category = code_key(code)[:3]
+        path = []
+        nodes, starts = self.chapters, self.chapter_starts
+        while nodes:
+            position = bisect_right(starts, category) - 1
+            if position < 0 or not nodes[position].covers(category):
+                break
+            node = nodes[position]
+            path.append(node)
+            nodes, starts = node.children, node.child_starts
+        return path
+
+    def chapter_of(self, code):
+        """Return the chapter label for code, or None if no chapter covers it."""
+        ranges = self.ranges_of(code)
+        return ranges[0].label if ranges else None
+
+    def block_of(self, code):
+        """Return the innermost range label for code (the chapter if it has no blocks)."""
+        ranges = self.ranges_of(code)
+        return ranges[-1].label if ranges else None
+
+    def path(self, code):
+        """[chapter, block..., category, code] for code; the category is its first three characters."""
+        key = code_key(code)
+        path = [node.label for node in self.ranges_of(code)]
+        category = self.stored_code(key[:3]) or key[:3]
+        path.append(category)
+        if key != code_key(category):
+            path.append(code if code in self.codes else self.stored_code(key) or code)
+        return path
+
+    def codes_in_range(self, start, end):
+        """Every known code from start to end inclusive; end also matches as a prefix (D89 includes D89.9)."""
+        low = bisect_left(self.keys, (code_key(start),)) if start else 0
+        high = bisect_left(self.keys, (code_key(end) + "\uffff",)) if end else len(self.keys)
+        return [code for _, code in self.keys[low:high]]
+
+    def neighbours(self, code, start, end, count):
+        """Up to count known codes on each side of code, within start..end as in codes_in_range()."""
+        key = self.codes.get(code)
+        if key is None:
+            return []
+        position = bisect_left(self.keys, (key, code))
+        low = bisect_left(self.keys, (code_key(start),))
+        high = bisect_left(self.keys, (code_key(end) + "\uffff",))
+        before = self.keys[max(low, position - count):position]
+        after = self.keys[position + 1:min(high, position + 1 + count)]
+        return [neighbour for _, neighbour in before + after]
+
+    def children(self, code):
+        """The known subcodes under a category or code (C34 -> C34.0, C34.1, ...)."""
+        key = code_key(code)
+        low = bisect_left(self.keys, (key + "\x00",))  # After the code itself
+        high = bisect_left(self.keys, (key + "\uffff",))
+        return [child for _, child in self.keys[low:high]]
@@ -0,0 +1,211 @@
+import re
+import os
+import csv
+import logging
+import argparse
+from bisect import bisect_right
+from xml.etree import ElementTree
+
+from search_index import ICD10_SYSTEM, CPT_SYSTEM
+from code_hierarchy import CodeHierarchy
+
+# CPT section ranges. Category II and III codes are told apart by their suffix.
+CPT_SECTIONS = (
+    ("00100", "01999", "Anesthesia"),
+    ("10004", "69990", "Surgery"),
+    ("70010", "79999", "Radiology"),
+    ("80047", "89398", "Pathology and Laboratory"),
+    ("90281", "99199", "Medicine"),
+    ("99202", "99499", "Evaluation and Management (E/M)"),
+    ("99500", "99607", "Medicine"),
+)
+CPT_SUFFIX_CATEGORIES = {"F": "Category II Codes", "T": "Category III Codes"}
+
+# CMS order file: order number, code, billable flag, short and long description
+ORDER_LINE_PATTERN = re.compile(r"^\d{5} (\S+)\s+([01]) (.{60}) (.*)$")
+CODE_LINE_PATTERN = re.compile(r"^(\S+)\s+(.*)$")
+
+CSV_CODE_COLUMNS = ("code", "cpt code", "icd-10-cm code", "hcpcs")
+CSV_DESCRIPTION_COLUMNS = ("description", "long description", "long_description", "descriptor", "short description")
+
+
+def format_icd10_code(code):
+    """CMS release files drop the dot: A000 -> A00.0."""
+    code = code.strip().upper().replace(".", "")
+    return code if len(code) <= 3 else f"{code[:3]}.{code[3:]}"
+
+
+def read_fixed_width(path, billable_only=False):
+    """Yield (code, description) from a CMS icd10cm_codes or icd10cm_order text file."""
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+            match = ORDER_LINE_PATTERN.match(line)
+            if match:
+                if billable_only and match.group(2) != "1":
+                    continue
+                yield match.group(1), match.group(4).strip() or match.group(3).strip()
+                continue
+            match = CODE_LINE_PATTERN.match(line)
+            if match:
+                yield match.group(1), match.group(2).strip()
+
+
+def read_csv(path):
+    """Yield (code, description) from a CSV file with a code and a description column."""
+    with open(path, "r", newline="", encoding="utf-8-sig", errors="replace") as file:
+        reader = csv.reader(file)
+        first_row = next(reader, [])
+        header = [column.strip().lower() for column in first_row]
+        code_column = next((header.index(name) for name in CSV_CODE_COLUMNS if name in header), None)
+        description_column = next((header.index(name) for name in CSV_DESCRIPTION_COLUMNS if name in header), None)
+        if code_column is None or description_column is None:
+            # No recognisable header: the first row is data in code, description order
+            code_column, description_column = 0, 1
+            if len(first_row) > 1 and first_row[0].strip():
+                yield first_row[0].strip(), first_row[1].strip()
+        for row in reader:
+            if len(row) > max(code_column, description_column) and row[code_column].strip():
+                yield row[code_column].strip(), row[description_column].strip()
+
+
+def read_xml(path):
+    """Yield (code, description) for every <diag> in a CMS tabular XML file.
+
+    The file is parsed incrementally and each chapter is cleared once it has
+    been read, so memory stays bounded on the full release.
+    """
+    for event, element in ElementTree.iterparse(path, events=("end",)):
+        if element.tag == "diag":
+            code = element.findtext("name")
+            description = element.findtext("desc")
+            if code and description:
+                yield code.strip(), description.strip()
+        elif element.tag == "chapter":
+            element.clear()
+
+
+def read_code_file(path, billable_only=False):
+    """Pick a reader by file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_csv(path)
+    if extension == ".xml":
+        return read_xml(path)
+    return read_fixed_width(path, billable_only)
+
+
+class CodeClassifier:
+    """Assigns a code to one of the existing categories by code range.
+
+    ICD-10 codes go to the innermost chapter or block of a CodeHierarchy built
+    from the category labels, e.g. "Neoplasms (C00–D49)". CPT uses the fixed
+    CPT_SECTIONS table. Both are a bisect over sorted range starts.
+    """
+
+    def __init__(self, system, categories):
+        self.system = system
+        if system == ICD10_SYSTEM:
+            self.hierarchy = CodeHierarchy()
+            self.hierarchy.rebuild_ranges(categories)
+        else:
+            self.ranges = sorted(CPT_SECTIONS)
+            self.starts = [start for start, _, _ in self.ranges]
+
+    def classify(self, code):
+        """Return the category for code, or None if no range covers it."""
+        if self.system == ICD10_SYSTEM:
+            return self.hierarchy.block_of(code)
+        code = code.strip().upper()
+        suffix_category = CPT_SUFFIX_CATEGORIES.get(code[-1:])
+        if suffix_category is not None:
+            return suffix_category
+        position = bisect_right(self.starts, code) - 1
+        if position < 0:
+            return None
+        start, end, category = self.ranges[position]
+        return category if code <= end else None
+
+
+class CodeMerger:
+    """Merges (code, description) pairs into codes ({category: {code: description}}), a batch at a time.
+
+    Codes that already exist are updated in their current category, under
+    the code as it is stored ("k29.4" matches an imported K294); new ones are
+    classified by range. added, updated and unclassified count the changes
+    across every merge() call.
+    """
+
+    def __init__(self, system, codes):
+        self.system = system
+        self.codes = codes
+        self.classifier = CodeClassifier(system, codes)
+        # normalized code -> (category, code as stored)
+        self.existing = {self.normalize(code): (category, code)
+                         for category, category_codes in codes.items() for code in category_codes}
+        self.added = self.updated = self.unclassified = 0
+
+    def normalize(self, code):
+        return format_icd10_code(code) if self.system == ICD10_SYSTEM else code.strip().upper()
+
+    def merge(self, entries):
+        codes = self.codes
+        for code, description in entries:
+            code = self.normalize(code)
+            category, stored_code = self.existing.get(code, (None, None))
+            if category is not None and stored_code in codes.get(category, ()):
+                if codes[category][stored_code] != description:
+                    codes[category][stored_code] = description
+                    self.updated += 1
+                continue
+            category = self.classifier.classify(code)
+            if category is None:
+                self.unclassified += 1
+                continue
+            codes.setdefault(category, {})[code] = description
+            self.existing[code] = (category, code)
+            self.added += 1
+
+    def counts(self):
+        """Return (added, updated, unclassified), logging the skipped codes."""
+        if self.unclassified:
+            logging.warning(f"Skipped {self.unclassified} {self.system} codes outside every category range")
+        return self.added, self.updated, self.unclassified
+
+
+def merge_codes(system, codes, entries):
+    """Merge (code, description) pairs into codes; returns (added, updated, unclassified) counts."""
+    merger = CodeMerger(system, codes)
+    merger.merge(entries)
+    return merger.counts()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a CMS ICD-10-CM or CPT release file into the configured code store.")
+    parser.add_argument("path", help="Fixed-width .txt, .csv or tabular .xml release file")
+    parser.add_argument("--system", choices=(ICD10_SYSTEM, CPT_SYSTEM), default=ICD10_SYSTEM)
+    parser.add_argument("--billable-only", action="store_true", help="Skip header (non-billable) rows of an order file")
+    args = parser.parse_args()
+
+    import explorer_core  # Imports this module, so not at the top
+    try:
+        explorer_core.load_data()
+    except explorer_core.ConfigError as e:
+        parser.error(str(e))
+    codes = explorer_core.code_set(args.system)
+    try:
+        with explorer_core.DATA_LOCK:
+            added, updated, unclassified = merge_codes(args.system, codes, read_code_file(args.path, args.billable_only))
+        if args.system == ICD10_SYSTEM:
+            explorer_core.save_icd10_codes(codes)
+        else:
+            explorer_core.save_cpt_codes(codes)
+    finally:
+        explorer_core.close_data()
+    print(f"{args.system}: {added} added, {updated} updated, {unclassified} skipped")
+
+
+if __name__ == "__main__":
+    main()
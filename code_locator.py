@@ -0,0 +1,55 @@
+from bisect import bisect_left, insort
+
+from search_index import ICD10_SYSTEM, CPT_SYSTEM, iter_icd10_entries, iter_cpt_entries
+
+
+class CodeLocator:
+    """Reverse index from (system, code) to the category that holds it.
+
+    Edits, deletes and duplicate checks look codes up here instead of
+    scanning every category. It also keeps each category's codes sorted, so
+    the code detail view finds a code's neighbours by bisection.
+    """
+
+    def __init__(self):
+        self.locations = {}
+        self.category_codes = {}  # (system, category) -> sorted codes
+
+    def rebuild(self, icd10_codes, cpt_codes):
+        self.locations = {}
+        self.category_codes = {}
+        self.rebuild_system(ICD10_SYSTEM, icd10_codes)
+        self.rebuild_system(CPT_SYSTEM, cpt_codes)
+
+    def rebuild_system(self, system, codes):
+        """Re-index one code system after a bulk change."""
+        for key in [key for key in self.locations if key[0] == system]:
+            del self.locations[key]
+        for key in [key for key in self.category_codes if key[0] == system]:
+            del self.category_codes[key]
+        entries = iter_icd10_entries(codes) if system == ICD10_SYSTEM else iter_cpt_entries(codes)
+        for code, category, _ in entries:
+            self.locations[(system, code)] = category
+            self.category_codes.setdefault((system, category), []).append(code)
+        for key, category_codes in self.category_codes.items():
+            if key[0] == system:
+                category_codes.sort()
+
+    def category_of(self, system, code):
+        """Return the category holding a code, or None if it is unknown."""
+        return self.locations.get((system, code))
+
+    def codes_in_category(self, system, category):
+        """The category's codes in sorted order (not a copy; don't change it)."""
+        return self.category_codes.get((system, category), [])
+
+    def add(self, system, code, category):
+        self.remove(system, code)
+        self.locations[(system, code)] = category
+        insort(self.category_codes.setdefault((system, category), []), code)
+
+    def remove(self, system, code):
+        category = self.locations.pop((system, code), None)
+        if category is not None:
+            category_codes = self.category_codes[(system, category)]
+            del category_codes[bisect_left(category_codes, code)]
@@ -0,0 +1,312 @@
+import sys
+import json
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+import explorer_core
+from explorer_core import SYSTEMS, SEARCH_INDEX, SEARCH_ENGINE
+from search_engine import DEFAULT_LIMIT
+from code_export import parse_code_range
+from perf_metrics import METRICS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8501
+CACHE_SIZE = 1024
+KEEP_ALIVE_TIMEOUT = 15  # seconds an idle connection is kept open
+MAX_HEADER_BYTES = 16384
+MAX_LIMIT = 500
+AUTOCOMPLETE_LIMIT = 10
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+
+class ResponseCache:
+    """LRU cache of encoded responses, keyed by request path and query.
+
+    Entries are tagged with the search index version they were built from.
+    Every mutator (and every save) bumps that version, so the first request
+    after a change drops the whole cache.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, version, entry):
+        if version != self.version:
+            return  # Data changed while the response was built
+        self.entries[key] = entry
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+def _systems(params):
+    systems = tuple(system for system in params.get("system", []) if system in SYSTEMS)
+    return systems or SYSTEMS
+
+
+def _limit(params, default):
+    try:
+        return max(1, min(int(params.get("limit", [default])[0]), MAX_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be a number")
+
+
+def handle_lookup(params):
+    codes = params.get("code")
+    if not codes:
+        raise ValueError("code is required")
+    return {"results": [
+        {"code": code, "matches": [dict(zip(("system", "category", "description"), match)) for match in found]}
+        for code, found in explorer_core.lookup_codes(codes, _systems(params))
+    ]}
+
+
+def handle_search(params):
+    query = params.get("q", [""])[0]
+    code_range = parse_code_range(params.get("range", [""])[0])
+    fuzzy = params.get("fuzzy", ["0"])[0].lower() in ("1", "true", "yes")
+    if code_range is not None:
+        results = explorer_core.search(query, _systems(params), _limit(params, DEFAULT_LIMIT), code_range, fuzzy)
+    else:
+        results = SEARCH_ENGINE.search(query, _systems(params), _limit(params, DEFAULT_LIMIT), fuzzy=fuzzy)
+    return {"query": query, "results": [result._asdict() for result in results]}
+
+
+def handle_autocomplete(params):
+    """Codes starting with the prefix, then description words completing it."""
+    prefix = params.get("prefix", [""])[0]
+    systems = _systems(params)
+    limit = _limit(params, AUTOCOMPLETE_LIMIT)
+    codes = []
+    terms = []
+    if prefix.strip():
+        with SEARCH_INDEX.lock:
+            keys = sorted(key for key in SEARCH_INDEX.trie.prefix(prefix) if key[0] in systems)
+            for system, code in keys[:limit]:
+                codes.append({"system": system, "code": code, "description": SEARCH_INDEX.entries[(system, code)][1]})
+            for term in SEARCH_INDEX.prefix_terms(prefix.strip().lower()):
+                terms.append(term)
+                if len(terms) >= limit:
+                    break
+    return {"prefix": prefix, "codes": codes, "terms": terms}
+
+
+def handle_health(params):
+    return {"status": "ok", "codes": len(SEARCH_INDEX.entries), "version": SEARCH_INDEX.version}
+
+
+def handle_metrics(params):
+    """Latency summaries (seconds) of the instrumented operations, handlers included."""
+    return {"started": METRICS.started, "metrics": METRICS.snapshot()}
+
+
+ROUTES = {
+    "/lookup": handle_lookup,
+    "/search": handle_search,
+    "/autocomplete": handle_autocomplete,
+    "/health": handle_health,
+    "/metrics": handle_metrics,
+}
+UNCACHED_ROUTES = {"/health", "/metrics"}
+
+
+class CodeServer:
+    """HTTP/1.1 JSON service over the explorer_core index, on asyncio streams.
+
+    Connections are kept alive between requests (HTTP/1.1 default, or
+    HTTP/1.0 with "Connection: keep-alive") until the client closes them or
+    they sit idle for KEEP_ALIVE_TIMEOUT seconds. Responses carry an ETag;
+    a matching If-None-Match gets an empty 304.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=CACHE_SIZE):
+        self.host = host
+        self.port = port
+        self.cache = ResponseCache(cache_size)
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info(f"Code server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.send(writer, 431, _encode({"error": "request headers too large"}), keep_alive=False)
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self.send(writer, 400, _encode({"error": "malformed request line"}), keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self.send(writer, 400, _encode({"error": "malformed content-length"}), keep_alive=False)
+                    break
+                if length:
+                    try:
+                        await reader.readexactly(length)  # No endpoint takes a body
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                status, body, etag = await self.respond(method, target)
+                if etag is not None and headers.get("if-none-match") == etag:
+                    await self.send(writer, 304, None, keep_alive, etag)
+                else:
+                    await self.send(writer, status, body, keep_alive, etag, head_only=method == "HEAD")
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, method, target):
+        """Return (status, encoded body, etag) for one request."""
+        if method not in ("GET", "HEAD"):
+            return 405, _encode({"error": "only GET is supported"}), None
+        url = urlsplit(target)
+        handler = ROUTES.get(url.path)
+        if handler is None:
+            return 404, _encode({"error": f"unknown path {url.path}"}), None
+
+        params = parse_qs(url.query)
+        key = (url.path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        version = SEARCH_INDEX.version
+        if url.path not in UNCACHED_ROUTES:
+            cached = self.cache.get(key, version)
+            if cached is not None:
+                return cached
+
+        try:
+            # Index walks run in the default thread pool so a slow query
+            # doesn't stall the other connections.
+            with METRICS.timer(f"server{url.path}"):
+                result = await asyncio.get_running_loop().run_in_executor(None, handler, params)
+        except ValueError as e:
+            return 400, _encode({"error": str(e)}), None
+        except Exception as e:
+            logging.error(f"Error handling {target}: {e}")
+            return 500, _encode({"error": "internal error"}), None
+
+        body = _encode(result)
+        entry = (200, body, f'"{version}-{hashlib.sha1(body).hexdigest()[:16]}"')
+        if url.path not in UNCACHED_ROUTES:
+            self.cache.put(key, version, entry)
+        return entry
+
+    async def send(self, writer, status, body, keep_alive=True, etag=None, head_only=False):
+        headers = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}"]
+        if body is not None:
+            headers.append("Content-Type: application/json; charset=utf-8")
+        headers.append(f"Content-Length: {len(body) if body is not None else 0}")
+        if etag is not None:
+            headers.append(f"ETag: {etag}")
+            headers.append("Cache-Control: no-cache")
+        headers.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        if keep_alive:
+            headers.append(f"Keep-Alive: timeout={KEEP_ALIVE_TIMEOUT}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+        if body is not None and not head_only:
+            writer.write(body)
+        await writer.drain()
+
+
+def _encode(result):
+    return json.dumps(result, separators=(",", ":")).encode("utf-8")
+
+
+def serve_in_background(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run a CodeServer on its own event loop in a daemon thread (used by the GUI)."""
+    server = CodeServer(host, port)
+    started = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(server.start())
+        except OSError as e:
+            logging.error(f"Could not start code server on {host}:{port}: {e}")
+            started.set()
+            return
+        started.set()
+        loop.run_until_complete(server.server.serve_forever())
+
+    threading.Thread(target=run, name="code-server", daemon=True).start()
+    started.wait()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve ICD-10/CPT lookup, search and autocomplete as HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    try:
+        explorer_core.load_data()
+    except explorer_core.ConfigError as e:
+        sys.exit(f"Error: {e}")
+    server = CodeServer(args.host, args.port, args.cache_size)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        explorer_core.close_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import argparse
+from array import array
+
+from journal import JOURNAL_SUFFIX
+from search_index import SearchIndex, ICD10_SYSTEM, CPT_SYSTEM, iter_icd10_entries, iter_cpt_entries
+
+SNAPSHOT_MAGIC = b"ICDS"
+SNAPSHOT_VERSION = 1
+
+SYSTEMS = (ICD10_SYSTEM, CPT_SYSTEM)
+
+# Section order in the file; each is a (offset, length) pair in the header
+SECTIONS = (
+    "sources",          # JSON: {path: {"size", "mtime_ns", "sha256"}} of the inputs
+    "string_offsets",   # u32[count + 1] into string_data
+    "string_data",      # UTF-8 bytes of every distinct string, stored once
+    "categories",       # u32 pairs (system, category string) in display order
+    "records",          # u32 x5 (system, code, category, description, token count) in file order
+    "sorted_records",   # u32 record numbers ordered by (system, code)
+    "terms",            # u32 term strings, sorted by term
+    "posting_offsets",  # u32[terms + 1] into postings
+    "postings",         # u32 record numbers per term
+)
+HEADER = struct.Struct("<4sIB3x" + "QQ" * len(SECTIONS))
+RECORD_WIDTH = 5
+
+
+def file_fingerprint(path, with_hash=True):
+    """Return {"size", "mtime_ns", "sha256"} for path, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        with open(path, "rb") as file:
+            fingerprint["sha256"] = hashlib.sha256(file.read()).hexdigest()
+    return fingerprint
+
+
+def snapshot_sources(*data_paths):
+    """The files a snapshot depends on: each JSON file and its change journal."""
+    return [path for data_path in data_paths for path in (data_path, data_path + JOURNAL_SUFFIX)]
+
+
+class _StringTable:
+    """Interns strings so every distinct value is stored once."""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def encode(self):
+        encoded = [value.encode("utf-8") for value in self.strings]
+        offsets = array("I", [0])
+        total = 0
+        for value in encoded:
+            total += len(value)
+            offsets.append(total)
+        return offsets.tobytes(), b"".join(encoded)
+
+
+def build_snapshot(path, icd10_codes, cpt_codes, source_paths, index=None):
+    """Compile both code sets and their search index into a binary snapshot at path.
+
+    source_paths are fingerprinted into the snapshot so CodeSnapshot.is_fresh()
+    can tell when the JSON (or its journal) has changed since. Pass an index
+    already built from the same code sets to skip building it again.
+    """
+    strings = _StringTable()
+    categories = array("I")
+    records = array("I")
+    record_numbers = {}
+    sources = {source: file_fingerprint(source) for source in source_paths}
+    if index is None:
+        index = SearchIndex()
+        index.rebuild(icd10_codes, cpt_codes)
+
+    for system_number, (system, codes, entries) in enumerate((
+            (ICD10_SYSTEM, icd10_codes, iter_icd10_entries(icd10_codes)),
+            (CPT_SYSTEM, cpt_codes, iter_cpt_entries(cpt_codes)))):
+        for category in codes:
+            categories.extend((system_number, strings.intern(category)))
+        for code, category, description in entries:
+            record_numbers[(system, code)] = len(records) // RECORD_WIDTH
+            records.extend((system_number, strings.intern(code), strings.intern(category),
+                            strings.intern(description), index.lengths[(system, code)]))
+
+    record_count = len(records) // RECORD_WIDTH
+    sorted_records = array("I", sorted(
+        range(record_count),
+        key=lambda number: (records[number * RECORD_WIDTH], strings.strings[records[number * RECORD_WIDTH + 1]])))
+
+    terms = array("I")
+    posting_offsets = array("I", [0])
+    postings = array("I")
+    for term in index.vocabulary:
+        terms.append(strings.intern(term))
+        postings.extend(sorted(record_numbers[key] for key in index.postings[term]))
+        posting_offsets.append(len(postings))
+
+    string_offsets, string_data = strings.encode()
+    payloads = {
+        "sources": json.dumps(sources).encode("utf-8"),
+        "string_offsets": string_offsets,
+        "string_data": string_data,
+        "categories": categories.tobytes(),
+        "records": records.tobytes(),
+        "sorted_records": sorted_records.tobytes(),
+        "terms": terms.tobytes(),
+        "posting_offsets": posting_offsets.tobytes(),
+        "postings": postings.tobytes(),
+    }
+
+    body = bytearray()
+    layout = []
+    for name in SECTIONS:
+        body += b"\0" * (-(HEADER.size + len(body)) % 8)  # Keep u32 arrays aligned
+        layout.extend((HEADER.size + len(body), len(payloads[name])))
+        body += payloads[name]
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == "little", *layout)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header)
+        file.write(body)
+    os.replace(temp_path, path)
+    logging.info(f"Wrote code snapshot with {record_count} codes and {len(terms)} terms to {path}")
+
+
+class CodeSnapshot:
+    """Read-only, memory-mapped view of a snapshot written by build_snapshot().
+
+    Arrays are used in place through memoryviews and strings are only
+    decoded when they are first needed, so lookup() costs a binary search
+    and a few string decodes. Loading the app from a snapshot is still O(n):
+    code_sets() and restore_index() decode every record into the usual dicts
+    and sets. That skips parsing JSON and re-tokenizing descriptions, a
+    constant-factor saving, and the objects they build are private to each
+    process; only the file's pages are shared while it is open.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, little_endian, *layout = HEADER.unpack_from(self.map)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} code snapshot")
+            if bool(little_endian) != (sys.byteorder == "little"):
+                raise ValueError(f"{path} was built on a machine with a different byte order")
+        except Exception:
+            self.file.close()
+            raise
+        self.sections = {name: (layout[2 * i], layout[2 * i + 1]) for i, name in enumerate(SECTIONS)}
+        self.string_offsets = self._u32("string_offsets")
+        self.records = self._u32("records")
+        self.sorted_records = self._u32("sorted_records")
+        self._strings = {}
+
+    def close(self):
+        self.string_offsets = self.records = self.sorted_records = None
+        self.map.close()
+        self.file.close()
+
+    def _bytes(self, name):
+        offset, length = self.sections[name]
+        return memoryview(self.map)[offset:offset + length]
+
+    def _u32(self, name):
+        return self._bytes(name).cast("I")
+
+    def string(self, string_id):
+        value = self._strings.get(string_id)
+        if value is None:
+            offset, _ = self.sections["string_data"]
+            start, end = self.string_offsets[string_id], self.string_offsets[string_id + 1]
+            value = self._strings[string_id] = self.map[offset + start:offset + end].decode("utf-8")
+        return value
+
+    def sources(self):
+        return json.loads(bytes(self._bytes("sources")))
+
+    def is_fresh(self):
+        """True if every source still matches by size and mtime, or failing that by content hash."""
+        for path, stored in self.sources().items():
+            current = file_fingerprint(path, with_hash=False)
+            if stored is None or current is None:
+                if stored != current:
+                    return False
+                continue
+            if current["size"] != stored["size"]:
+                return False
+            if current["mtime_ns"] != stored["mtime_ns"]:
+                if file_fingerprint(path)["sha256"] != stored["sha256"]:
+                    return False
+        return True
+
+    def record(self, number):
+        """Return (system, code, category, description) for a record number."""
+        base = number * RECORD_WIDTH
+        return (SYSTEMS[self.records[base]], self.string(self.records[base + 1]),
+                self.string(self.records[base + 2]), self.string(self.records[base + 3]))
+
+    def lookup(self, system, code):
+        """Binary search the sorted code array; returns (category, description) or None."""
+        target = (SYSTEMS.index(system), code)
+        low, high = 0, len(self.sorted_records)
+        while low < high:
+            middle = (low + high) // 2
+            base = self.sorted_records[middle] * RECORD_WIDTH
+            if (self.records[base], self.string(self.records[base + 1])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.sorted_records):
+            found = self.record(self.sorted_records[low])
+            if (found[0], found[1]) == (system, code):
+                return found[2], found[3]
+        return None
+
+    def code_sets(self):
+        """Rebuild the in-memory ICD-10 and keyed CPT dicts."""
+        icd10_codes, cpt_codes = {}, {}
+        categories = self._u32("categories")
+        for position in range(0, len(categories), 2):
+            codes = icd10_codes if categories[position] == 0 else cpt_codes
+            codes[self.string(categories[position + 1])] = {}
+        for number in range(len(self.records) // RECORD_WIDTH):
+            system, code, category, description = self.record(number)
+            codes = icd10_codes if system == ICD10_SYSTEM else cpt_codes
+            codes[category][code] = description
+        categories.release()
+        return icd10_codes, cpt_codes
+
+    def restore_index(self, index):
+        """Load the prebuilt search index into a SearchIndex without re-tokenizing."""
+        keys = []
+        entries = {}
+        lengths = {}
+        for number in range(len(self.records) // RECORD_WIDTH):
+            system, code, category, description = self.record(number)
+            key = (system, code)
+            keys.append(key)
+            entries[key] = (category, description)
+            lengths[key] = self.records[number * RECORD_WIDTH + 4]
+
+        terms = self._u32("terms")
+        posting_offsets = self._u32("posting_offsets")
+        posting_data = self._u32("postings")
+        postings = {}
+        for position, term_id in enumerate(terms):
+            numbers = posting_data[posting_offsets[position]:posting_offsets[position + 1]]
+            postings[self.string(term_id)] = {keys[number] for number in numbers}
+        for view in (terms, posting_offsets, posting_data):
+            view.release()
+        index.restore(entries, lengths, postings)
+
+
+def open_fresh_snapshot(path):
+    """Return a CodeSnapshot for path if it exists and is current, otherwise None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = CodeSnapshot(path)
+    except (OSError, ValueError, struct.error) as e:
+        logging.error(f"Ignoring unreadable code snapshot {path}: {e}")
+        return None
+    if not snapshot.is_fresh():
+        logging.info(f"Code snapshot {path} is out of date.")
+        snapshot.close()
+        return None
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the configured ICD-10 and CPT code files into a binary code snapshot.")
+    parser.add_argument("--output", help="Snapshot file to write (default: SNAPSHOT_FILE from config.json)")
+    args = parser.parse_args()
+
+    import explorer_core  # Imports this module, so not at the top
+    try:
+        explorer_core.open_stores()
+    except explorer_core.ConfigError as e:
+        parser.error(str(e))
+    if explorer_core.CODE_STORE is not None:
+        parser.error("the snapshot is only used with the JSON storage backend")
+    output = args.output or explorer_core.SNAPSHOT_FILE
+    build_snapshot(output, explorer_core.load_icd10_codes(), explorer_core.load_cpt_codes(),
+                   snapshot_sources(explorer_core.ICD10_FILE, explorer_core.CPT_FILE))
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,561 @@
+"""Headless data layer for the ICD-10/CPT explorer: configuration, storage,
+search, lookup and validation, with no Tk or PIL imports.
+
+Nothing is read at import time. load_config() reads ~/config.json on first
+use, and load_data() opens the stores and fills the module-level code sets
+in place, so names imported from here stay valid after loading.
+
+Run `python -m explorer_core --help` for the command line interface.
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import functools
+
+from search_index import SearchIndex, ICD10_SYSTEM, CPT_SYSTEM, iter_icd10_entries, iter_cpt_entries, cpt_from_records, cpt_to_records
+from search_engine import SearchEngine, DEFAULT_LIMIT
+from journal import ChangeJournal, set_change, delete_change
+from code_snapshot import build_snapshot, open_fresh_snapshot, snapshot_sources
+from code_locator import CodeLocator
+from code_hierarchy import CodeHierarchy
+from code_import import CodeClassifier
+from code_details import CodeDetailCache, build_code_detail
+from code_export import EXPORT_FORMATS, iter_export_rows, export_codes, parse_code_range
+from perf_metrics import timed
+
+CONFIG_PATH = os.path.expanduser("~/config.json")
+BUNDLED_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+SYSTEMS = (ICD10_SYSTEM, CPT_SYSTEM)
+
+
+class ConfigError(Exception):
+    """config.json is missing or unreadable."""
+
+
+_config = None
+
+def load_config():
+    """Read ~/config.json (copying the bundled one there on first run) once."""
+    global _config
+    if _config is not None:
+        return _config
+
+    if not os.path.exists(CONFIG_PATH):
+        try:
+            with open(BUNDLED_CONFIG_PATH, 'r') as bundled_config_file:
+                bundled_config = json.load(bundled_config_file)
+            with open(CONFIG_PATH, 'w') as user_config_file:
+                json.dump(bundled_config, user_config_file, indent=4)
+            logging.info(f"Copied bundled config.json to {CONFIG_PATH}")
+        except Exception as e:
+            logging.error(f"Error copying config.json: {e}")
+            raise ConfigError("Could not copy config.json to the user's home directory.")
+
+    try:
+        with open(CONFIG_PATH, 'r') as config_file:
+            _config = json.load(config_file)
+    except FileNotFoundError:
+        logging.error("config.json file not found.")
+        raise ConfigError("config.json file not found.")
+    except json.JSONDecodeError as e:
+        logging.error(f"Error decoding config.json: {e}")
+        raise ConfigError("config.json is not properly formatted.")
+    return _config
+
+def read_json_file(path):
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError as e:
+        logging.error(f"FileNotFoundError: {e}")
+        return {}
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Set by open_stores() from the config
+ICD10_FILE = CPT_FILE = USER_DB_FILE = None
+STORAGE_BACKEND = SQLITE_FILE = SNAPSHOT_FILE = None
+CODE_STORE = ICD10_STORE = CPT_STORE = USER_DB_STORE = None
+
+# Filled in place by load_data()
+ICD10_CODES = {}
+CPT_CODES = {}
+USER_DB = {}
+SEARCH_INDEX = SearchIndex()
+SEARCH_ENGINE = SearchEngine(SEARCH_INDEX)
+CODE_LOCATOR = CodeLocator()
+CODE_HIERARCHY = CodeHierarchy()
+CPT_CLASSIFIER = CodeClassifier(CPT_SYSTEM, ())
+CODE_DETAILS = CodeDetailCache()
+DATA_LOADED = False
+INDEX_LOADED = False
+IO_EXECUTOR = None  # Set by use_io_executor()
+# Guards the code sets, locator and hierarchy: the mutators run on the Tk
+# thread while code_server answers from a thread pool. It is the index's
+# RLock, so SearchEngine's own locking nests inside it.
+DATA_LOCK = SEARCH_INDEX.lock
+
+def _with_data_lock(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with DATA_LOCK:
+            return fn(*args, **kwargs)
+    return wrapper
+
+def open_stores():
+    """Pick the storage backend from the config. Safe to call more than once."""
+    global ICD10_FILE, CPT_FILE, USER_DB_FILE, STORAGE_BACKEND, SQLITE_FILE, SNAPSHOT_FILE
+    global CODE_STORE, ICD10_STORE, CPT_STORE, USER_DB_STORE
+    if ICD10_STORE is not None:
+        return
+    config = load_config()
+    ICD10_FILE = config["ICD10_FILE"]
+    USER_DB_FILE = config["USER_DB_FILE"]
+    CPT_FILE = config["CPT_FILE"]
+    STORAGE_BACKEND = config.get("STORAGE_BACKEND", "json")  # "json" or "sqlite"
+    SQLITE_FILE = config.get("SQLITE_FILE", "icd10_explorer.db")
+    SNAPSHOT_FILE = config.get("SNAPSHOT_FILE", "codes.snapshot")
+
+    # Each data set is written through a store with the ChangeJournal interface:
+    # a journal next to the JSON file, or a table in the SQLite database.
+    if STORAGE_BACKEND == "sqlite":
+        from sqlite_store import SQLiteCodeStore, SQLiteTable, ICD10_DATASET, CPT_DATASET, USERS_DATASET
+        CODE_STORE = SQLiteCodeStore(SQLITE_FILE)
+        if CODE_STORE.is_empty():
+            # First run on this database: the JSON files are the import source
+            CODE_STORE.import_json(
+                ChangeJournal(ICD10_FILE).replay(read_json_file(ICD10_FILE)),
+                ChangeJournal(CPT_FILE).replay(cpt_from_records(read_json_file(CPT_FILE))),
+                ChangeJournal(USER_DB_FILE).replay(read_json_file(USER_DB_FILE)))
+        ICD10_STORE = SQLiteTable(CODE_STORE, ICD10_DATASET)
+        USER_DB_STORE = SQLiteTable(CODE_STORE, USERS_DATASET)
+        CPT_STORE = SQLiteTable(CODE_STORE, CPT_DATASET)
+    else:
+        CODE_STORE = None
+        ICD10_STORE = ChangeJournal(ICD10_FILE)
+        USER_DB_STORE = ChangeJournal(USER_DB_FILE)
+        # CPT codes are keyed by code in memory but stay a list per category on disk
+        CPT_STORE = ChangeJournal(CPT_FILE, encode=cpt_to_records)
+
+def load_icd10_codes():
+    if CODE_STORE is not None:
+        return CODE_STORE.load(ICD10_STORE.dataset)
+    return ICD10_STORE.replay(read_json_file(ICD10_FILE))
+
+@timed("core.save_icd10_codes")
+@_with_data_lock
+def save_icd10_codes(codes):
+    """Write the full ICD-10 data set (snapshot file or database table)."""
+    ICD10_STORE.compact(codes, force=True)
+    SEARCH_INDEX.sync(ICD10_SYSTEM, iter_icd10_entries(codes))
+    CODE_LOCATOR.rebuild_system(ICD10_SYSTEM, codes)
+    CODE_HIERARCHY.rebuild(codes)
+    logging.info("ICD-10 codes saved successfully!")
+
+def load_user_db():
+    if CODE_STORE is not None:
+        return CODE_STORE.load(USER_DB_STORE.dataset)
+    return USER_DB_STORE.replay(read_json_file(USER_DB_FILE))
+
+@timed("core.save_user_db")
+def save_user_db(users):
+    """Write the full user database (snapshot file or database table)."""
+    USER_DB_STORE.compact(users, force=True)
+    logging.info("User database saved successfully!")
+
+def load_cpt_codes():
+    if CODE_STORE is not None:
+        return CODE_STORE.load(CPT_STORE.dataset)
+    return CPT_STORE.replay(cpt_from_records(read_json_file(CPT_FILE)))
+
+@timed("core.save_cpt_codes")
+@_with_data_lock
+def save_cpt_codes(codes):
+    """Write the full CPT data set (snapshot file or database table)."""
+    CPT_STORE.compact(codes, force=True)
+    SEARCH_INDEX.sync(CPT_SYSTEM, iter_cpt_entries(codes))
+    CODE_LOCATOR.rebuild_system(CPT_SYSTEM, codes)
+    logging.info("CPT codes saved successfully!")
+
+@timed("core.load_data")
+@_with_data_lock
+def load_data():
+    """Load the code sets, user database, search index and code locator once."""
+    global DATA_LOADED, INDEX_LOADED
+    if DATA_LOADED:
+        return
+    open_stores()
+
+    # With the JSON backend a current binary snapshot replaces parsing both code
+    # files and rebuilding the search index; a stale one is rebuilt after loading.
+    snapshot = open_fresh_snapshot(SNAPSHOT_FILE) if CODE_STORE is None else None
+    if snapshot is not None:
+        icd10_codes, cpt_codes = snapshot.code_sets()
+        ICD10_STORE.count_records()  # The snapshot already includes their journals
+        CPT_STORE.count_records()
+    else:
+        icd10_codes, cpt_codes = load_icd10_codes(), load_cpt_codes()
+    ICD10_CODES.clear()
+    ICD10_CODES.update(icd10_codes)
+    CPT_CODES.clear()
+    CPT_CODES.update(cpt_codes)
+    USER_DB.clear()
+    USER_DB.update(load_user_db())
+
+    if snapshot is not None:
+        snapshot.restore_index(SEARCH_INDEX)
+        snapshot.close()
+    else:
+        SEARCH_INDEX.rebuild(ICD10_CODES, CPT_CODES)
+        if CODE_STORE is None:
+            try:
+                build_snapshot(SNAPSHOT_FILE, ICD10_CODES, CPT_CODES, snapshot_sources(ICD10_FILE, CPT_FILE), SEARCH_INDEX)
+            except OSError as e:
+                logging.error(f"Error writing code snapshot: {e}")
+    CODE_LOCATOR.rebuild(ICD10_CODES, CPT_CODES)
+    CODE_HIERARCHY.rebuild(ICD10_CODES)
+    DATA_LOADED = INDEX_LOADED = True
+
+def load_search_index():
+    """Make SEARCH_INDEX usable, from the snapshot alone when it is current."""
+    global INDEX_LOADED
+    if INDEX_LOADED:
+        return
+    open_stores()
+    snapshot = open_fresh_snapshot(SNAPSHOT_FILE) if CODE_STORE is None else None
+    if snapshot is None:
+        load_data()
+        return
+    snapshot.restore_index(SEARCH_INDEX)
+    snapshot.close()
+    INDEX_LOADED = True
+
+def use_io_executor(executor):
+    """Write the journals and snapshots (or SQLite transactions) in the background from now on."""
+    global IO_EXECUTOR
+    open_stores()
+    IO_EXECUTOR = executor
+    for store in (ICD10_STORE, CPT_STORE, USER_DB_STORE):
+        store.executor = executor
+
+def close_data():
+    """Fold pending journal records into the data files and close the database."""
+    if DATA_LOADED:
+        compact_journals()
+    if IO_EXECUTOR is not None:
+        IO_EXECUTOR.shutdown()  # Wait for the writes queued above
+    if CODE_STORE is not None:
+        CODE_STORE.close()
+
+# Single-change mutators. Each one appends a journal record (or runs one
+# SQLite transaction) instead of rewriting the data file, and updates the
+# search index and code locator in place.
+
+@_with_data_lock
+def store_icd10_code(category, code, description):
+    ICD10_STORE.record(ICD10_CODES, set_change([category, code], description))
+    SEARCH_INDEX.add(ICD10_SYSTEM, code, category, description)
+    CODE_LOCATOR.add(ICD10_SYSTEM, code, category)
+    CODE_HIERARCHY.add_code(code)
+
+@_with_data_lock
+def rename_icd10_code(category, code, new_code, description):
+    ICD10_STORE.record(ICD10_CODES, delete_change([category, code]), set_change([category, new_code], description))
+    SEARCH_INDEX.remove(ICD10_SYSTEM, code)
+    SEARCH_INDEX.add(ICD10_SYSTEM, new_code, category, description)
+    CODE_LOCATOR.remove(ICD10_SYSTEM, code)
+    CODE_LOCATOR.add(ICD10_SYSTEM, new_code, category)
+    CODE_HIERARCHY.remove_code(code)
+    CODE_HIERARCHY.add_code(new_code)
+
+@_with_data_lock
+def remove_icd10_code(category, code):
+    ICD10_STORE.record(ICD10_CODES, delete_change([category, code]))
+    SEARCH_INDEX.remove(ICD10_SYSTEM, code)
+    CODE_LOCATOR.remove(ICD10_SYSTEM, code)
+    CODE_HIERARCHY.remove_code(code)
+
+@_with_data_lock
+def store_icd10_category(category, codes=None):
+    codes = codes or {}
+    ICD10_STORE.record(ICD10_CODES, set_change([category], codes))
+    for code, description in codes.items():
+        SEARCH_INDEX.add(ICD10_SYSTEM, code, category, description)
+        CODE_LOCATOR.add(ICD10_SYSTEM, code, category)
+        CODE_HIERARCHY.add_code(code)
+    CODE_HIERARCHY.rebuild_ranges(ICD10_CODES)
+    CODE_DETAILS.clear()  # A new range label can change other codes' parents
+
+@_with_data_lock
+def remove_icd10_category(category):
+    for code in ICD10_CODES.get(category, {}):
+        SEARCH_INDEX.remove(ICD10_SYSTEM, code)
+        CODE_LOCATOR.remove(ICD10_SYSTEM, code)
+        CODE_HIERARCHY.remove_code(code)
+    ICD10_STORE.record(ICD10_CODES, delete_change([category]))
+    CODE_HIERARCHY.rebuild_ranges(ICD10_CODES)
+    CODE_DETAILS.clear()
+
+@_with_data_lock
+def store_cpt_code(category, code, description):
+    CPT_STORE.record(CPT_CODES, set_change([category, code], description))
+    SEARCH_INDEX.add(CPT_SYSTEM, code, category, description)
+    CODE_LOCATOR.add(CPT_SYSTEM, code, category)
+
+@_with_data_lock
+def rename_cpt_code(category, code, new_code, description):
+    CPT_STORE.record(CPT_CODES, delete_change([category, code]), set_change([category, new_code], description))
+    SEARCH_INDEX.remove(CPT_SYSTEM, code)
+    SEARCH_INDEX.add(CPT_SYSTEM, new_code, category, description)
+    CODE_LOCATOR.remove(CPT_SYSTEM, code)
+    CODE_LOCATOR.add(CPT_SYSTEM, new_code, category)
+
+@_with_data_lock
+def remove_cpt_code(category, code):
+    CPT_STORE.record(CPT_CODES, delete_change([category, code]))
+    SEARCH_INDEX.remove(CPT_SYSTEM, code)
+    CODE_LOCATOR.remove(CPT_SYSTEM, code)
+
+@_with_data_lock
+def store_cpt_category(category):
+    CPT_STORE.record(CPT_CODES, set_change([category], {}))
+
+@_with_data_lock
+def remove_cpt_category(category):
+    for code in CPT_CODES.get(category, {}):
+        SEARCH_INDEX.remove(CPT_SYSTEM, code)
+        CODE_LOCATOR.remove(CPT_SYSTEM, code)
+    CPT_STORE.record(CPT_CODES, delete_change([category]))
+
+def code_set(system):
+    return CPT_CODES if system == CPT_SYSTEM else ICD10_CODES
+
+@_with_data_lock
+def rename_code(system, code, new_code, description):
+    """Change a code and/or its description in place; returns False if the code is unknown."""
+    category = CODE_LOCATOR.category_of(system, code)
+    if category is None:
+        return False
+    if system == CPT_SYSTEM:
+        rename_cpt_code(category, code, new_code, description)
+    else:
+        rename_icd10_code(category, code, new_code, description)
+    return True
+
+@_with_data_lock
+def remove_code(system, code):
+    """Delete a code from whichever category holds it; returns False if the code is unknown."""
+    category = CODE_LOCATOR.category_of(system, code)
+    if category is None:
+        return False
+    if system == CPT_SYSTEM:
+        remove_cpt_code(category, code)
+    else:
+        remove_icd10_code(category, code)
+    return True
+
+@_with_data_lock
+def remove_category(system, category):
+    if system == CPT_SYSTEM:
+        remove_cpt_category(category)
+    else:
+        remove_icd10_category(category)
+
+def store_user(username, user_info):
+    USER_DB_STORE.record(USER_DB, set_change([username], user_info))
+
+def compact_journals():
+    """Fold any pending journal records into the JSON snapshots."""
+    ICD10_STORE.compact(ICD10_CODES)
+    USER_DB_STORE.compact(USER_DB)
+    CPT_STORE.compact(CPT_CODES)
+
+# Read-only queries. These avoid loading the code sets when they can: the
+# SQLite store and a current snapshot both answer lookups directly.
+
+def _code_variants(code):
+    # Codes are matched as typed first, then upper case
+    code = code.strip()
+    return dict.fromkeys((code, code.upper()))
+
+def lookup_codes(codes, systems=SYSTEMS):
+    """Yield (code, [(system, category, description)]) for each code; an empty
+    list means the code is not in any of the given systems."""
+    if not DATA_LOADED:
+        open_stores()
+        if CODE_STORE is not None:
+            for code in codes:
+                found = []
+                for system in systems:
+                    for variant in _code_variants(code):
+                        matches = CODE_STORE.lookup(system, variant)
+                        if matches:
+                            found.extend((system, category, description) for category, description in matches)
+                            break
+                yield code, found
+            return
+        snapshot = open_fresh_snapshot(SNAPSHOT_FILE)
+        if snapshot is not None:
+            try:
+                for code in codes:
+                    found = []
+                    for system in systems:
+                        for variant in _code_variants(code):
+                            location = snapshot.lookup(system, variant)
+                            if location is not None:
+                                found.append((system,) + location)
+                                break
+                    yield code, found
+            finally:
+                snapshot.close()
+            return
+        load_data()
+
+    for code in codes:
+        found = []
+        with DATA_LOCK:
+            for system in systems:
+                for variant in _code_variants(code):
+                    category = CODE_LOCATOR.category_of(system, variant)
+                    if category is not None:
+                        found.append((system, category, code_set(system)[category][variant]))
+                        break
+        yield code, found
+
+def lookup(code, systems=SYSTEMS):
+    """Return [(system, category, description)] for one code."""
+    return next(lookup_codes([code], systems))[1]
+
+@timed("core.search")
+def search(query, systems=SYSTEMS, limit=DEFAULT_LIMIT, code_range=None, fuzzy=False):
+    """Ranked search results (search_engine.SearchResult) across the given systems.
+
+    code_range is an ICD-10 (start, end) pair such as ("D50", "D89"); it
+    restricts the results to ICD-10 codes in that range. fuzzy also matches
+    words and codes with a typo in them.
+    """
+    if code_range is not None:
+        load_data()
+        with DATA_LOCK:
+            within = {(ICD10_SYSTEM, code) for code in CODE_HIERARCHY.codes_in_range(*code_range)}
+            return SEARCH_ENGINE.search(query, systems, limit, within, fuzzy)
+    if fuzzy:
+        load_search_index()
+        return SEARCH_ENGINE.search(query, systems, limit, fuzzy=True)
+    open_stores()
+    if CODE_STORE is not None and not DATA_LOADED:
+        results = [result for system in systems for result in CODE_STORE.search(query, system, limit)]
+        return sorted(results, key=lambda result: -result.score)[:limit]
+    load_search_index()
+    return SEARCH_ENGINE.search(query, systems, limit)
+
+def suggest_category(system, code):
+    """The existing category whose code range covers code, for the add-code dialogs."""
+    if not code.strip():
+        return None
+    if system == ICD10_SYSTEM:
+        category = CODE_HIERARCHY.block_of(code)
+    else:
+        category = CPT_CLASSIFIER.classify(code)
+    return category if category in code_set(system) else None
+
+@timed("core.code_detail")
+def code_detail(system, code):
+    """The code_details.CodeDetail for a code, or None if it isn't in system."""
+    load_data()
+    with DATA_LOCK:
+        return CODE_DETAILS.get((system, code), SEARCH_INDEX.version,
+                                lambda: build_code_detail(system, code, code_set(system), CODE_LOCATOR, CODE_HIERARCHY))
+
+def validate(codes, systems=SYSTEMS):
+    """Return the codes that are not in any of the given systems."""
+    return [code for code, found in lookup_codes(codes, systems) if not found]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m explorer_core", description="Look up, search, validate and export ICD-10 and CPT codes without the GUI.")
+    parser.add_argument("--system", choices=SYSTEMS, action="append", help="Only this code system (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of tab-separated text")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    lookup_parser = commands.add_parser("lookup", help="Show the category and description of codes")
+    lookup_parser.add_argument("codes", nargs="+")
+
+    search_parser = commands.add_parser("search", help="Ranked search by code prefix or description words")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    search_parser.add_argument("--range", dest="code_range", help="Only ICD-10 codes in this range, e.g. D50-D89")
+    search_parser.add_argument("--fuzzy", action="store_true", help="Also match words and codes with a typo")
+
+    validate_parser = commands.add_parser("validate", help="Report codes that do not exist; exits 1 if any are invalid")
+    validate_parser.add_argument("codes", nargs="*")
+    validate_parser.add_argument("--file", help="Read codes from a file, one per line (- for stdin)")
+
+    export_parser = commands.add_parser("export", help="Stream codes to CSV, JSONL or Parquet")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export_parser.add_argument("--output", default="-", help="Output file, or - for stdout")
+    export_parser.add_argument("--category", action="append", help="Only this category (repeatable)")
+    export_parser.add_argument("--range", dest="code_range", help="Code range, e.g. A00-B99")
+    export_parser.add_argument("--query", help="Only codes matching this search")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    systems = tuple(args.system) if args.system else SYSTEMS
+
+    try:
+        if args.command == "lookup":
+            missing = False
+            for code, found in lookup_codes(args.codes, systems):
+                missing = missing or not found
+                if args.json:
+                    print(json.dumps({"code": code, "matches": [dict(zip(("system", "category", "description"), match)) for match in found]}))
+                elif not found:
+                    print(f"{code}\tnot found")
+                for system, category, description in ([] if args.json else found):
+                    print(f"{system}\t{code}\t{category}\t{description}")
+            return 1 if missing else 0
+
+        if args.command == "search":
+            for result in search(args.query, systems, args.limit, parse_code_range(args.code_range), args.fuzzy):
+                if args.json:
+                    print(json.dumps(result._asdict()))
+                else:
+                    print(f"{result.score}\t{result.system}\t{result.code}\t{result.description}")
+            return 0
+
+        if args.command == "validate":
+            codes = list(args.codes)
+            if args.file:
+                with (sys.stdin if args.file == "-" else open(args.file, "r")) as file:
+                    codes.extend(line.strip() for line in file if line.strip())
+            invalid = validate(codes, systems)
+            if args.json:
+                print(json.dumps({"checked": len(codes), "invalid": invalid}))
+            else:
+                for code in invalid:
+                    print(f"{code}\tinvalid")
+                print(f"{len(codes) - len(invalid)} of {len(codes)} codes valid", file=sys.stderr)
+            return 1 if invalid else 0
+
+        load_data()
+        rows = iter_export_rows(ICD10_CODES, CPT_CODES, systems, args.category,
+                                parse_code_range(args.code_range), args.query, SEARCH_INDEX)
+        count = export_codes(rows, args.output, args.format)
+        print(f"Exported {count} codes", file=sys.stderr)
+        return 0
+    except (ConfigError, RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        # Read-only: leave journals for the app to compact
+        if CODE_STORE is not None:
+            CODE_STORE.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
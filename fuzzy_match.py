@@ -0,0 +1,211 @@
+import sys
+import time
+import argparse
+from collections import Counter
+
+from search_index import ICD10_SYSTEM, CPT_SYSTEM, normalize_code, iter_icd10_entries, iter_cpt_entries
+
+NGRAM_PAD = "$"
+
+
+def code_term(code):
+    """Codes are fuzzy-matched without the dot, so C34.1 and C341 are the same term."""
+    return normalize_code(code).replace(".", "")
+
+
+def max_distance(term):
+    """Edits allowed for a typo of term: none for short words, two for long ones."""
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 7 else 2
+
+
+def bigrams(term):
+    padded = NGRAM_PAD + term + NGRAM_PAD
+    return {padded[position:position + 2] for position in range(len(padded) - 1)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance counting an adjacent swap as one edit ("anemai" -> "anemia").
+
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + cost)
+            if previous is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous, row = row, current
+    return row[-1]
+
+
+class NgramIndex:
+    """Padded-bigram index over a set of terms, for bounded edit distance lookups.
+
+    One edit changes at most three of a term's bigrams, so a term within k
+    edits of the query must share all but 3k of the query's bigrams. Only the
+    terms passing that count are checked with edit_distance().
+    """
+
+    def __init__(self):
+        self.grams = {}
+        self.terms = set()
+        self.by_length = {}
+
+    def add(self, term):
+        if term in self.terms:
+            return
+        self.terms.add(term)
+        self.by_length.setdefault(len(term), set()).add(term)
+        for gram in bigrams(term):
+            self.grams.setdefault(gram, set()).add(term)
+
+    def remove(self, term):
+        if term not in self.terms:
+            return
+        self.terms.discard(term)
+        self.by_length[len(term)].discard(term)
+        for gram in bigrams(term):
+            terms = self.grams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self.grams[gram]
+
+    def similar(self, term, limit):
+        """Return [(term, distance)] for every indexed term within limit edits."""
+        if limit <= 0:
+            return [(term, 0)] if term in self.terms else []
+        grams = bigrams(term)
+        needed = len(grams) - 3 * limit
+        if needed > 0:
+            counts = Counter()
+            for gram in grams:
+                counts.update(self.grams.get(gram, ()))
+            candidates = [candidate for candidate, count in counts.items() if count >= needed]
+        else:
+            # Too short for the bigram filter; compare against terms of a similar length
+            candidates = [candidate for length in range(len(term) - limit, len(term) + limit + 1)
+                          for candidate in self.by_length.get(length, ())]
+        matches = []
+        for candidate in candidates:
+            distance = edit_distance(term, candidate, limit)
+            if distance <= limit:
+                matches.append((candidate, distance))
+        return matches
+
+
+class FuzzyIndex:
+    """Typo-tolerant lookup over a SearchIndex's vocabulary and code trie.
+
+    SearchIndex builds it on the first fuzzy query and keeps the vocabulary
+    side current from add()/remove() after that. Codes need no index of their
+    own: similar_codes() walks the CodeTrie the index already has.
+    """
+
+    def __init__(self, trie):
+        self.terms = NgramIndex()
+        self.trie = trie
+
+    def add_term(self, term):
+        self.terms.add(term)
+
+    def remove_term(self, term):
+        self.terms.remove(term)
+
+    def similar_terms(self, token):
+        """Return [(term, distance)] for vocabulary terms close to token."""
+        return self.terms.similar(token, max_distance(token))
+
+    def similar_codes(self, code, limit=1):
+        """Return [(key, distance)] for codes within limit edits of code, ignoring dots.
+
+        Each trie node extends the edit distance table by one row, and a branch
+        is dropped as soon as every cell in its row is over limit. Codes of
+        three characters or fewer are left to prefix matching.
+        """
+        term = code_term(code)
+        if len(term) <= 3 or not any(char.isdigit() for char in term):
+            return []  # Every code has a digit; don't look for words among them
+        matches = []
+        stack = [(child, char, "", list(range(len(term) + 1)), None, char)
+                 for char, child in self.trie.root.children.items()]
+        while stack:
+            node, char, last_char, row, previous_row, path = stack.pop()
+            if char == ".":
+                current = row  # Dots cost nothing; compare as code_term() does
+                char, row = last_char, previous_row
+            else:
+                current = [row[0] + 1]
+                for j in range(1, len(term) + 1):
+                    value = min(current[j - 1] + 1, row[j] + 1, row[j - 1] + (term[j - 1] != char))
+                    if previous_row is not None and j > 1 and term[j - 1] == last_char and term[j - 2] == char:
+                        value = min(value, previous_row[j - 2] + 1)
+                    current.append(value)
+            if current[-1] <= limit:
+                matches.extend((key, current[-1]) for key in node.keys if normalize_code(key[1]) == path)
+            if min(current) <= limit:
+                for child_char, child in node.children.items():
+                    stack.append((child, child_char, char, current, row, path + child_char))
+        return matches
+
+
+def substring_scan(icd10_codes, cpt_codes, query):
+    """The search the explorer used before the index: a substring test on every code."""
+    query = query.lower()
+    matches = []
+    for system, entries in ((ICD10_SYSTEM, iter_icd10_entries(icd10_codes)), (CPT_SYSTEM, iter_cpt_entries(cpt_codes))):
+        for code, category, description in entries:
+            if query in code.lower() or query in description.lower():
+                matches.append((system, code))
+    return matches
+
+
+BENCHMARK_QUERIES = ("anemai", "diabetis", "pnuemonia", "hypertensoin", "C3 4", "99321", "fractur femur", "asthma")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fuzzy search with exact search and a substring scan.")
+    parser.add_argument("queries", nargs="*", default=BENCHMARK_QUERIES)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+    args = parser.parse_args()
+
+    import explorer_core
+    try:
+        explorer_core.load_data()
+    except explorer_core.ConfigError as e:
+        parser.error(str(e))
+    icd10_codes, cpt_codes = explorer_core.ICD10_CODES, explorer_core.CPT_CODES
+    index, engine = explorer_core.SEARCH_INDEX, explorer_core.SEARCH_ENGINE
+    index.trie  # Built on first use; keep it out of the exact timings
+    started = time.perf_counter()
+    index.fuzzy
+    print(f"{len(index.entries)} codes; fuzzy index built in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+
+    searches = (
+        ("substring", lambda query: substring_scan(icd10_codes, cpt_codes, query)),
+        ("exact", lambda query: engine.search(query)),
+        ("fuzzy", lambda query: engine.search(query, fuzzy=True)),
+    )
+    print(f"{'query':<16}" + "".join(f"{name + ' ms':>14}{'hits':>6}" for name, _ in searches))
+    for query in args.queries:
+        row = f"{query:<16}"
+        for name, search in searches:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                results = search(query)
+            elapsed = (time.perf_counter() - started) * 1000 / args.repeat
+            row += f"{elapsed:>14.2f}{len(results):>6}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
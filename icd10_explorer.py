@@ -1,168 +1,97 @@
 import sys
-import json
-import hashlib
 import os
 import logging
-import subprocess
-from datetime import datetime
-from PIL import Image, ImageTk, ImageDraw
+import threading
+import queue
+import time
+from itertools import islice
+from PIL import ImageTk, ImageDraw
 import shutil
-
-# Configure logging
-logging.basicConfig(filename='icd10_explorer.log', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
-
-def log_error(error_message, solution):
-    error_entry = {
-        "error_message": error_message,
-        "solution": solution,
-        "timestamp": datetime.now().isoformat()
-    }
-    try:
-        with open('error_log.json', 'r') as error_log_file:
-            error_log = json.load(error_log_file)
-    except FileNotFoundError:
-        error_log = {"errors": []}
-
-    error_log["errors"].append(error_entry)
-
-    with open('error_log.json', 'w') as error_log_file:
-        json.dump(error_log, error_log_file, indent=4)
+from io_executor import IOExecutor
+from image_cache import ThumbnailCache
+from log_setup import ERROR_LOG_FILE, configure_logging, shutdown_logging
+from perf_metrics import METRICS, timed
+from process_runner import ProcessRunner, STDERR, EXIT
+from settings_store import SettingsStore
+from search_index import ICD10_SYSTEM, CPT_SYSTEM, iter_icd10_entries, iter_cpt_entries
+from search_engine import IncrementalSearch
+from tree_views import LazyCodeTree, VirtualTreeview
+from code_import import read_code_file, CodeMerger
+from code_details import format_code_detail
+from code_export import EXPORT_FORMATS, iter_export_rows, export_codes, parse_code_range
+from explorer_core import (
+    ConfigError, load_config, load_data, close_data, hash_password,
+    ICD10_CODES, CPT_CODES, USER_DB, SEARCH_INDEX, SEARCH_ENGINE, CODE_LOCATOR, DATA_LOCK,
+    save_icd10_codes, save_cpt_codes, code_set,
+    store_icd10_code, store_icd10_category, store_cpt_code, store_cpt_category,
+    rename_code, remove_code, remove_category, store_user, suggest_category, code_detail,
+    use_io_executor,
+)
 
 try:
     import customtkinter as ctk
     from tkinter import ttk, messagebox, Menu, filedialog
-    from PIL import Image, ImageTk
+    from PIL import ImageTk
 except ImportError as e:
     logging.error(f"ImportError: {e}")
     sys.exit("Error: tkinter is not installed. Please install it using 'pip install tk'.")
 
+# Load configuration
 try:
-    import tkinter
-    print("tkinter is installed and accessible.")
-except ImportError:
-    print("tkinter is not installed.")
+    config = load_config()
+except ConfigError as e:
+    sys.exit(f"Error: {e}")
 
-# Load configuration
-CONFIG_PATH = os.path.expanduser("~/config.json")
-BUNDLED_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.json')
-
-if not os.path.exists(CONFIG_PATH):
-    try:
-        with open(BUNDLED_CONFIG_PATH, 'r') as bundled_config_file:
-            bundled_config = json.load(bundled_config_file)
-        with open(CONFIG_PATH, 'w') as user_config_file:
-            json.dump(bundled_config, user_config_file, indent=4)
-        logging.info(f"Copied bundled config.json to {CONFIG_PATH}")
-    except Exception as e:
-        logging.error(f"Error copying config.json: {e}")
-        sys.exit("Error: Could not copy config.json to the user's home directory.")
+configure_logging(config)  # Records are written by a background listener thread
 
-try:
-    with open(CONFIG_PATH, 'r') as config_file:
-        config = json.load(config_file)
-except FileNotFoundError:
-    logging.error("config.json file not found.")
-    sys.exit("Error: config.json file not found.")
-except json.JSONDecodeError as e:
-    logging.error(f"Error decoding config.json: {e}")
-    sys.exit("Error: config.json is not properly formatted.")
-
-ICD10_FILE = config["ICD10_FILE"]
-USER_DB_FILE = config["USER_DB_FILE"]
 SETTINGS_FILE = config["SETTINGS_FILE"]
-CPT_FILE = config["CPT_FILE"]
 SETTINGS_DIR = os.path.expanduser(config["SETTINGS_DIR"])
 DEFAULT_SETTINGS = config["DEFAULT_SETTINGS"]
 
-def ensure_settings_file():
-    """Ensure the settings directory and file exist and populate with default settings if needed."""
-    os.makedirs(SETTINGS_DIR, exist_ok=True)
-
-    if not os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(DEFAULT_SETTINGS, f, indent=4)
-        logging.info(f"Created default settings file at: {SETTINGS_FILE}")
-
-def load_settings():
-    """Load settings from the file."""
-    try:
-        with open(SETTINGS_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logging.error(f"Error loading settings: {e}")
-        os.makedirs(SETTINGS_DIR, exist_ok=True)  # Ensure directory exists
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(DEFAULT_SETTINGS, f, indent=4)
-        return DEFAULT_SETTINGS
-
-def save_settings(new_settings):
-    """Save updated settings to the file."""
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(new_settings, f, indent=4)
-    logging.info("Settings saved successfully!")
-
-def update_settings(key, value):
-    """Update a specific setting."""
-    settings = load_settings()
-    settings[key] = value
-    save_settings(settings)
-
-def load_icd10_codes():
-    try:
-        with open(ICD10_FILE, "r") as file:
-            return json.load(file)
-    except FileNotFoundError as e:
-        logging.error(f"FileNotFoundError: {e}")
-        return {}
-
-def save_icd10_codes(codes):
-    with open(ICD10_FILE, "w") as file:
-        json.dump(codes, file, indent=4)
-    logging.info("ICD-10 codes saved successfully!")
-
-def load_user_db():
-    try:
-        with open(USER_DB_FILE, "r") as file:
-            return json.load(file)
-    except FileNotFoundError as e:
-        logging.error(f"FileNotFoundError: {e}")
-        return {}
-
-def save_user_db(users):
-    with open(USER_DB_FILE, "w") as file:
-        json.dump(users, file, indent=4)
-    logging.info("User database saved successfully!")
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def load_cpt_codes():
-    try:
-        with open(CPT_FILE, "r") as file:
-            return json.load(file)
-    except FileNotFoundError as e:
-        logging.error(f"FileNotFoundError: {e}")
-        return {}
-
-def save_cpt_codes(codes):
-    with open(CPT_FILE, "w") as file:
-        json.dump(codes, file, indent=4)
-    logging.info("CPT codes saved successfully!")
-
-ICD10_CODES = load_icd10_codes()
-USER_DB = load_user_db()
-CPT_CODES = load_cpt_codes()
+LOGO_SIZE = (150, 150)
+LOGO_THUMBNAILS = ThumbnailCache(os.path.join(SETTINGS_DIR, "thumbnails"), LOGO_SIZE)
+
+@timed("gui.open_logo_image")
+def open_logo_image(path, default_path):
+    """I/O thread: (key, image) of a logo's cached thumbnail, falling back to the default image."""
+    if path:
+        try:
+            return LOGO_THUMBNAILS.thumbnail(path)
+        except FileNotFoundError:
+            logging.warning(f"Logo {path} not found. Using {default_path}.")
+        except Exception as e:
+            logging.warning(f"Failed to load image: {e}. Using {default_path}.")
+    return LOGO_THUMBNAILS.thumbnail(default_path)
+
+def copy_image(file_path, dest_path):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    shutil.copy(file_path, dest_path)
+
+def write_text_file(path, text):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_COMMAND = [sys.executable, '-m', 'unittest', 'discover', '-v', 'tests']
+BENCHMARK_COMMAND = [sys.executable, 'code_benchmark.py', '--sizes', '1000', '10000', '--rounds', '3']
 
 EVENT_DOUBLE_CLICK = "<Double-1>"
+SEARCH_RESULT_LIMIT = 100
+SEARCH_DEBOUNCE_MS = 250
+SEARCH_POLL_MS = 30
+SEARCH_BATCH_SIZE = 25
+IMPORT_BATCH_SIZE = 5000
+PERFORMANCE_REFRESH_MS = 1000
+RUNNER_POLL_MS = 100
+RUNNER_BATCH_LINES = 500
 
 class ICD10Explorer(ctk.CTk):
     def __init__(self):
         logging.info("Initializing ICD10Explorer.")
         try:
             # Initialize settings
-            ensure_settings_file()
-            self.settings = load_settings()
+            os.makedirs(SETTINGS_DIR, exist_ok=True)
+            self.settings = SettingsStore(SETTINGS_FILE, DEFAULT_SETTINGS)
 
             super().__init__()
             self.title(self.settings.get("login_title", "ICD-10 and CPT Codes Reference Guide"))
@@ -182,8 +111,18 @@ class ICD10Explorer(ctk.CTk):
             self.clinic_image_label = ctk.CTkLabel(self, text="")
             self.clinic_image_label.grid(row=0, column=2, pady=10, sticky="ne")
 
+            # Saves, copies and image decoding run here instead of on the Tk thread
+            self.io = IOExecutor()
+            use_io_executor(self.io)
+            self.settings.attach(self, self.io)  # Changes are written once typing/clicking settles
+            self.settings.subscribe("login_title", self.update_login_title)
+            self.settings.subscribe("bg_image_path", lambda path: self.load_login_image())
+            self.settings.subscribe("clinic_image_path", lambda path: self.load_login_image())
+
             # Load the login image
             self.login_photo = None
+            self.logo_photos = {}  # thumbnail key -> PhotoImage, for the logos on screen
+            self.logo_keys = {}  # photo attribute -> thumbnail key shown
             self.load_login_image()
 
             # Menu button
@@ -199,15 +138,19 @@ class ICD10Explorer(ctk.CTk):
             self.user_label_frame.grid(row=2, column=0, columnspan=3, padx=10, pady=10, sticky="se")
             self.user_label = ctk.CTkLabel(self.user_label_frame, text="", font=("Helvetica", 12), text_color="red")
             self.user_label.grid(padx=10, pady=5)
+            self.io_status_label = ctk.CTkLabel(self.user_label_frame, text="", font=("Helvetica", 12), text_color="#333333")
+            self.io_status_label.grid(row=0, column=1, padx=10, pady=5)
+            self.io.attach(self, self.show_io_status)
+            self.runners = set()  # Test/benchmark processes still running
 
             # Menu frame (initially hidden)
             self.menu_frame = ctk.CTkFrame(main_frame, corner_radius=15, fg_color="#e0e0e0")
             self.menu_frame.grid(row=0, column=0, padx=10, pady=50, sticky="ne")
             self.menu_frame.grid_remove()
 
-            self.test_button_1 = ctk.CTkButton(self.menu_frame, text="Test", command=lambda: print("Test selected"), corner_radius=15, fg_color="#4caf50", text_color="#ffffff")
-            self.test_button_2 = ctk.CTkButton(self.menu_frame, text="Test 1", command=lambda: print("Test 1 selected"), corner_radius=15, fg_color="#4caf50", text_color="#ffffff")
-            self.test_button_3 = ctk.CTkButton(self.menu_frame, text="Test 2", command=lambda: print("Test 2 selected"), corner_radius=15, fg_color="#4caf50", text_color="#ffffff")
+            self.test_button_1 = ctk.CTkButton(self.menu_frame, text="Test", command=lambda: logging.info("Test selected"), corner_radius=15, fg_color="#4caf50", text_color="#ffffff")
+            self.test_button_2 = ctk.CTkButton(self.menu_frame, text="Test 1", command=lambda: logging.info("Test 1 selected"), corner_radius=15, fg_color="#4caf50", text_color="#ffffff")
+            self.test_button_3 = ctk.CTkButton(self.menu_frame, text="Test 2", command=lambda: logging.info("Test 2 selected"), corner_radius=15, fg_color="#4caf50", text_color="#ffffff")
             # Initially hide test buttons
             self.test_buttons = [self.test_button_1, self.test_button_2, self.test_button_3]
             for button in self.test_buttons:
@@ -223,6 +166,22 @@ class ICD10Explorer(ctk.CTk):
             search_button = ctk.CTkButton(search_frame, text="Search", command=self.search_codes, corner_radius=15, fg_color="#4caf50", text_color="#ffffff")
             search_button.grid(row=0, column=1, padx=5)
 
+            self.fuzzy_var = ctk.BooleanVar(value=False)
+            fuzzy_check = ctk.CTkCheckBox(search_frame, text="Allow typos", variable=self.fuzzy_var, command=self.search_codes)
+            fuzzy_check.grid(row=0, column=2, padx=5)
+
+            # Search-as-you-type: keystrokes are debounced into background queries
+            self.search_session = IncrementalSearch(SEARCH_ENGINE)
+            self.search_queue = queue.Queue()
+            self.search_after_id = None
+            self.search_poll_id = None
+            self.search_thread = None
+            self.search_cancel = None
+            self.results_window = None
+            self.results_tree = None
+            self.result_keys = {}  # results tree item id -> (system, code)
+            self.search_entry.bind("<KeyRelease>", self.on_search_key)
+
             # Buttons to switch between ICD-10 and CPT Codes
             button_frame = ctk.CTkFrame(main_frame, corner_radius=15, fg_color="#e0e0e0")
             button_frame.grid(row=2, column=0, pady=10)
@@ -250,6 +209,8 @@ class ICD10Explorer(ctk.CTk):
             # Treeview for displaying codes
             self.tree = ttk.Treeview(main_frame, style="Custom.Treeview")
             self.tree.grid(row=3, column=0, padx=10, pady=10, sticky="nsew")
+            self.code_tree = LazyCodeTree(self.tree)  # Code rows load when a category opens
+            self.tree.bind(EVENT_DOUBLE_CLICK, self.display_code_info)
 
             self.context_menu = Menu(self, tearoff=0, bg="#ffffff", fg="#000000", activebackground="#4caf50", activeforeground="#ffffff")
             self.context_menu.add_command(label="✏️ Edit", command=self.edit_code)
@@ -265,15 +226,21 @@ class ICD10Explorer(ctk.CTk):
             self.protocol("WM_DELETE_WINDOW", self.on_closing)
             logging.info("ICD10Explorer initialized successfully.")
         except Exception as e:
-            error_message = str(e)
             solution = "Check the configuration and ensure all necessary files are present."
-            log_error(error_message, solution)
-            logging.error(f"Error: {error_message}")
-            sys.exit("An error occurred. Please check the error_log.json file for details.")
+            logging.exception(f"Error: {e}", extra={"solution": solution})
+            shutdown_logging()
+            sys.exit(f"An error occurred. Please check the {config.get('ERROR_LOG_FILE', ERROR_LOG_FILE)} file for details.")
+
+    def show_io_status(self, pending):
+        self.io_status_label.configure(text=f"Saving... ({pending} pending)" if pending else "")
 
     def on_closing(self):
         """Handle window close event."""
         logging.info("Application is closing.")
+        self.settings.flush()
+        for runner in list(self.runners):
+            runner.kill()  # They run in their own process group and would outlive the app
+        close_data()  # Also waits for the settings write
         self.destroy()
         if ctk.get_default_root():
             ctk.get_default_root().quit()  # Terminate mainloop
@@ -294,9 +261,21 @@ class ICD10Explorer(ctk.CTk):
             advanced_editor_button = ctk.CTkButton(menu_window, text="Advanced Editor", command=self.open_advanced_editor)
             advanced_editor_button.pack(pady=5)
 
+            import_codes_button = ctk.CTkButton(menu_window, text="Import Codes", command=self.import_code_file)
+            import_codes_button.pack(pady=5)
+
+            export_codes_button = ctk.CTkButton(menu_window, text="Export Codes", command=self.open_export_window)
+            export_codes_button.pack(pady=5)
+
             run_tests_button = ctk.CTkButton(menu_window, text="Run Tests", command=self.run_tests)
             run_tests_button.pack(pady=5)
 
+            run_benchmarks_button = ctk.CTkButton(menu_window, text="Run Benchmarks", command=self.run_benchmarks)
+            run_benchmarks_button.pack(pady=5)
+
+            performance_button = ctk.CTkButton(menu_window, text="Performance", command=self.open_performance_window)
+            performance_button.pack(pady=5)
+
             logout_button = ctk.CTkButton(menu_window, text="Log Out", command=self.logout)
             logout_button.pack(pady=5)
 
@@ -305,6 +284,167 @@ class ICD10Explorer(ctk.CTk):
         except Exception as e:
             logging.error(f"Error opening menu window: {e}")
 
+    def open_performance_window(self):
+        """Latency percentiles of the instrumented operations, refreshed while the window is open."""
+        try:
+            performance_window = ctk.CTkToplevel(self)
+            performance_window.title("Performance")
+            performance_window.geometry("700x400")
+
+            columns = ("Count", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Total s")
+            metrics_tree = ttk.Treeview(performance_window, columns=columns)
+            metrics_tree.heading("#0", text="Operation")
+            metrics_tree.column("#0", width=220)
+            for column in columns:
+                metrics_tree.heading(column, text=column)
+                metrics_tree.column(column, width=70, anchor="e", stretch=False)
+            metrics_tree.pack(expand=True, fill="both", padx=10, pady=10)
+
+            def refresh():
+                if not metrics_tree.winfo_exists():
+                    return
+                rows = {}
+                for item in metrics_tree.get_children():
+                    rows[metrics_tree.item(item, "text")] = item
+                for name, summary in METRICS.snapshot().items():
+                    values = (summary["count"], *(f"{summary[key] * 1000:.2f}" for key in ("p50", "p95", "p99", "max")),
+                              f"{summary['sum']:.2f}")
+                    if name in rows:
+                        metrics_tree.item(rows.pop(name), values=values)
+                    else:
+                        metrics_tree.insert('', 'end', text=name, values=values)
+                metrics_tree.delete(*rows.values())  # Gone after a reset
+                performance_window.after(PERFORMANCE_REFRESH_MS, refresh)
+
+            def export(render, extension):
+                file_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=[(extension, f"*{extension}")])
+                if file_path:
+                    self.io.submit(file_path, write_text_file, file_path, render(),
+                                   error=lambda e: messagebox.showerror("Error", f"Export failed: {e}"))
+
+            button_frame = ctk.CTkFrame(performance_window)
+            button_frame.pack(pady=10)
+            ctk.CTkButton(button_frame, text="Export JSON", command=lambda: export(METRICS.to_json, ".json")).grid(row=0, column=0, padx=5)
+            ctk.CTkButton(button_frame, text="Export Prometheus", command=lambda: export(METRICS.to_prometheus, ".prom")).grid(row=0, column=1, padx=5)
+            ctk.CTkButton(button_frame, text="Reset", command=METRICS.reset).grid(row=0, column=2, padx=5)
+            ctk.CTkButton(button_frame, text="Close", command=performance_window.destroy).grid(row=0, column=3, padx=5)
+            refresh()
+        except Exception as e:
+            logging.error(f"Error opening performance window: {e}")
+
+    def import_code_file(self):
+        """Bulk import a CMS release file into the code set being shown."""
+        try:
+            file_path = filedialog.askopenfilename(filetypes=[("Code release files", "*.txt *.csv *.xml"), ("All files", "*.*")])
+            if not file_path:
+                return
+            system = self.displayed_system()
+            self.import_next_batch(system, read_code_file(file_path), CodeMerger(system, code_set(system)))
+        except Exception as e:
+            self.show_import_error(e)
+
+    def import_next_batch(self, system, entries, merger):
+        # Batches are parsed on the I/O executor and merged on the Tk thread, one
+        # at a time, so the file is never held in memory as a whole
+        def failed(e):
+            entries.close()
+            self.show_import_error(e)
+        self.io.submit(None, lambda: list(islice(entries, IMPORT_BATCH_SIZE)),
+                       callback=lambda batch: self.merge_import_batch(system, entries, merger, batch),
+                       error=failed)
+
+    def merge_import_batch(self, system, entries, merger, batch):
+        try:
+            codes = code_set(system)
+            if batch:
+                with DATA_LOCK:
+                    merger.merge(batch)
+                self.import_next_batch(system, entries, merger)
+                return
+            added, updated, unclassified = merger.counts()
+            # One snapshot write and one index/locator sync for the whole file
+            if system == CPT_SYSTEM:
+                save_cpt_codes(codes)
+            else:
+                save_icd10_codes(codes)
+            if self.code_tree.showing(codes):
+                self.populate_tree(codes)
+            messagebox.showinfo("Import Complete", f"{system}: {added} added, {updated} updated, {unclassified} skipped (no matching category).")
+        except Exception as e:
+            entries.close()
+            self.show_import_error(e)
+
+    def show_import_error(self, e):
+        logging.error(f"Error importing codes: {e}")
+        messagebox.showerror("Error", f"Import failed: {e}")
+
+    def open_export_window(self):
+        try:
+            export_window = ctk.CTkToplevel(self)
+            export_window.title("Export Codes")
+
+            ctk.CTkLabel(export_window, text="Code System:").grid(row=0, column=0, padx=5, pady=5)
+            system_var = ctk.StringVar(value="All")
+            system_menu = ctk.CTkComboBox(export_window, variable=system_var, values=["All", ICD10_SYSTEM, CPT_SYSTEM])
+            system_menu.grid(row=0, column=1, padx=5, pady=5)
+
+            ctk.CTkLabel(export_window, text="Category:").grid(row=1, column=0, padx=5, pady=5)
+            category_var = ctk.StringVar(value="All")
+            category_menu = ctk.CTkComboBox(export_window, variable=category_var, values=["All"] + list(ICD10_CODES) + list(CPT_CODES))
+            category_menu.grid(row=1, column=1, padx=5, pady=5)
+
+            ctk.CTkLabel(export_window, text="Code Range (e.g. A00-B99):").grid(row=2, column=0, padx=5, pady=5)
+            range_entry = ctk.CTkEntry(export_window)
+            range_entry.grid(row=2, column=1, padx=5, pady=5)
+
+            ctk.CTkLabel(export_window, text="Search Query:").grid(row=3, column=0, padx=5, pady=5)
+            query_entry = ctk.CTkEntry(export_window)
+            query_entry.grid(row=3, column=1, padx=5, pady=5)
+
+            ctk.CTkLabel(export_window, text="Format:").grid(row=4, column=0, padx=5, pady=5)
+            format_var = ctk.StringVar(value=EXPORT_FORMATS[0])
+            format_menu = ctk.CTkComboBox(export_window, variable=format_var, values=list(EXPORT_FORMATS))
+            format_menu.grid(row=4, column=1, padx=5, pady=5)
+
+            def run_export():
+                try:
+                    export_format = format_var.get()
+                    file_path = filedialog.asksaveasfilename(defaultextension=f".{export_format}",
+                                                             filetypes=[(export_format.upper(), f"*.{export_format}")])
+                    if not file_path:
+                        return
+                    system = system_var.get()
+                    category = category_var.get()
+                    # Rows are generated inside the I/O job, copying one category at a time under DATA_LOCK
+                    rows = iter_export_rows(
+                        ICD10_CODES, CPT_CODES,
+                        systems=None if system == "All" else [system],
+                        categories=None if category == "All" else [category],
+                        code_range=parse_code_range(range_entry.get().strip()),
+                        query=query_entry.get().strip(),
+                        index=SEARCH_INDEX, lock=DATA_LOCK)
+                    export_button.configure(state="disabled", text="Exporting...")
+
+                    def exported(count):
+                        messagebox.showinfo("Export Complete", f"Exported {count} codes to {file_path}")
+                        if export_window.winfo_exists():
+                            export_window.destroy()
+
+                    def failed(e):
+                        if export_button.winfo_exists():
+                            export_button.configure(state="normal", text="Export")
+                        messagebox.showerror("Error", f"Export failed: {e}")
+
+                    self.io.submit(file_path, export_codes, rows, file_path, export_format, callback=exported, error=failed)
+                except Exception as e:
+                    logging.error(f"Error exporting codes: {e}")
+                    messagebox.showerror("Error", f"Export failed: {e}")
+
+            export_button = ctk.CTkButton(export_window, text="Export", command=run_export)
+            export_button.grid(row=5, column=0, columnspan=2, pady=10)
+        except Exception as e:
+            logging.error(f"Error opening export window: {e}")
+
     def logout(self):
         try:
             self.logged_in_user = None  # Clear the logged-in user
@@ -379,13 +519,12 @@ class ICD10Explorer(ctk.CTk):
                         messagebox.showerror("Error", "Username already exists!")
                         return
 
-                    USER_DB[username] = {
+                    store_user(username, {
                         "password": hash_password(password),
                         "first_name": first_name,
                         "last_name": last_name,
                         "provider_type": provider_type
-                    }
-                    save_user_db(USER_DB)
+                    })
                     messagebox.showinfo("Success", "User added successfully!")
                     add_user_window.destroy()
                 except Exception as e:
@@ -478,20 +617,24 @@ class ICD10Explorer(ctk.CTk):
         file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.jpeg *.png *.gif")])
         if file_path:
             user_images_dir = os.path.expanduser("~/icd10_explorer_images")
-            os.makedirs(user_images_dir, exist_ok=True)
             dest_path = os.path.join(user_images_dir, os.path.basename(file_path))
-            try:
-                shutil.copy(file_path, dest_path)
-                if logo_type == "login":
-                    self.settings["bg_image_path"] = dest_path
-                elif logo_type == "clinic":
-                    self.settings["clinic_image_path"] = dest_path
-                save_settings(self.settings)
-                self.load_login_image()
-            except Exception as e:
+
+            def copied(result):
+                # Subscribers reload the logos; the store writes the file
+                setting = {"login": "bg_image_path", "clinic": "clinic_image_path"}.get(logo_type)
+                if setting is None:
+                    return
+                if self.settings.get(setting) == dest_path:
+                    self.load_login_image()  # Same path, new file: no change to notify, but a new thumbnail key
+                else:
+                    self.settings[setting] = dest_path
+
+            def failed(e):
                 logging.error(f"Error copying image: {e}")
                 messagebox.showerror("Error", "Failed to upload image.")
 
+            self.io.submit(dest_path, copy_image, file_path, dest_path, callback=copied, error=failed)
+
     def admin_login(self, parent_window):
         try:
             parent_window.withdraw()
@@ -557,10 +700,9 @@ class ICD10Explorer(ctk.CTk):
                     new_title = title_entry.get().strip()
 
                     if new_title:
-                        self.settings["login_title"] = new_title
-                        self.login_title_label.configure(text=new_title)  # Update the login title label
+                        self.settings["login_title"] = new_title  # Subscribers update the title labels
 
-                    save_settings(self.settings)
+                    self.settings.flush()
                     messagebox.showinfo("Success", "Settings saved successfully!")
                 except Exception as e:
                     logging.error(f"Error saving admin settings: {e}")
@@ -581,8 +723,11 @@ class ICD10Explorer(ctk.CTk):
         except Exception as e:
             logging.error(f"Error opening admin settings: {e}")
 
-    def update_login_title(self):
-        self.login_title_label.configure(text=self.settings["login_title"])
+    def update_login_title(self, title):
+        self.title(title)
+        label = getattr(self, "login_title_label", None)
+        if label is not None and label.winfo_exists():
+            label.configure(text=title)
 
     def back_to_login(self, current_window, previous_window):
         current_window.destroy()
@@ -633,13 +778,12 @@ class ICD10Explorer(ctk.CTk):
                         messagebox.showerror("Error", "Username already exists!")
                         return
 
-                    USER_DB[username] = {
+                    store_user(username, {
                         "password": hash_password(password),
                         "first_name": first_name,
                         "last_name": last_name,
                         "provider_type": provider_type
-                    }
-                    save_user_db(USER_DB)
+                    })
                     messagebox.showinfo("Success", "User added successfully!")
                     create_account_window.destroy()
                     parent_window.deiconify()
@@ -666,78 +810,135 @@ class ICD10Explorer(ctk.CTk):
                 self.add_new_code_button.configure(command=self.add_new_code)
                 self.add_new_category_button.configure(command=self.create_new_category)
 
+    def bind_category_suggestion(self, code_entry, category_var, system):
+        """Pick the category whose code range covers the code as it is typed."""
+        def suggest(event=None):
+            category = suggest_category(system, code_entry.get())
+            if category is not None:
+                category_var.set(category)
+        code_entry.bind("<KeyRelease>", suggest)
+
+    @timed("gui.populate_tree")
     def populate_tree(self, codes):
-        self.tree.delete(*self.tree.get_children())  # Clear the tree before populating
-        for category, codes in codes.items():
-            parent = self.tree.insert('', 'end', text=category, open=False)
-            if isinstance(codes, dict):
-                for code, description in codes.items():
-                    self.tree.insert(parent, 'end', text=f"{code}: {description}")
+        self.code_tree.populate(codes)  # Only category rows; codes are inserted on <<TreeviewOpen>>
 
     def show_icd10_codes(self):
         self.populate_tree(ICD10_CODES)
 
     def show_cpt_codes(self):
         self.current_tab = "CPT"
-        self.tree.delete(*self.tree.get_children())  # Clear the tree before populating
-        for category, codes in CPT_CODES.items():
-            parent = self.tree.insert('', 'end', text=category, open=False)
-            for code_info in codes:
-                code = code_info["code"]
-                description = code_info["description"]
-                self.tree.insert(parent, 'end', text=f"{code}: {description}")
+        self.populate_tree(CPT_CODES)
+
+    def on_search_key(self, event=None):
+        """Restart the debounce timer so a query only runs once typing pauses."""
+        if event is not None and event.keysym == "Return":
+            return
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.search_codes)
 
     def search_codes(self):
+        """Cancel any query still running and start a new one on a worker thread."""
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        if self.search_cancel is not None:
+            self.search_cancel.set()
+
         query = self.search_entry.get().lower()
-        results_window = ctk.CTkToplevel(self)
-        results_window.title("Search Results")
-        results_window.geometry("600x400")
+        if not query.strip():
+            if self.results_tree is not None and self.results_tree.winfo_exists():
+                self.results_tree.delete(*self.results_tree.get_children())
+            return
 
-        results_tree = ttk.Treeview(results_window)
-        results_tree.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        cancelled = self.search_cancel = threading.Event()
+        self.search_thread = threading.Thread(target=self.run_search, args=(query, cancelled, self.fuzzy_var.get(), time.perf_counter()), daemon=True)
+        self.search_thread.start()
+        if self.search_poll_id is None:
+            self.search_poll_id = self.after(SEARCH_POLL_MS, self.poll_search_results)
 
-        for category, codes in ICD10_CODES.items():
-            matching_codes = {code: desc for code, desc in codes.items() if query in code.lower() or query in desc.lower()}
-            if matching_codes:
-                parent = results_tree.insert('', 'end', text=category, open=True)
-                for code, description in matching_codes.items():
-                    results_tree.insert(parent, 'end', text=f"{code}: {description}")
+    def run_search(self, query, cancelled, fuzzy=False, started=None):
+        """Worker thread: run one query and queue the results for the Tk thread."""
+        try:
+            results = self.search_session.search(query, limit=SEARCH_RESULT_LIMIT, cancelled=cancelled, fuzzy=fuzzy)
+        except Exception as e:
+            logging.error(f"Error searching for '{query}': {e}")
+            return
+        if results is not None:
+            self.search_queue.put((query, results, cancelled, started))
 
-        results_tree.bind(EVENT_DOUBLE_CLICK, lambda event: self.display_code_info_from_results(event, results_tree))
+    def poll_search_results(self):
+        """Hand finished queries to the result view; Tk is only touched on its own thread."""
+        running = self.search_thread is not None and self.search_thread.is_alive()
+        try:
+            while True:
+                query, results, cancelled, started = self.search_queue.get_nowait()
+                if not cancelled.is_set():
+                    self.show_search_results(query, results, cancelled)
+                    if started is not None:
+                        METRICS.observe("gui.search_to_results", time.perf_counter() - started)
+        except queue.Empty:
+            pass
+        self.search_poll_id = self.after(SEARCH_POLL_MS, self.poll_search_results) if running else None
+
+    def get_results_tree(self):
+        """Return the persistent search results tree, creating its window if needed."""
+        if self.results_window is None or not self.results_window.winfo_exists():
+            self.results_window = ctk.CTkToplevel(self)
+            self.results_window.title("Search Results")
+            self.results_window.geometry("600x400")
+
+            results_tree = ttk.Treeview(self.results_window, columns=("System", "Category", "Score"))
+            results_tree.heading("#0", text="Code")
+            results_tree.heading("System", text="System")
+            results_tree.heading("Category", text="Category")
+            results_tree.heading("Score", text="Score")
+            results_tree.column("System", width=70, stretch=False)
+            results_tree.column("Score", width=70, stretch=False)
+            results_tree.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+            results_tree.bind(EVENT_DOUBLE_CLICK, lambda event: self.display_code_info_from_results(event, results_tree))
+            self.results_tree = results_tree
+            self.search_entry.focus_set()  # Keep typing in the main window
+        return self.results_tree
+
+    @timed("gui.show_search_results")
+    def show_search_results(self, query, results, cancelled):
+        results_tree = self.get_results_tree()
+        results_tree.delete(*results_tree.get_children())
+        self.result_keys = {}
+        self.results_window.title(f"Search Results - {query} ({len(results)})")
+        self.insert_search_results(results_tree, results, 0, cancelled)
+
+    def insert_search_results(self, results_tree, results, start, cancelled):
+        """Insert results in small batches so a newer query can interrupt the rendering."""
+        if cancelled.is_set() or not results_tree.winfo_exists():
+            return
+        end = start + SEARCH_BATCH_SIZE
+        for result in results[start:end]:
+            item = results_tree.insert('', 'end', text=f"{result.code}: {result.description}",
+                                       values=(result.system, result.category, result.score))
+            self.result_keys[item] = (result.system, result.code)
+        if end < len(results):
+            self.after(1, self.insert_search_results, results_tree, results, end, cancelled)
 
     def display_code_info(self, event):
         selected_item = self.tree.selection()
-        if not selected_item:
-            return
-        item_text = self.tree.item(selected_item[0], 'text')
-        if ":" in item_text:
-            code, description = item_text.split(": ", 1)
-            details = (
-                f"ICD-10 Code: {code}\n"
-                f"Description: {description}\n\n"
-                "Documentation Tips:\n"
-                "- Document diagnosis with specificity.\n"
-                "- Include relevant medical history.\n"
-                "- Link diagnosis to treatment provided."
-            )
-            messagebox.showinfo("ICD-10 Code Details", details)
+        if selected_item:
+            code = self.code_tree.code_of(selected_item[0])
+            if code is not None:
+                self.show_code_details(self.displayed_system(), code)
 
     def display_code_info_from_results(self, event, tree):
         selected_item = tree.selection()
-        if not selected_item:
+        if selected_item and selected_item[0] in self.result_keys:
+            self.show_code_details(*self.result_keys[selected_item[0]])
+
+    def show_code_details(self, system, code):
+        detail = code_detail(system, code)  # Cached per (system, code) until the next edit
+        if detail is None:
+            messagebox.showerror("Error", f"Code {code} no longer exists!")
             return
-        item_text = tree.item(selected_item[0], 'text')
-        if ":" in item_text:
-            code, description = item_text.split(": ", 1)
-            details = (
-                f"ICD-10 Code: {code}\n"
-                f"Description: {description}\n\n"
-                "Documentation Tips:\n"
-                "- Document diagnosis with specificity.\n"
-                "- Include relevant medical history.\n"
-                "- Link diagnosis to treatment provided."
-            )
-            messagebox.showinfo("ICD-10 Code Details", details)
+        messagebox.showinfo(f"{system} Code Details", format_code_detail(detail))
 
     def add_new_code(self):
         add_window = ctk.CTkToplevel(self)
@@ -753,6 +954,7 @@ class ICD10Explorer(ctk.CTk):
         ctk.CTkLabel(add_window, text="ICD-10 Code:").grid(row=1, column=0, padx=5, pady=5)
         code_entry = ctk.CTkEntry(add_window)
         code_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.bind_category_suggestion(code_entry, category_var, ICD10_SYSTEM)
 
         ctk.CTkLabel(add_window, text="Description:").grid(row=2, column=0, padx=5, pady=5)
         desc_entry = ctk.CTkEntry(add_window)
@@ -768,10 +970,14 @@ class ICD10Explorer(ctk.CTk):
                     messagebox.showerror("Error", "Code and description cannot be empty!")
                     return  # Ensure the function returns here
 
+                existing_category = CODE_LOCATOR.category_of(ICD10_SYSTEM, code)
+                if existing_category is not None:
+                    messagebox.showerror("Error", f"Code {code} already exists in {existing_category}!")
+                    return
+
                 if category in ICD10_CODES:
-                    ICD10_CODES[category][code] = description
-                    save_icd10_codes(ICD10_CODES)
-                    self.populate_tree(ICD10_CODES)
+                    store_icd10_code(category, code, description)
+                    self.code_tree.insert_code(ICD10_CODES, category, code, description)
                     messagebox.showinfo("Success", f"Code {code} added to {category}!")
                     add_window.destroy()
                 else:
@@ -808,12 +1014,13 @@ class ICD10Explorer(ctk.CTk):
                     messagebox.showerror("Error", "Category name cannot be empty!")
                     return
 
+                if code and CODE_LOCATOR.category_of(ICD10_SYSTEM, code) is not None:
+                    messagebox.showerror("Error", f"Code {code} already exists in {CODE_LOCATOR.category_of(ICD10_SYSTEM, code)}!")
+                    return
+
                 if category not in ICD10_CODES:
-                    ICD10_CODES[category] = {}
-                    if code and description:
-                        ICD10_CODES[category][code] = description
-                    save_icd10_codes(ICD10_CODES)
-                    self.populate_tree(ICD10_CODES)
+                    store_icd10_category(category, {code: description} if code and description else {})
+                    self.code_tree.insert_category(ICD10_CODES, category)
                     messagebox.showinfo("Success", f"New category '{category}' created!")
                     new_cat_window.destroy()
                 else:
@@ -841,9 +1048,8 @@ class ICD10Explorer(ctk.CTk):
                     return
 
                 if category not in CPT_CODES:
-                    CPT_CODES[category] = []
-                    save_cpt_codes(CPT_CODES)
-                    self.populate_tree(CPT_CODES)
+                    store_cpt_category(category)
+                    self.code_tree.insert_category(CPT_CODES, category)
                     messagebox.showinfo("Success", f"New category '{category}' created!")
                     new_cat_window.destroy()
                 else:
@@ -866,19 +1072,23 @@ class ICD10Explorer(ctk.CTk):
             if not selected_item:
                 messagebox.showerror("Error", "No code selected to edit!")
                 return
-            item_text = self.tree.item(selected_item[0], 'text')
-            if ":" in item_text:
-                code, description = item_text.split(": ", 1)
-                self.open_edit_window(code, description)
+            code = self.code_tree.code_of(selected_item[0])
+            if code is not None:
+                system = self.displayed_system()
+                self.open_edit_window(code, code_detail(system, code).description, system)
         except Exception as e:
             logging.error(f"Error editing code: {e}")
 
-    def open_edit_window(self, code, description):
+    def displayed_system(self):
+        """Return the code system the main tree is currently showing."""
+        return CPT_SYSTEM if self.code_tree.showing(CPT_CODES) else ICD10_SYSTEM
+
+    def open_edit_window(self, code, description, system=ICD10_SYSTEM):
         try:
             edit_window = ctk.CTkToplevel(self)
-            edit_window.title("Edit ICD-10 Code")
+            edit_window.title(f"Edit {system} Code")
 
-            ctk.CTkLabel(edit_window, text="ICD-10 Code:").grid(row=0, column=0, padx=5, pady=5)
+            ctk.CTkLabel(edit_window, text=f"{system} Code:").grid(row=0, column=0, padx=5, pady=5)
             code_entry = ctk.CTkEntry(edit_window)
             code_entry.insert(0, code)
             code_entry.grid(row=0, column=1, padx=5, pady=5)
@@ -897,27 +1107,23 @@ class ICD10Explorer(ctk.CTk):
                         messagebox.showerror("Error", "Code and description cannot be empty!")
                         return
 
-                    for category, codes in ICD10_CODES.items():
-                        if code in codes:
-                            del codes[code]
-                            codes[new_code] = new_description
-                            save_icd10_codes(ICD10_CODES)
-                            self.populate_tree(ICD10_CODES)
-                            messagebox.showinfo("Success", f"Code {code} updated to {new_code}!")
-                            edit_window.destroy()
+                    if new_code != code and CODE_LOCATOR.category_of(system, new_code) is not None:
+                        messagebox.showerror("Error", f"Code {new_code} already exists in {CODE_LOCATOR.category_of(system, new_code)}!")
+                        return
+
+                    if rename_code(system, code, new_code, new_description):
+                        self.code_tree.update_code(code_set(system), code, new_code, new_description)
+                        messagebox.showinfo("Success", f"Code {code} updated to {new_code}!")
+                        edit_window.destroy()
                 except Exception as e:
                     logging.error(f"Error saving changes: {e}")
 
             def delete_code():
                 try:
-                    for category, codes in ICD10_CODES.items():
-                        if code in codes:
-                            del codes[code]
-                            save_icd10_codes(ICD10_CODES)
-                            self.populate_tree(ICD10_CODES)
-                            messagebox.showinfo("Success", f"Code {code} deleted!")
-                            edit_window.destroy()
-                            return
+                    if remove_code(system, code):
+                        self.code_tree.delete_code(code_set(system), code)
+                        messagebox.showinfo("Success", f"Code {code} deleted!")
+                        edit_window.destroy()
                 except Exception as e:
                     logging.error(f"Error deleting code: {e}")
 
@@ -935,81 +1141,50 @@ class ICD10Explorer(ctk.CTk):
             if not selected_item:
                 messagebox.showerror("Error", "No item selected to delete!")
                 return
-            item_text = self.tree.item(selected_item[0], 'text')
-            if ":" in item_text:
-                code, description = item_text.split(": ", 1)
-                for category, codes in ICD10_CODES.items():
-                    if code in codes:
-                        del codes[code]
-                        save_icd10_codes(ICD10_CODES)
-                        self.populate_tree(ICD10_CODES)
-                        messagebox.showinfo("Success", f"Code {code} deleted!")
-                        return
-            else:
-                category = item_text
-                if category in ICD10_CODES:
-                    del ICD10_CODES[category]
-                    save_icd10_codes(ICD10_CODES)
-                    self.populate_tree(ICD10_CODES)
+            system = self.displayed_system()
+            codes = code_set(system)
+            code = self.code_tree.code_of(selected_item[0])
+            category = self.code_tree.category_of(selected_item[0])
+            if code is not None:
+                if remove_code(system, code):
+                    self.code_tree.delete_code(codes, code)
+                    messagebox.showinfo("Success", f"Code {code} deleted!")
+            elif category is not None:
+                if category in codes:
+                    remove_category(system, category)
+                    self.code_tree.delete_category(codes, category)
                     messagebox.showinfo("Success", f"Category {category} deleted!")
         except Exception as e:
             logging.error(f"Error deleting selected item: {e}")
 
     def load_login_image(self):
+        """Show both logos: the last ones at once, then the current thumbnails from the I/O executor."""
+        images_dir = os.path.join(os.path.dirname(__file__), 'images')
+        for label, photo_attr, setting, default in (
+                (self.login_image_label, "login_photo", "bg_image_path", "login_default.png"),
+                (self.clinic_image_label, "clinic_photo", "clinic_image_path", "clinic_default.png")):
+            key = self.logo_keys.get(photo_attr)
+            if key in self.logo_photos:
+                # Usually still current; the check below swaps it if the file or setting changed
+                self.show_logo(label, photo_attr, key, None)
+            self.io.submit(("logo", photo_attr, str(label)), open_logo_image,
+                           self.settings.get(setting), os.path.join(images_dir, default),
+                           callback=lambda result, label=label, photo_attr=photo_attr: self.show_logo(label, photo_attr, *result))
+
+    @timed("gui.show_logo")
+    def show_logo(self, label, photo_attr, key, image):
+        """Tk thread: show the logo thumbnail key in label, making its PhotoImage on first use."""
         try:
-            print("Loading login image...")
-            if self.settings.get("bg_image_path"):
-                try:
-                    print(f"Attempting to open image: {self.settings['bg_image_path']}")
-                    login_image = Image.open(self.settings["bg_image_path"])
-                    print("Image opened successfully.")
-                except FileNotFoundError:
-                    print("File not found error. Using default login image.")
-                    login_image = Image.open(os.path.join(os.path.dirname(__file__), 'images', 'login_default.png'))
-                except Exception as e:
-                    print(f"Failed to load image: {e}. Using default login image.")
-                    login_image = Image.open(os.path.join(os.path.dirname(__file__), 'images', 'login_default.png'))
-            else:
-                print("No background image path set. Using default login image.")
-                login_image = Image.open(os.path.join(os.path.dirname(__file__), 'images', 'login_default.png'))
-
-            login_image = login_image.resize((150, 150), Image.LANCZOS)  # Resize the image to 150x150
-            print("Image resized successfully.")
-            self.login_photo = ImageTk.PhotoImage(login_image)  # Use PhotoImage instead of CTkImage
-            print("PhotoImage created successfully.")
-            
-            # Display the image inside the label
-            self.login_image_label.configure(image=self.login_photo)
-            self.login_image_label.image = self.login_photo  # Keep a reference to the image
-            
-            print("Login image label configured successfully.")
-            
-            print("Loading clinic image...")
-            if self.settings.get("clinic_image_path"):
-                try:
-                    print(f"Attempting to open image: {self.settings['clinic_image_path']}")
-                    clinic_image = Image.open(self.settings["clinic_image_path"])
-                    print("Image opened successfully.")
-                except FileNotFoundError:
-                    print("File not found error. Using default clinic image.")
-                    clinic_image = Image.open(os.path.join(os.path.dirname(__file__), 'images', 'clinic_default.png'))
-                except Exception as e:
-                    print(f"Failed to load image: {e}. Using default clinic image.")
-                    clinic_image = Image.open(os.path.join(os.path.dirname(__file__), 'images', 'clinic_default.png'))
-            else:
-                print("No clinic image path set. Using default clinic image.")
-                clinic_image = Image.open(os.path.join(os.path.dirname(__file__), 'images', 'clinic_default.png'))
-
-            clinic_image = clinic_image.resize((150, 150), Image.LANCZOS)  # Resize the image to 150x150
-            print("Image resized successfully.")
-            self.clinic_photo = ImageTk.PhotoImage(clinic_image)  # Use PhotoImage instead of CTkImage
-            print("PhotoImage created successfully.")
-            
-            # Display the image inside the label
-            self.clinic_image_label.configure(image=self.clinic_photo)
-            self.clinic_image_label.image = self.clinic_photo  # Keep a reference to the image
-            
-            print("Clinic image label configured successfully.")
+            photo = self.logo_photos.get(key)
+            if photo is None:
+                photo = self.logo_photos[key] = ImageTk.PhotoImage(image)  # Use PhotoImage instead of CTkImage
+            self.logo_keys[photo_attr] = key
+            for unused in set(self.logo_photos) - set(self.logo_keys.values()):
+                del self.logo_photos[unused]
+            setattr(self, photo_attr, photo)
+            if label.winfo_exists():
+                label.configure(image=photo)
+                label.image = photo  # Keep a reference to the image
         except Exception as e:
             logging.error(f"Error loading login image: {e}")
 
@@ -1027,14 +1202,9 @@ class ICD10Explorer(ctk.CTk):
             icd10_frame = ctk.CTkFrame(notebook)
             notebook.add(icd10_frame, text="ICD-10 Codes")
 
-            icd10_tree = ttk.Treeview(icd10_frame, columns=("Code", "Description"), show="headings")
-            icd10_tree.heading("Code", text="Code")
-            icd10_tree.heading("Description", text="Description")
+            icd10_tree = VirtualTreeview(icd10_frame, columns=("Code", "Description"))
             icd10_tree.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-
-            for category, codes in ICD10_CODES.items():
-                for code, description in codes.items():
-                    icd10_tree.insert("", "end", values=(code, description))
+            icd10_tree.set_rows((code, description) for code, category, description in iter_icd10_entries(ICD10_CODES))
 
             def add_icd10_code():
                 add_window = ctk.CTkToplevel(editor_window)
@@ -1049,6 +1219,7 @@ class ICD10Explorer(ctk.CTk):
                 ctk.CTkLabel(add_window, text="Code:").grid(row=1, column=0, padx=5, pady=5)
                 code_entry = ctk.CTkEntry(add_window)
                 code_entry.grid(row=1, column=1, padx=5, pady=5)
+                self.bind_category_suggestion(code_entry, category_var, ICD10_SYSTEM)
 
                 ctk.CTkLabel(add_window, text="Description:").grid(row=2, column=0, padx=5, pady=5)
                 desc_entry = ctk.CTkEntry(add_window)
@@ -1064,10 +1235,14 @@ class ICD10Explorer(ctk.CTk):
                             messagebox.showerror("Error", "Code and description cannot be empty!")
                             return  # Ensure the function returns here
 
+                        existing_category = CODE_LOCATOR.category_of(ICD10_SYSTEM, code)
+                        if existing_category is not None:
+                            messagebox.showerror("Error", f"Code {code} already exists in {existing_category}!")
+                            return
+
                         if category in ICD10_CODES:
-                            ICD10_CODES[category][code] = description
-                            save_icd10_codes(ICD10_CODES)
-                            icd10_tree.insert("", "end", values=(code, description))
+                            store_icd10_code(category, code, description)
+                            icd10_tree.append((code, description))
                             messagebox.showinfo("Success", f"Code {code} added to {category}!")
                             add_window.destroy()
                         else:
@@ -1085,17 +1260,9 @@ class ICD10Explorer(ctk.CTk):
             cpt_frame = ctk.CTkFrame(notebook)
             notebook.add(cpt_frame, text="CPT Codes")
 
-            cpt_tree = ttk.Treeview(cpt_frame, columns=("Category", "Code", "Description"), show="headings")
-            cpt_tree.heading("Category", text="Category")
-            cpt_tree.heading("Code", text="Code")
-            cpt_tree.heading("Description", text="Description")
+            cpt_tree = VirtualTreeview(cpt_frame, columns=("Category", "Code", "Description"))
             cpt_tree.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-
-            for category, codes in CPT_CODES.items():
-                for code_info in codes:
-                    code = code_info["code"]
-                    description = code_info["description"]
-                    cpt_tree.insert("", "end", values=(category, code, description))
+            cpt_tree.set_rows((category, code, description) for code, category, description in iter_cpt_entries(CPT_CODES))
 
             def add_cpt_code():
                 add_window = ctk.CTkToplevel(editor_window)
@@ -1110,6 +1277,7 @@ class ICD10Explorer(ctk.CTk):
                 ctk.CTkLabel(add_window, text="Code:").grid(row=1, column=0, padx=5, pady=5)
                 code_entry = ctk.CTkEntry(add_window)
                 code_entry.grid(row=1, column=1, padx=5, pady=5)
+                self.bind_category_suggestion(code_entry, category_var, CPT_SYSTEM)
 
                 ctk.CTkLabel(add_window, text="Description:").grid(row=2, column=0, padx=5, pady=5)
                 desc_entry = ctk.CTkEntry(add_window)
@@ -1125,10 +1293,14 @@ class ICD10Explorer(ctk.CTk):
                             messagebox.showerror("Error", "Code and description cannot be empty!")
                             return  # Ensure the function returns here
 
+                        existing_category = CODE_LOCATOR.category_of(CPT_SYSTEM, code)
+                        if existing_category is not None:
+                            messagebox.showerror("Error", f"Code {code} already exists in {existing_category}!")
+                            return
+
                         if category in CPT_CODES:
-                            CPT_CODES[category].append({"code": code, "description": description})
-                            save_cpt_codes(CPT_CODES)
-                            cpt_tree.insert("", "end", values=(category, code, description))
+                            store_cpt_code(category, code, description)
+                            cpt_tree.append((category, code, description))
                             messagebox.showinfo("Success", f"Code {code} added to {category}!")
                             add_window.destroy()
                         else:
@@ -1199,13 +1371,12 @@ class ICD10Explorer(ctk.CTk):
                             messagebox.showerror("Error", "Username already exists!")
                             return
 
-                        USER_DB[username] = {
+                        store_user(username, {
                             "password": hash_password(password),
                             "first_name": first_name,
                             "last_name": last_name,
                             "provider_type": provider_type
-                        }
-                        save_user_db(USER_DB)
+                        })
                         user_tree.insert("", "end", values=(username, first_name, last_name, provider_type))
                         messagebox.showinfo("Success", "User added successfully!")
                         add_user_window.destroy()
@@ -1221,22 +1392,72 @@ class ICD10Explorer(ctk.CTk):
             logging.error(f"Error opening advanced editor: {e}")
 
     def run_tests(self):
+        self.open_runner_window("Test Results", TEST_COMMAND)
+
+    def run_benchmarks(self):
+        self.open_runner_window("Benchmark Results", BENCHMARK_COMMAND)
+
+    def open_runner_window(self, title, command):
+        """Run command in the background, streaming its output into a results window."""
         try:
-            result = subprocess.run(['python', '-m', 'unittest', 'discover', 'tests'], capture_output=True, text=True)
-            test_results_window = ctk.CTkToplevel(self)
-            test_results_window.title("Test Results")
-            test_results_window.geometry("600x400")
-
-            results_text = ctk.CTkTextbox(test_results_window)
-            results_text.insert("1.0", result.stdout)
-            results_text.insert("end", result.stderr)
+            runner = ProcessRunner(command, cwd=APP_DIR).start()
+        except OSError as e:
+            logging.error(f"Error starting {title.lower()}: {e}")
+            messagebox.showerror("Error", f"Could not start {' '.join(command)}: {e}")
+            return
+        self.runners.add(runner)
+        try:
+            runner_window = ctk.CTkToplevel(self)
+            runner_window.title(title)
+            runner_window.geometry("700x450")
+
+            status_label = ctk.CTkLabel(runner_window, text="Running... 0.0s")
+            status_label.pack(pady=5)
+
+            results_text = ctk.CTkTextbox(runner_window)
+            results_text.tag_config(STDERR, foreground="#c62828")
             results_text.configure(state="disabled")
             results_text.pack(expand=True, fill="both")
 
-            close_button = ctk.CTkButton(test_results_window, text="Close", command=test_results_window.destroy)
-            close_button.pack(pady=10)
+            button_frame = ctk.CTkFrame(runner_window)
+            button_frame.pack(pady=10)
+            cancel_button = ctk.CTkButton(button_frame, text="Cancel", command=runner.cancel, fg_color="#f44336")
+            cancel_button.grid(row=0, column=0, padx=5)
+
+            def close():
+                runner.cancel()  # Closing the window stops the run too
+                runner_window.destroy()
+
+            ctk.CTkButton(button_frame, text="Close", command=close).grid(row=0, column=1, padx=5)
+            runner_window.protocol("WM_DELETE_WINDOW", close)
+
+            def poll():
+                if not runner_window.winfo_exists():
+                    runner.cancel()
+                    return
+                events = runner.events(RUNNER_BATCH_LINES)
+                at_end = results_text.yview()[1] >= 1.0  # Only follow the output if the user hasn't scrolled up
+                results_text.configure(state="normal")
+                for stream, line in events:
+                    if stream == EXIT:
+                        self.runners.discard(runner)
+                        outcome = "Cancelled" if runner.cancelled else f"Finished with exit code {line}"
+                        status_label.configure(text=f"{outcome} after {runner.elapsed():.1f}s")
+                        cancel_button.configure(state="disabled")
+                    else:
+                        results_text.insert("end", line, stream)
+                results_text.configure(state="disabled")
+                if events and at_end:
+                    results_text.see("end")
+                if not events or events[-1][0] != EXIT:
+                    status = "Cancelling" if runner.cancelled else "Running"
+                    status_label.configure(text=f"{status}... {runner.elapsed():.1f}s")
+                    runner_window.after(RUNNER_POLL_MS, poll)
+
+            poll()
         except Exception as e:
-            logging.error(f"Error running tests: {e}")
+            runner.cancel()
+            logging.error(f"Error showing {title.lower()}: {e}")
 
     def add_new_icd10_code(self):
         add_window = ctk.CTkToplevel(self)
@@ -1252,6 +1473,7 @@ class ICD10Explorer(ctk.CTk):
         ctk.CTkLabel(add_window, text="ICD-10 Code:").grid(row=1, column=0, padx=5, pady=5)
         code_entry = ctk.CTkEntry(add_window)
         code_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.bind_category_suggestion(code_entry, category_var, ICD10_SYSTEM)
 
         ctk.CTkLabel(add_window, text="Description:").grid(row=2, column=0, padx=5, pady=5)
         desc_entry = ctk.CTkEntry(add_window)
@@ -1267,10 +1489,14 @@ class ICD10Explorer(ctk.CTk):
                     messagebox.showerror("Error", "Code and description cannot be empty!")
                     return  # Ensure the function returns here
 
+                existing_category = CODE_LOCATOR.category_of(ICD10_SYSTEM, code)
+                if existing_category is not None:
+                    messagebox.showerror("Error", f"Code {code} already exists in {existing_category}!")
+                    return
+
                 if category in ICD10_CODES:
-                    ICD10_CODES[category][code] = description
-                    save_icd10_codes(ICD10_CODES)
-                    self.populate_tree(ICD10_CODES)
+                    store_icd10_code(category, code, description)
+                    self.code_tree.insert_code(ICD10_CODES, category, code, description)
                     messagebox.showinfo("Success", f"Code {code} added to {category}!")
                     add_window.destroy()
                 else:
@@ -1295,6 +1521,7 @@ class ICD10Explorer(ctk.CTk):
         ctk.CTkLabel(add_window, text="CPT Code:").grid(row=1, column=0, padx=5, pady=5)
         code_entry = ctk.CTkEntry(add_window)
         code_entry.grid(row=1, column=1, padx=5, pady=5)
+        self.bind_category_suggestion(code_entry, category_var, CPT_SYSTEM)
 
         ctk.CTkLabel(add_window, text="Description:").grid(row=2, column=0, padx=5, pady=5)
         desc_entry = ctk.CTkEntry(add_window)
@@ -1310,10 +1537,14 @@ class ICD10Explorer(ctk.CTk):
                     messagebox.showerror("Error", "Code and description cannot be empty!")
                     return  # Ensure the function returns here
 
+                existing_category = CODE_LOCATOR.category_of(CPT_SYSTEM, code)
+                if existing_category is not None:
+                    messagebox.showerror("Error", f"Code {code} already exists in {existing_category}!")
+                    return
+
                 if category in CPT_CODES:
-                    CPT_CODES[category].append({"code": code, "description": description})
-                    save_cpt_codes(CPT_CODES)
-                    self.populate_tree(CPT_CODES)
+                    store_cpt_code(category, code, description)
+                    self.code_tree.insert_code(CPT_CODES, category, code, description)
                     messagebox.showinfo("Success", f"Code {code} added to {category}!")
                     add_window.destroy()
                 else:
@@ -1325,6 +1556,11 @@ class ICD10Explorer(ctk.CTk):
         save_button.grid(row=3, column=0, columnspan=2, pady=10)
 
 if __name__ == "__main__":
+    load_data()
+    if config.get("HTTP_SERVER_PORT"):
+        # Serve the same in-memory index to other tools while the app is open
+        from code_server import serve_in_background
+        serve_in_background(config.get("HTTP_SERVER_HOST", "127.0.0.1"), config["HTTP_SERVER_PORT"])
     app = ICD10Explorer()
     app.login()  # Prompt for login before showing the main window
     app.mainloop()
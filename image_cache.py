@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+THUMBNAIL_LIMIT = 32  # files kept on disk
+MEMORY_LIMIT = 8  # decoded thumbnails kept in memory
+
+
+class ThumbnailCache:
+    """Pre-scaled images on disk, keyed by source path, mtime, file size and target size.
+
+    thumbnail() is meant for a background thread: it stats the source, then
+    returns the decoded thumbnail from memory, from the cached PNG, or by
+    scaling the source (JPEGs are decoded at a reduced scale first) and
+    writing the PNG for next time. Replacing or touching the source changes
+    its key, so a stale thumbnail is never used; old files are pruned once
+    there are more than THUMBNAIL_LIMIT.
+    """
+
+    def __init__(self, directory, size):
+        self.directory = directory
+        self.size = tuple(size)
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()  # key -> decoded PIL image
+
+    def key(self, path):
+        stat = os.stat(path)
+        source = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{self.size[0]}x{self.size[1]}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()[:20]
+
+    def thumbnail(self, path):
+        """Return (key, image) for path scaled to the cache's size."""
+        key = self.key(path)
+        with self.lock:
+            image = self.memory.get(key)
+            if image is not None:
+                self.memory.move_to_end(key)
+                return key, image
+        cached_path = os.path.join(self.directory, key + ".png")
+        try:
+            with Image.open(cached_path) as cached:
+                image = cached.copy()  # Decodes now, on this thread, and closes the file
+        except (FileNotFoundError, OSError):
+            image = self.render(path)
+            self.store(cached_path, image)
+        with self.lock:
+            self.memory[key] = image
+            if len(self.memory) > MEMORY_LIMIT:
+                self.memory.popitem(last=False)
+        return key, image
+
+    def render(self, path):
+        with Image.open(path) as source:
+            source.draft("RGB", self.size)  # JPEG only: let the decoder skip detail we'd throw away
+            if source.mode not in ("RGB", "RGBA"):
+                source = source.convert("RGBA")
+            return source.resize(self.size, Image.LANCZOS)
+
+    def store(self, cached_path, image):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = cached_path + ".tmp"
+        image.save(temp_path, "PNG")
+        os.replace(temp_path, cached_path)
+        self.prune()
+
+    def prune(self):
+        """Delete the least recently written thumbnails beyond THUMBNAIL_LIMIT."""
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".png")]
+        if len(paths) <= THUMBNAIL_LIMIT:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:-THUMBNAIL_LIMIT]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a logo thumbnail without the cache, from disk and from memory.")
+    parser.add_argument("image")
+    parser.add_argument("--size", type=int, nargs=2, default=(150, 150))
+    parser.add_argument("--cache-dir", default="thumbnails")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with Image.open(args.image) as source:
+        source.resize(tuple(args.size), Image.LANCZOS)
+    print(f"full decode and resize: {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    cache = ThumbnailCache(args.cache_dir, args.size)
+    for label in ("first call", "from disk", "from memory"):
+        if label == "from disk":
+            cache.memory.clear()
+        started = time.perf_counter()
+        key, _ = cache.thumbnail(args.image)
+        print(f"{label}: {(time.perf_counter() - started) * 1000:.1f} ms ({key})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+IO_WORKERS = 2
+IO_POLL_MS = 50
+
+
+class IOExecutor:
+    """Runs blocking file work (saves, copies, image decoding) on background threads.
+
+    Every job is submitted under a key, normally the path it writes. Jobs for
+    one key run one at a time in submission order, and a job submitted while
+    another for the same key is still waiting replaces it, so a burst of
+    saves of one file costs at most two writes. Jobs should therefore write
+    the latest state rather than a delta.
+
+    Completion callbacks never run on a worker thread: they are queued and
+    run by poll(), which the attached Tk widget calls through after() while
+    any work is outstanding. Submit from the Tk thread.
+    """
+
+    def __init__(self, workers=IO_WORKERS):
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="io")
+        self.lock = threading.Lock()
+        self.running = set()  # keys with a job on a worker
+        self.waiting = {}  # key -> job to run after the running one
+        self.done = queue.Queue()
+        self.widget = None
+        self.on_change = None
+        self.poll_id = None
+        self.coalesced = 0
+
+    def attach(self, widget, on_change=None):
+        """Run callbacks on widget's event loop; on_change(pending) follows the job count."""
+        self.widget = widget
+        self.on_change = on_change
+        self._schedule_poll()
+
+    def submit(self, key, fn, *args, callback=None, error=None):
+        """Run fn(*args) in the background; then callback(result) or error(exception) on the Tk thread.
+
+        A key of None never coalesces with other jobs.
+        """
+        if key is None:
+            key = object()
+        job = (fn, args, [callback] if callback else [], [error] if error else [])
+        with self.lock:
+            if key in self.running:
+                replaced = self.waiting.get(key)
+                if replaced is not None:
+                    # Keep the replaced job's callbacks; its work is covered by this one
+                    job = (fn, args, replaced[2] + job[2], replaced[3] + job[3])
+                    self.coalesced += 1
+                self.waiting[key] = job
+                job = None
+            else:
+                self.running.add(key)
+        if job is not None:
+            self.pool.submit(self._run, key, job)
+        self._schedule_poll()
+        if self.on_change is not None:
+            self.on_change(self.pending())
+
+    def pending(self):
+        """Return how many jobs are running or waiting."""
+        with self.lock:
+            return len(self.running) + len(self.waiting)
+
+    def _run(self, key, job):
+        while job is not None:
+            fn, args, callbacks, errors = job
+            try:
+                result = fn(*args)
+            except Exception as e:
+                logging.error(f"Background I/O job {getattr(fn, '__name__', fn)} failed: {e}")
+                self.done.put((errors, e))
+            else:
+                self.done.put((callbacks, result))
+            with self.lock:
+                job = self.waiting.pop(key, None)
+                if job is None:
+                    self.running.discard(key)
+
+    def poll(self):
+        """Run finished jobs' callbacks on the Tk thread."""
+        self.poll_id = None
+        try:
+            while True:
+                callbacks, result = self.done.get_nowait()
+                for callback in callbacks:
+                    try:
+                        callback(result)
+                    except Exception as e:
+                        logging.error(f"Error in I/O completion callback: {e}")
+        except queue.Empty:
+            pass
+        pending = self.pending()
+        if self.on_change is not None:
+            self.on_change(pending)
+        if pending or not self.done.empty():
+            self._schedule_poll()
+
+    def _schedule_poll(self):
+        if self.widget is not None and self.poll_id is None:
+            self.poll_id = self.widget.after(IO_POLL_MS, self.poll)
+
+    def shutdown(self):
+        """Wait for every submitted job to finish; their callbacks are not run."""
+        self.pool.shutdown(wait=True)
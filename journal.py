@@ -0,0 +1,186 @@
+import os
+import json
+import logging
+import threading
+
+from perf_metrics import timer
+
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_COMPACT_EVERY = 500
+
+
+def apply_change(data, change):
+    """Apply one {"op", "path", "value"} change to nested dicts/lists in place.
+
+    "set" assigns the value at path, creating missing parents; an integer
+    last path element addresses a list slot (appending when it is one past the
+    end). "delete" removes a dict key and ignores keys that are already gone.
+    Both are idempotent, so replaying a journal over a snapshot that already
+    contains some of its records gives the same result.
+    """
+    path = change["path"]
+    target = data
+    for depth, key in enumerate(path[:-1]):
+        if key not in target:
+            target[key] = [] if isinstance(path[depth + 1], int) else {}
+        target = target[key]
+    last = path[-1]
+
+    if change["op"] == "set":
+        if isinstance(target, list):
+            if last < len(target):
+                target[last] = change["value"]
+            else:
+                target.append(change["value"])
+        else:
+            target[last] = change["value"]
+    elif change["op"] == "delete":
+        if isinstance(target, dict):
+            target.pop(last, None)
+    else:
+        raise ValueError(f"Unknown journal operation: {change['op']}")
+
+
+def write_snapshot(path, data):
+    """Atomically replace path with the JSON dump of data."""
+    write_snapshot_text(path, json.dumps(data, indent=4))
+
+
+def write_snapshot_text(path, text):
+    """Atomically replace path with text."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+class ChangeJournal:
+    """Append-only write-ahead journal next to a JSON data file.
+
+    Every mutation is appended as one JSON line (a list of changes that are
+    applied together) and fsynced, so a write costs the size of the change
+    rather than the size of the data set. compact() folds the journal into
+    the JSON snapshot; it runs every `compact_every` records and on close.
+    `encode`, if given, converts the in-memory data to its file format when
+    the snapshot is written.
+
+    With an `executor` (io_executor.IOExecutor) the data is still changed
+    in place by the caller, but the file writes happen in the background:
+    records wait in `unwritten` and a compaction's snapshot is serialized
+    up front, and one coalesced job per journal writes whatever is waiting.
+    """
+
+    def __init__(self, path, compact_every=JOURNAL_COMPACT_EVERY, encode=None, executor=None):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.compact_every = compact_every
+        self.encode = encode
+        self.executor = executor
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.unwritten = []  # Journal lines waiting for the executor
+        self.snapshot_text = None  # Snapshot waiting for the executor
+
+    def replay(self, data):
+        """Apply every journaled change to data (freshly loaded from the snapshot
+        and, for an encoded file, already decoded)."""
+        try:
+            with open(self.journal_path, "rb") as journal_file:
+                lines = journal_file.readlines()
+        except FileNotFoundError:
+            return data
+
+        if lines and not lines[-1].endswith(b"\n"):
+            # A crash mid-append leaves a torn last record; drop it so the
+            # next append starts on a fresh line.
+            logging.warning(f"Discarding incomplete last record in {self.journal_path}")
+            lines.pop()
+            with open(self.journal_path, "r+b") as journal_file:
+                journal_file.truncate(sum(len(line) for line in lines))
+
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                changes = json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.error(f"Skipping unreadable record {line_number} in {self.journal_path}: {e}")
+                continue
+            for change in changes:
+                apply_change(data, change)
+        self.pending = len(lines)
+        logging.info(f"Replayed {len(lines)} journal records onto {self.path}")
+        return data
+
+    def count_records(self):
+        """Set pending from the journal on disk, for data that was loaded without
+        replay() (from a code snapshot), so close still compacts it."""
+        try:
+            with open(self.journal_path, "rb") as journal_file:
+                self.pending = sum(1 for _ in journal_file)
+        except FileNotFoundError:
+            self.pending = 0
+        return self.pending
+
+    def record(self, data, *changes):
+        """Apply changes to data and append them to the journal as one record."""
+        for change in changes:
+            apply_change(data, change)
+        line = json.dumps(list(changes)) + "\n"
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            self.compact(data)  # The snapshot includes this record
+        elif self.executor is None:
+            self._append([line])
+        else:
+            with self.lock:
+                self.unwritten.append(line)
+            self.executor.submit(self.journal_path, self.write_waiting)
+
+    def compact(self, data, force=False):
+        """Write data as the new snapshot and start an empty journal.
+
+        Does nothing when no records are pending unless force is set.
+        """
+        if not self.pending and not force:
+            return
+        # Serialized now: with an executor, data keeps changing on this thread
+        with timer("journal.serialize"):
+            text = json.dumps(data if self.encode is None else self.encode(data), indent=4)
+        self.pending = 0
+        with self.lock:
+            self.snapshot_text = text
+            self.unwritten = []  # Already in the snapshot
+        if self.executor is None:
+            self.write_waiting()
+        else:
+            self.executor.submit(self.journal_path, self.write_waiting)
+
+    def write_waiting(self):
+        """Write the waiting snapshot, then the waiting journal lines."""
+        with self.lock:
+            text, lines = self.snapshot_text, self.unwritten
+            self.snapshot_text, self.unwritten = None, []
+        if text is not None:
+            with timer("journal.write_snapshot"):
+                write_snapshot_text(self.path, text)
+            # A crash before this truncate only means the records replay again,
+            # which is harmless because every change is idempotent.
+            with open(self.journal_path, "w"):
+                pass
+        if lines:
+            self._append(lines)
+
+    def _append(self, lines):
+        with open(self.journal_path, "a") as journal_file:
+            journal_file.writelines(lines)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+
+def set_change(path, value):
+    return {"op": "set", "path": list(path), "value": value}
+
+
+def delete_change(path):
+    return {"op": "delete", "path": list(path)}
@@ -0,0 +1,154 @@
+import sys
+import json
+import queue
+import atexit
+import logging
+import argparse
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = "icd10_explorer.log"
+ERROR_LOG_FILE = "error_log.jsonl"
+LOG_LEVEL = "INFO"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else came from extra= and goes into the JSON entry
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message and any extra= fields."""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["traceback"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The caller only pays for getMessage() and, when there is one, rendering
+    the traceback (the exception object can't safely cross threads). The
+    message replaces msg/args so the listener's formatters see plain text.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_level(level):
+    """Accept a level name ("debug", "WARNING") or number."""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return value
+
+
+def configure_logging(config=None):
+    """Send all logging through a queue to the log file and the JSONL error log.
+
+    Reads LOG_FILE, ERROR_LOG_FILE, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUPS and
+    LOG_LEVELS (logger name -> level) from config, falling back to the module
+    defaults. Records at ERROR or above also go to the error log. Both files
+    rotate by size. Callers just enqueue the record; a listener thread does the
+    formatting and file I/O. Calling it again replaces the earlier setup.
+    """
+    global _listener
+    config = config or {}
+    shutdown_logging()
+
+    text_handler = RotatingFileHandler(config.get("LOG_FILE", LOG_FILE), maxBytes=config.get("LOG_MAX_BYTES", LOG_MAX_BYTES),
+                                       backupCount=config.get("LOG_BACKUPS", LOG_BACKUPS), encoding="utf-8")
+    text_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    error_handler = RotatingFileHandler(config.get("ERROR_LOG_FILE", ERROR_LOG_FILE), maxBytes=config.get("LOG_MAX_BYTES", LOG_MAX_BYTES),
+                                        backupCount=config.get("LOG_BACKUPS", LOG_BACKUPS), encoding="utf-8")
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(JsonLineFormatter())
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(DeferredQueueHandler(records))
+    root.setLevel(parse_level(config.get("LOG_LEVEL", LOG_LEVEL)))
+    for name, level in config.get("LOG_LEVELS", {}).items():
+        logging.getLogger(name).setLevel(parse_level(level))
+
+    _listener = QueueListener(records, text_handler, error_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Write out everything still queued and close the log files."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(shutdown_logging)
+
+
+def read_error_log(path=ERROR_LOG_FILE):
+    """Yield the entries of a JSONL error log, skipping lines that don't parse."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the most recent entries of the JSONL error log.")
+    parser.add_argument("path", nargs="?", default=ERROR_LOG_FILE)
+    parser.add_argument("-n", "--count", type=int, default=20, help="Entries to show")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON lines")
+    args = parser.parse_args()
+
+    entries = list(read_error_log(args.path))[-args.count:]
+    for entry in entries:
+        if args.json:
+            print(json.dumps(entry))
+            continue
+        print(f"{entry.get('timestamp')}\t{entry.get('level')}\t{entry.get('message')}")
+        if entry.get("solution"):
+            print(f"\tSolution: {entry['solution']}")
+    if not entries:
+        print(f"No entries in {args.path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
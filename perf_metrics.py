@@ -0,0 +1,150 @@
+import re
+import json
+import math
+import time
+import threading
+import functools
+from bisect import bisect_left
+
+# Bucket upper bounds grow by 2**(1/4) (about 19%) from 10 microseconds to a few
+# minutes, so a percentile read off the buckets is within a bucket's width.
+BUCKET_BASE = 1e-5
+BUCKET_GROWTH = 2 ** 0.25
+BUCKET_BOUNDS = tuple(BUCKET_BASE * BUCKET_GROWTH ** n for n in range(100))
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "icd10_explorer"
+
+
+class LatencyHistogram:
+    """Counts of observed durations in log-spaced buckets, plus count, sum and max."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)  # Last one is everything larger
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate the q quantile, interpolating geometrically inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for position, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                if position == len(BUCKET_BOUNDS):
+                    return self.max
+                upper = BUCKET_BOUNDS[position]
+                lower = upper / BUCKET_GROWTH if position else 0.0
+                fraction = (rank - seen) / count
+                if lower == 0.0:
+                    estimate = upper * fraction
+                else:
+                    estimate = lower * math.exp(math.log(upper / lower) * fraction)
+                return min(estimate, self.max)
+            seen += count
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            **{f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES},
+        }
+
+
+class MetricsRegistry:
+    """Named latency histograms, safe to update from any thread.
+
+    Use timer(name) as a context manager, timed(name) as a decorator, or
+    observe(name, seconds) directly. An observation costs two perf_counter()
+    calls, a lock and a bisect.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.started = time.time()
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def timer(self, name):
+        return _Timer(self, name)
+
+    def timed(self, name=None):
+        """Decorator recording every call's duration under name (default: the function's qualified name)."""
+        def decorate(fn):
+            metric = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(metric, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """Return {name: {count, sum, max, p50, p95, p99}} with durations in seconds."""
+        with self.lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.started = time.time()
+
+    def to_json(self):
+        return json.dumps({"started": self.started, "taken": time.time(), "metrics": self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        """The snapshot in the Prometheus text exposition format, one summary per timer."""
+        metric = f"{METRIC_PREFIX}_duration_seconds"
+        lines = [f"# HELP {metric} Duration of instrumented operations.", f"# TYPE {metric} summary"]
+        for name, summary in self.snapshot().items():
+            label = _label_value(name)
+            for q in QUANTILES:
+                lines.append(f'{metric}{{operation="{label}",quantile="{q}"}} {summary[f"p{round(q * 100)}"]:.6g}')
+            lines.append(f'{metric}_sum{{operation="{label}"}} {summary["sum"]:.6g}')
+            lines.append(f'{metric}_count{{operation="{label}"}} {summary["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "started")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.started)
+
+
+def _label_value(name):
+    return re.sub(r'["\\\n]', "_", name)
+
+
+# The process-wide registry the explorer, core and server record into
+METRICS = MetricsRegistry()
+timer = METRICS.timer
+timed = METRICS.timed
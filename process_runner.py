@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import queue
+import signal
+import logging
+import argparse
+import threading
+import subprocess
+
+CANCEL_GRACE_SECONDS = 3
+STDOUT = "stdout"
+STDERR = "stderr"
+EXIT = "exit"
+
+
+class ProcessRunner:
+    """A child process whose stdout and stderr are read line by line as it runs.
+
+    Two reader threads put (STDOUT or STDERR, line) events on a queue, and a
+    waiter thread adds (EXIT, returncode) once both streams are closed and
+    the process has exited. The owner drains the queue with events(),
+    normally from a Tk after() loop, so no thread touches the widgets. The
+    child runs in its own process group, so cancel() also stops anything it
+    started (the benchmark spawns an interpreter per start-up measurement).
+    """
+
+    def __init__(self, command, cwd=None):
+        self.command = command
+        self.cwd = cwd
+        self.queue = queue.Queue()
+        self.process = None
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.returncode = None
+
+    def start(self):
+        options = {"start_new_session": True} if os.name == "posix" else {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        env = dict(os.environ, PYTHONUNBUFFERED="1")  # Flush the child's prints as they happen
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(self.command, cwd=self.cwd, env=env, stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        text=True, encoding="utf-8", errors="replace", bufsize=1, **options)
+        readers = [threading.Thread(target=self._read, args=(stream, name), daemon=True)
+                   for stream, name in ((self.process.stdout, STDOUT), (self.process.stderr, STDERR))]
+        for reader in readers:
+            reader.start()
+        threading.Thread(target=self._wait, args=(readers,), daemon=True).start()
+        return self
+
+    def _read(self, stream, name):
+        with stream:
+            for line in stream:
+                self.queue.put((name, line))
+
+    def _wait(self, readers):
+        for reader in readers:
+            reader.join()
+        self.returncode = self.process.wait()
+        self.finished = time.perf_counter()
+        self.queue.put((EXIT, self.returncode))
+
+    def running(self):
+        return self.process is not None and self.finished is None
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def events(self, limit=None):
+        """Return the queued events, at most limit of them."""
+        events = []
+        try:
+            while limit is None or len(events) < limit:
+                events.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def cancel(self):
+        """Ask the process group to stop; kill it if it hasn't after CANCEL_GRACE_SECONDS."""
+        if not self.running() or self.cancelled:
+            return
+        self.cancelled = True
+        self._stop(kill=False)
+        threading.Thread(target=self._kill_later, daemon=True).start()
+
+    def kill(self):
+        """Kill the process group now, without the grace period (for when the app exits)."""
+        if not self.running():
+            return
+        self.cancelled = True
+        self._stop(kill=True)
+
+    def _kill_later(self):
+        try:
+            self.process.wait(CANCEL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            self._stop(kill=True)
+
+    def _stop(self, kill):
+        try:
+            if os.name == "posix":
+                os.killpg(self.process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+            elif kill:
+                self.process.kill()
+            else:
+                self.process.send_signal(signal.CTRL_BREAK_EVENT)
+        except (ProcessLookupError, OSError) as e:
+            logging.error(f"Error stopping {self.command[0]}: {e}")
+
+
+def main():
+    """Run a command through ProcessRunner, echoing its output as it arrives (for trying it out)."""
+    parser = argparse.ArgumentParser(description="Run a command, streaming its output line by line.")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    parser.add_argument("--timeout", type=float, help="Cancel after this many seconds")
+    args = parser.parse_args()
+    if args.command[:1] == ["--"]:
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("no command given")
+
+    runner = ProcessRunner(args.command).start()
+    while True:
+        if args.timeout is not None and runner.elapsed() > args.timeout:
+            runner.cancel()
+        for name, value in runner.events():
+            if name == EXIT:
+                print(f"[exit {value} after {runner.elapsed():.1f}s{', cancelled' if runner.cancelled else ''}]", file=sys.stderr)
+                sys.exit(value)
+            (sys.stdout if name == STDOUT else sys.stderr).write(value)
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    main()
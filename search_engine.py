@@ -0,0 +1,226 @@
+import math
+import heapq
+import threading
+from collections import namedtuple
+
+from search_index import tokenize, normalize_code
+from perf_metrics import timed
+
+SearchResult = namedtuple("SearchResult", ["score", "system", "code", "category", "description"])
+
+DEFAULT_LIMIT = 50
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A query word that only prefixes a description word ("anem" -> "anemia")
+# counts for less than an exact word match.
+PREFIX_TERM_WEIGHT = 0.7
+
+EXACT_CODE_BOOST = 100.0
+PREFIX_CODE_BOOST = 10.0
+
+# Fuzzy mode: a description word one edit away from the query word counts
+# this much of an exact match (squared for two edits), and a code one edit
+# away ranks with the code-prefix matches.
+FUZZY_TERM_WEIGHT = 0.5
+FUZZY_CODE_BOOST = 10.0
+
+
+class SearchEngine:
+    """Ranked search over every code system held in a SearchIndex.
+
+    Descriptions are scored with BM25, code matches are boosted on top of
+    that, and only the best `limit` results are returned.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    @timed("search_engine.search")
+    def search(self, query, systems=None, limit=DEFAULT_LIMIT, within=None, fuzzy=False):
+        """Return up to limit SearchResults for query, best first.
+
+        within, if given, is a set of (system, code) keys the results must
+        come from, e.g. the codes of one chapter. fuzzy also matches words and
+        codes a typo or two away (see fuzzy_score).
+        """
+        scores = self.fuzzy_score(query) if fuzzy else self.score(query)
+        if within is not None:
+            scores = {key: score for key, score in scores.items() if key in within}
+        return self.rank(scores, systems, limit)
+
+    def rank(self, scores, systems=None, limit=DEFAULT_LIMIT):
+        """Turn a {key: score} dict into the best `limit` SearchResults."""
+        if systems is not None:
+            scores = {key: score for key, score in scores.items() if key[0] in systems}
+        if limit is None:
+            best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        with self.index.lock:
+            return [self.result(key, score) for key, score in best if key in self.index.entries]
+
+    def score(self, query, candidates=None, cancelled=None):
+        """Return {(system, code): score} for every code matching query.
+
+        When candidates is given only those keys are considered, which is how
+        IncrementalSearch narrows a previous result set. Returns None if the
+        `cancelled` event is set part way through.
+        """
+        index = self.index
+        with index.lock:
+            if candidates is None:
+                candidates = index.search(query)
+                narrowing = False
+            else:
+                candidates = {key for key in candidates if index.matches(key, query)}
+                narrowing = True
+            if not candidates:
+                return {}
+
+            scores = dict.fromkeys(candidates, 0.0)
+            tokens = set(tokenize(query))
+            if tokens:
+                document_count = len(index.entries)
+                average_length = index.average_length() or 1.0
+                words = {}
+                for token in tokens:
+                    if cancelled is not None and cancelled.is_set():
+                        return None
+                    exact = index.postings.get(token, ())
+                    frequency = index.document_frequency(token)
+                    idf = math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+                    if narrowing:
+                        # The candidate set is small; check each description directly
+                        # instead of building the union of every matching posting.
+                        for key in scores:
+                            if key not in words:
+                                words[key] = tokenize(index.entries[key][1])
+                        matching = [key for key in scores if any(word.startswith(token) for word in words[key])]
+                    else:
+                        matching = index.token_matches(token)
+                    for key in matching:
+                        if key not in scores:
+                            continue
+                        length_norm = 1 - BM25_B + BM25_B * index.lengths[key] / average_length
+                        term_score = idf * (BM25_K1 + 1) / (1 + BM25_K1 * length_norm)
+                        if key not in exact:
+                            term_score *= PREFIX_TERM_WEIGHT
+                        scores[key] += term_score
+
+            code_query = normalize_code(query)
+            if code_query:
+                for key in index.trie.prefix(code_query):
+                    if key not in scores:
+                        continue
+                    code = normalize_code(key[1])
+                    if code == code_query:
+                        scores[key] += EXACT_CODE_BOOST
+                    else:
+                        scores[key] += PREFIX_CODE_BOOST * len(code_query) / len(code)
+        if cancelled is not None and cancelled.is_set():
+            return None
+        return scores
+
+    def fuzzy_score(self, query, cancelled=None):
+        """Like score(), but each query word also matches vocabulary terms
+        within max_distance() edits, and codes match within one or two edits.
+
+        Candidates come from the index's FuzzyIndex, so this costs a few
+        posting lookups per word rather than a scan of every description.
+        """
+        index = self.index
+        with index.lock:
+            fuzzy = index.fuzzy
+            document_count = len(index.entries)
+            average_length = index.average_length() or 1.0
+            scores = None
+            for token in set(tokenize(query)):
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                weights = {term: 1.0 if term == token else PREFIX_TERM_WEIGHT for term in index.prefix_terms(token)}
+                for term, distance in fuzzy.similar_terms(token):
+                    weights[term] = max(weights.get(term, 0.0), FUZZY_TERM_WEIGHT ** distance)
+                token_scores = {}
+                for term, weight in weights.items():
+                    posting = index.postings[term]
+                    frequency = len(posting)
+                    idf = math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+                    for key in posting:
+                        length_norm = 1 - BM25_B + BM25_B * index.lengths[key] / average_length
+                        term_score = weight * idf * (BM25_K1 + 1) / (1 + BM25_K1 * length_norm)
+                        if term_score > token_scores.get(key, 0.0):
+                            token_scores[key] = term_score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {key: score + token_scores[key] for key, score in scores.items() if key in token_scores}
+            scores = scores or {}
+
+            code_query = normalize_code(query)
+            if code_query:
+                prefix_keys = index.trie.prefix(code_query)
+                for key in prefix_keys:
+                    code = normalize_code(key[1])
+                    boost = EXACT_CODE_BOOST if code == code_query else PREFIX_CODE_BOOST * len(code_query) / len(code)
+                    scores[key] = scores.get(key, 0.0) + boost
+                for key, distance in fuzzy.similar_codes(code_query):
+                    if distance and key not in prefix_keys:
+                        scores[key] = scores.get(key, 0.0) + FUZZY_CODE_BOOST / distance
+        if cancelled is not None and cancelled.is_set():
+            return None
+        return scores
+
+    def result(self, key, score):
+        category, description = self.index.entries[key]
+        return SearchResult(round(score, 3), key[0], key[1], category, description)
+
+
+class IncrementalSearch:
+    """Search-as-you-type session over a SearchEngine.
+
+    When a query only extends the previous one ("ane" -> "anem") every match
+    must already be among the previous matches, so the previous candidate set
+    is filtered instead of querying the whole index again. Any change to the
+    index since the previous query falls back to a full search.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.last_query = None
+        self.last_candidates = None
+        self.last_version = None
+
+    @timed("search_engine.incremental_search")
+    def search(self, query, systems=None, limit=DEFAULT_LIMIT, cancelled=None, fuzzy=False):
+        """Return ranked SearchResults for query, or None if cancelled.
+
+        Fuzzy matches of a longer query aren't a subset of the shorter one's,
+        so fuzzy queries always search the whole index.
+        """
+        if fuzzy:
+            self.reset()
+            scores = self.engine.fuzzy_score(query, cancelled)
+            return None if scores is None else self.engine.rank(scores, systems, limit)
+        with self.lock:
+            last_query, last_candidates, last_version = self.last_query, self.last_candidates, self.last_version
+        version = self.engine.index.version
+        candidates = None
+        if last_version == version and last_query and tokenize(last_query) and query.startswith(last_query):
+            candidates = last_candidates
+        scores = self.engine.score(query, candidates, cancelled)
+        if scores is None:
+            return None
+        with self.lock:
+            self.last_query, self.last_candidates, self.last_version = query, set(scores), version
+        return self.engine.rank(scores, systems, limit)
+
+    def reset(self):
+        """Forget the previous query so the next search scans the whole index."""
+        with self.lock:
+            self.last_query = None
+            self.last_candidates = None
+            self.last_version = None
@@ -0,0 +1,304 @@
+import re
+import logging
+import threading
+from bisect import bisect_left, insort
+
+ICD10_SYSTEM = "ICD-10"
+CPT_SYSTEM = "CPT"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_code(code):
+    """Normalize a code for prefix matching (case and whitespace insensitive)."""
+    return "".join(code.split()).upper()
+
+
+def iter_icd10_entries(codes):
+    """Yield (code, category, description) for the nested ICD-10 dict."""
+    for category, category_codes in codes.items():
+        if isinstance(category_codes, dict):
+            for code, description in category_codes.items():
+                yield code, category, description
+
+
+def iter_cpt_entries(codes):
+    """Yield (code, category, description) for the keyed CPT categories."""
+    for category, category_codes in codes.items():
+        for code, description in category_codes.items():
+            yield code, category, description
+
+
+def cpt_from_records(data):
+    """Key the on-disk CPT category lists by code: {category: {code: description}}.
+
+    List order is kept. If a code is listed more than once, the first entry
+    wins and the rest are dropped with a warning.
+    """
+    codes = {}
+    for category, records in data.items():
+        category_codes = codes[category] = {}
+        for code_info in records:
+            code = code_info["code"]
+            if code in category_codes:
+                logging.warning(f"Dropping duplicate CPT code {code} in {category}")
+                continue
+            category_codes[code] = code_info["description"]
+    return codes
+
+
+def cpt_to_records(codes):
+    """The inverse of cpt_from_records(): the list format the CPT file uses."""
+    return {category: [{"code": code, "description": description} for code, description in category_codes.items()]
+            for category, category_codes in codes.items()}
+
+
+class _TrieNode:
+    __slots__ = ("children", "keys")
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()
+
+
+class CodeTrie:
+    """Prefix trie over codes. Every node holds the keys below it, so a prefix
+    lookup costs O(len(prefix)) regardless of how many codes are loaded."""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def insert(self, code, key):
+        node = self.root
+        node.keys.add(key)
+        for char in normalize_code(code):
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+            node.keys.add(key)
+
+    def remove(self, code, key):
+        path = [self.root]
+        node = self.root
+        for char in normalize_code(code):
+            node = node.children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        for node in path:
+            node.keys.discard(key)
+        # Prune branches that no longer lead to any code
+        chars = normalize_code(code)
+        for depth in range(len(chars), 0, -1):
+            if path[depth].keys:
+                break
+            del path[depth - 1].children[chars[depth - 1]]
+
+    def prefix(self, prefix):
+        """Return the set of keys whose code starts with prefix."""
+        node = self.root
+        for char in normalize_code(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.keys
+
+
+class SearchIndex:
+    """Code prefix trie plus a token inverted index over descriptions.
+
+    Entries are keyed by (system, code). The index is built once at load time
+    (or restored from a CodeSnapshot) and kept current with sync(), which only
+    re-tokenizes entries that changed. The code trie and the fuzzy index are
+    built on first use so they never delay startup. Readers on worker threads
+    hold `lock` while they walk the index.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = 0
+        self._clear()
+
+    def _clear(self):
+        self.entries = {}
+        self._trie = None
+        self._fuzzy = None
+        self.postings = {}
+        self.vocabulary = []
+        self.lengths = {}
+        self.total_length = 0
+
+    @property
+    def trie(self):
+        with self.lock:
+            if self._trie is None:
+                trie = CodeTrie()
+                for key in self.entries:
+                    trie.insert(key[1], key)
+                self._trie = trie
+            return self._trie
+
+    @property
+    def fuzzy(self):
+        """FuzzyIndex over the vocabulary and code trie, built on the first fuzzy query."""
+        with self.lock:
+            if self._fuzzy is None:
+                from fuzzy_match import FuzzyIndex
+                fuzzy = FuzzyIndex(self.trie)
+                for term in self.vocabulary:
+                    fuzzy.add_term(term)
+                self._fuzzy = fuzzy
+            return self._fuzzy
+
+    def restore(self, entries, lengths, postings):
+        """Replace the index with prebuilt structures (see code_snapshot)."""
+        with self.lock:
+            self.version += 1
+            self._clear()
+            self.entries = entries
+            self.lengths = lengths
+            self.total_length = sum(lengths.values())
+            self.postings = postings
+            self.vocabulary = sorted(postings)
+
+    def rebuild(self, icd10_codes, cpt_codes):
+        """Discard the current index and index both code systems from scratch."""
+        with self.lock:
+            self.version += 1
+            self._clear()
+            for code, category, description in iter_icd10_entries(icd10_codes):
+                self._index(ICD10_SYSTEM, code, category, description)
+            for code, category, description in iter_cpt_entries(cpt_codes):
+                self._index(CPT_SYSTEM, code, category, description)
+            self.vocabulary = sorted(self.postings)
+        logging.info(f"Search index built with {len(self.entries)} codes and {len(self.vocabulary)} terms.")
+
+    def _index(self, system, code, category, description):
+        """Index one entry and return the tokens that are new to the vocabulary."""
+        key = (system, code)
+        self.entries[key] = (category, description)
+        if self._trie is not None:
+            self._trie.insert(code, key)
+        tokens = tokenize(description)
+        self.lengths[key] = len(tokens)
+        self.total_length += len(tokens)
+        new_tokens = []
+        for token in set(tokens):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                new_tokens.append(token)
+                if self._fuzzy is not None:
+                    self._fuzzy.add_term(token)
+            posting.add(key)
+        return new_tokens
+
+    def add(self, system, code, category, description):
+        with self.lock:
+            self.version += 1
+            if (system, code) in self.entries:
+                self.remove(system, code)
+            for token in self._index(system, code, category, description):
+                insort(self.vocabulary, token)
+
+    def remove(self, system, code):
+        key = (system, code)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return
+            self.version += 1
+            if self._trie is not None:
+                self._trie.remove(code, key)
+            self.total_length -= self.lengths.pop(key, 0)
+            for token in set(tokenize(entry[1])):
+                posting = self.postings.get(token)
+                if posting is None:
+                    continue
+                posting.discard(key)
+                if not posting:
+                    del self.postings[token]
+                    del self.vocabulary[bisect_left(self.vocabulary, token)]
+                    if self._fuzzy is not None:
+                        self._fuzzy.remove_term(token)
+
+    def sync(self, system, entries):
+        """Bring one code system in line with entries, touching only what changed."""
+        seen = set()
+        with self.lock:
+            for code, category, description in entries:
+                key = (system, code)
+                seen.add(key)
+                if self.entries.get(key) != (category, description):
+                    self.add(system, code, category, description)
+            stale = [key for key in self.entries if key[0] == system and key not in seen]
+            for key in stale:
+                self.remove(*key)
+
+    def token_matches(self, token):
+        """Return the keys whose description has a token starting with token."""
+        matches = set()
+        for term in self.prefix_terms(token):
+            matches |= self.postings[term]
+        return matches
+
+    def prefix_terms(self, token):
+        """Yield the vocabulary terms that start with token."""
+        vocabulary = self.vocabulary
+        for position in range(bisect_left(vocabulary, token), len(vocabulary)):
+            term = vocabulary[position]
+            if not term.startswith(token):
+                break
+            yield term
+
+    def document_frequency(self, token):
+        """Return how many descriptions contain a word starting with token."""
+        return min(sum(len(self.postings[term]) for term in self.prefix_terms(token)), len(self.entries))
+
+    def matches(self, key, query):
+        """Return True if the entry under key satisfies query, as search() would."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        tokens = set(tokenize(query))
+        if not tokens:
+            return not query.strip()
+        if normalize_code(key[1]).startswith(normalize_code(query)):
+            return True
+        words = tokenize(entry[1])
+        return all(any(word.startswith(token) for word in words) for token in tokens)
+
+    def search(self, query, system=None):
+        """Return the keys matching query by code prefix or description tokens.
+
+        Every query token must prefix-match a token of the description; an
+        empty query matches every code.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            matches = set(self.entries) if not query.strip() else set()
+        else:
+            matches = None
+            for token in sorted(set(tokens), key=len, reverse=True):
+                token_keys = self.token_matches(token)
+                matches = token_keys if matches is None else matches & token_keys
+                if not matches:
+                    break
+            matches |= self.trie.prefix(query)
+        if system is not None:
+            matches = {key for key in matches if key[0] == system}
+        return matches
+
+    def average_length(self):
+        """Return the mean description length in tokens."""
+        return self.total_length / len(self.entries) if self.entries else 0.0
+
+    def get(self, system, code):
+        """Return (category, description) for a code, or None."""
+        return self.entries.get((system, code))
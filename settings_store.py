@@ -0,0 +1,110 @@
+import os
+import json
+import logging
+
+from journal import write_snapshot
+
+SETTINGS_FLUSH_MS = 500
+
+
+class SettingsStore:
+    """The settings file held in memory, with dirty tracking and change notifications.
+
+    Reads come from memory. set() (or item assignment) records the key as
+    dirty, tells the key's subscribers, and schedules a flush; once attached
+    to a Tk widget the flush is debounced by SETTINGS_FLUSH_MS, so a burst of
+    changes becomes one atomic write of the whole file. Without a widget
+    every change is written straight away. With an executor
+    (io_executor.IOExecutor) the write itself runs in the background.
+    """
+
+    def __init__(self, path, defaults, delay_ms=SETTINGS_FLUSH_MS):
+        self.path = path
+        self.defaults = defaults
+        self.delay_ms = delay_ms
+        self.values = {}
+        self.dirty = set()
+        self.subscribers = {}  # key -> [callback(value)]
+        self.widget = None
+        self.executor = None
+        self.flush_id = None
+        self.load()
+
+    def load(self):
+        """Read the file, writing the defaults if it is missing or unreadable."""
+        try:
+            with open(self.path, "r") as file:
+                self.values = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logging.error(f"Error loading settings: {e}")
+            self.values = dict(self.defaults)
+            self.dirty.update(self.values)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.flush()
+        return self.values
+
+    def attach(self, widget, executor=None):
+        """Debounce flushes with widget.after() and write on executor from now on."""
+        self.widget = widget
+        self.executor = executor
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def set(self, key, value):
+        """Change one setting; a value equal to the current one is ignored."""
+        if key in self.values and self.values[key] == value:
+            return
+        self.values[key] = value
+        self.dirty.add(key)
+        for callback in list(self.subscribers.get(key, ())):
+            try:
+                callback(value)
+            except Exception as e:
+                logging.error(f"Error notifying {key} subscriber: {e}")
+        self.schedule_flush()
+
+    def update(self, changes):
+        for key, value in changes.items():
+            self.set(key, value)
+
+    def subscribe(self, key, callback):
+        """Call callback(value) whenever key changes."""
+        self.subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, key, callback):
+        callbacks = self.subscribers.get(key, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def schedule_flush(self):
+        if self.widget is None:
+            self.flush()
+            return
+        if self.flush_id is not None:
+            self.widget.after_cancel(self.flush_id)
+        self.flush_id = self.widget.after(self.delay_ms, self.flush)
+
+    def flush(self):
+        """Write the settings file if anything changed since the last write."""
+        if self.flush_id is not None and self.widget is not None:
+            self.widget.after_cancel(self.flush_id)
+        self.flush_id = None
+        if not self.dirty:
+            return
+        logging.info(f"Saving settings: {', '.join(sorted(self.dirty))}")
+        self.dirty.clear()
+        snapshot = dict(self.values)
+        if self.executor is None:
+            write_snapshot(self.path, snapshot)
+        else:
+            self.executor.submit(self.path, write_snapshot, self.path, snapshot)
@@ -0,0 +1,296 @@
+import json
+import sqlite3
+import logging
+import threading
+
+from journal import apply_change, write_snapshot
+from search_index import ICD10_SYSTEM, CPT_SYSTEM, tokenize, normalize_code, cpt_to_records
+from search_engine import SearchResult, DEFAULT_LIMIT
+
+ICD10_DATASET = "icd10"
+CPT_DATASET = "cpt"
+USERS_DATASET = "users"
+
+DATASET_SYSTEMS = {ICD10_DATASET: ICD10_SYSTEM, CPT_DATASET: CPT_SYSTEM}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    system TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (system, name)
+);
+CREATE TABLE IF NOT EXISTS codes (
+    id INTEGER PRIMARY KEY,
+    system TEXT NOT NULL,
+    category TEXT NOT NULL,
+    code TEXT NOT NULL,
+    description TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS codes_by_code ON codes (system, code);
+CREATE INDEX IF NOT EXISTS codes_by_upper_code ON codes (system, upper(code));
+CREATE INDEX IF NOT EXISTS codes_by_category ON codes (system, category, position);
+CREATE VIRTUAL TABLE IF NOT EXISTS codes_fts USING fts5(
+    code, description, content='codes', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS codes_fts_insert AFTER INSERT ON codes BEGIN
+    INSERT INTO codes_fts (rowid, code, description) VALUES (new.id, new.code, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS codes_fts_delete AFTER DELETE ON codes BEGIN
+    INSERT INTO codes_fts (codes_fts, rowid, code, description) VALUES ('delete', old.id, old.code, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS codes_fts_update AFTER UPDATE ON codes BEGIN
+    INSERT INTO codes_fts (codes_fts, rowid, code, description) VALUES ('delete', old.id, old.code, old.description);
+    INSERT INTO codes_fts (rowid, code, description) VALUES (new.id, new.code, new.description);
+END;
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SQLiteCodeStore:
+    """SQLite database holding the ICD-10, CPT and user tables.
+
+    Codes live in one `codes` table indexed by code and by category, with an
+    FTS5 table over code and description kept in sync by triggers. Category
+    and row positions are stored so the JSON shapes the rest of the app uses
+    can be rebuilt in their original order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def is_empty(self):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT (SELECT COUNT(*) FROM categories) + (SELECT COUNT(*) FROM users)"
+            ).fetchone()
+        return row[0] == 0
+
+    def import_json(self, icd10_codes, cpt_codes, users):
+        """Replace every table with the contents of the three JSON data sets."""
+        with self.lock, self.connection:
+            self._replace(ICD10_DATASET, icd10_codes)
+            self._replace(CPT_DATASET, cpt_codes)
+            self._replace(USERS_DATASET, users)
+        logging.info(f"Imported JSON data sets into {self.path}")
+
+    def export_json(self, dataset, path):
+        """Write one data set back out in its JSON file format."""
+        data = self.load(dataset)
+        write_snapshot(path, cpt_to_records(data) if dataset == CPT_DATASET else data)
+
+    def load(self, dataset):
+        """Return a data set in its in-memory shape: {category: {code: description}}
+        for both code systems, {username: info} for users."""
+        with self.lock:
+            if dataset == USERS_DATASET:
+                rows = self.connection.execute("SELECT username, data FROM users ORDER BY position")
+                return {username: json.loads(data) for username, data in rows}
+
+            system = DATASET_SYSTEMS[dataset]
+            data = {}
+            for (name,) in self.connection.execute(
+                    "SELECT name FROM categories WHERE system = ? ORDER BY position", (system,)):
+                data[name] = {}
+            rows = self.connection.execute(
+                "SELECT codes.category, codes.code, codes.description FROM codes "
+                "JOIN categories ON categories.system = codes.system AND categories.name = codes.category "
+                "WHERE codes.system = ? ORDER BY categories.position, codes.position", (system,))
+            for category, code, description in rows:
+                data[category][code] = description
+            return data
+
+    def replace(self, dataset, data):
+        """Replace a whole data set in one transaction."""
+        with self.lock, self.connection:
+            self._replace(dataset, data)
+
+    def apply(self, dataset, changes):
+        """Apply journal-style changes (see journal.apply_change) as single-row statements."""
+        with self.lock, self.connection:
+            for change in changes:
+                if dataset == USERS_DATASET:
+                    self._apply_user_change(change)
+                else:
+                    self._apply_code_change(DATASET_SYSTEMS[dataset], change)
+
+    def lookup(self, system, code):
+        """Return [(category, description)] for a code without loading the data set."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT category, description FROM codes WHERE system = ? AND code = ? ORDER BY id",
+                (system, code)).fetchall()
+
+    def search(self, query, system=None, limit=DEFAULT_LIMIT):
+        """Ranked full-text search: exact code, then code prefix, then FTS5 bm25."""
+        code_query = normalize_code(query)
+        tokens = tokenize(query)
+        system_filter = "" if system is None else " AND codes.system = :system"
+        parameters = {"system": system, "limit": limit, "code": code_query, "code_end": code_query + "\U0010ffff"}
+        statements = []
+        if code_query:
+            # Codes are stored as entered (the bundled data has "k29.4"), so the
+            # prefix is a range scan on the (system, upper(code)) expression index
+            statements.append(
+                "SELECT codes.id, CASE WHEN upper(codes.code) = :code THEN 100.0 ELSE 10.0 END AS score "
+                "FROM codes WHERE upper(codes.code) >= :code AND upper(codes.code) < :code_end" + system_filter)
+        if tokens:
+            parameters["match"] = " ".join(f'"{token}"*' for token in tokens)
+            statements.append(
+                "SELECT codes.id, -bm25(codes_fts) AS score FROM codes_fts "
+                "JOIN codes ON codes.id = codes_fts.rowid "
+                "WHERE codes_fts MATCH :match" + system_filter)
+        if not statements:
+            return []
+
+        sql = (
+            "SELECT codes.system, codes.code, codes.category, codes.description, SUM(matches.score) AS total "
+            f"FROM ({' UNION ALL '.join(statements)}) AS matches JOIN codes ON codes.id = matches.id "
+            "GROUP BY codes.id ORDER BY total DESC, codes.system, codes.code LIMIT :limit"
+        )
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        return [SearchResult(round(score, 3), system, code, category, description)
+                for system, code, category, description, score in rows]
+
+    def _replace(self, dataset, data):
+        if dataset == USERS_DATASET:
+            self.connection.execute("DELETE FROM users")
+            self.connection.executemany(
+                "INSERT INTO users (username, position, data) VALUES (?, ?, ?)",
+                ((username, position, json.dumps(info)) for position, (username, info) in enumerate(data.items())))
+            return
+
+        system = DATASET_SYSTEMS[dataset]
+        self.connection.execute("DELETE FROM codes WHERE system = ?", (system,))
+        self.connection.execute("DELETE FROM categories WHERE system = ?", (system,))
+        for position, (category, category_codes) in enumerate(data.items()):
+            self.connection.execute(
+                "INSERT INTO categories (system, name, position) VALUES (?, ?, ?)", (system, category, position))
+            self._insert_codes(system, category, category_codes)
+
+    def _insert_codes(self, system, category, category_codes):
+        rows = ((system, category, code, description, position)
+                for position, (code, description) in enumerate(category_codes.items()))
+        self.connection.executemany(
+            "INSERT INTO codes (system, category, code, description, position) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def _ensure_category(self, system, category):
+        self.connection.execute(
+            "INSERT OR IGNORE INTO categories (system, name, position) "
+            "SELECT ?, ?, COALESCE(MAX(position), -1) + 1 FROM categories WHERE system = ?",
+            (system, category, system))
+
+    def _apply_code_change(self, system, change):
+        path = change["path"]
+        category = path[0]
+        if len(path) == 1:
+            self.connection.execute("DELETE FROM codes WHERE system = ? AND category = ?", (system, category))
+            if change["op"] == "delete":
+                self.connection.execute("DELETE FROM categories WHERE system = ? AND name = ?", (system, category))
+            else:
+                self._ensure_category(system, category)
+                self._insert_codes(system, category, change["value"])
+            return
+
+        self._ensure_category(system, category)
+        key = path[1]
+        if change["op"] == "delete":
+            self.connection.execute(
+                "DELETE FROM codes WHERE system = ? AND category = ? AND code = ?", (system, category, key))
+            return
+
+        code, description = key, change["value"]
+        updated = self.connection.execute(
+            "UPDATE codes SET description = ? WHERE system = ? AND category = ? AND code = ?",
+            (description, system, category, code))
+        if updated.rowcount == 0:
+            self.connection.execute(
+                "INSERT INTO codes (system, category, code, description, position) "
+                "SELECT ?, ?, ?, ?, COALESCE(MAX(position), -1) + 1 FROM codes WHERE system = ? AND category = ?",
+                (system, category, code, description, system, category))
+
+    def _apply_user_change(self, change):
+        username = change["path"][0]
+        if len(change["path"]) > 1:
+            # Nested user field edits rewrite the whole user record
+            info = json.loads(self.connection.execute(
+                "SELECT data FROM users WHERE username = ?", (username,)).fetchone()[0])
+            apply_change(info, dict(change, path=change["path"][1:]))
+            change = {"op": "set", "path": [username], "value": info}
+        if change["op"] == "delete":
+            self.connection.execute("DELETE FROM users WHERE username = ?", (username,))
+            return
+        updated = self.connection.execute(
+            "UPDATE users SET data = ? WHERE username = ?", (json.dumps(change["value"]), username))
+        if updated.rowcount == 0:
+            self.connection.execute(
+                "INSERT INTO users (username, position, data) "
+                "SELECT ?, COALESCE(MAX(position), -1) + 1, ? FROM users",
+                (username, json.dumps(change["value"])))
+
+
+class SQLiteTable:
+    """Gives one data set in a SQLiteCodeStore the ChangeJournal interface.
+
+    Each record() is written to the database as one transaction, so there is
+    nothing to replay on load and nothing to compact on close. With an
+    executor (io_executor.IOExecutor) the transactions run in the background:
+    writes wait in order in `waiting`, and a full replace drops the waiting
+    changes it already contains, as ChangeJournal.compact() does.
+    """
+
+    def __init__(self, store, dataset, executor=None):
+        self.store = store
+        self.dataset = dataset
+        self.executor = executor
+        self.lock = threading.Lock()
+        self.waiting = []  # ("apply", changes) or ("replace", data), oldest first
+
+    def replay(self, data):
+        return data
+
+    def record(self, data, *changes):
+        for change in changes:
+            apply_change(data, change)
+        self._write("apply", json.loads(json.dumps(changes)))  # Values may be edited in place later
+
+    def compact(self, data, force=False):
+        if force:
+            self._write("replace", json.loads(json.dumps(data)))
+
+    def _write(self, op, value):
+        if self.executor is None:
+            self._run(op, value)
+            return
+        with self.lock:
+            if op == "replace":
+                self.waiting = []
+            self.waiting.append((op, value))
+        self.executor.submit((self.store.path, self.dataset), self.write_waiting)
+
+    def write_waiting(self):
+        """Run the waiting transactions in order."""
+        with self.lock:
+            waiting, self.waiting = self.waiting, []
+        for op, value in waiting:
+            self._run(op, value)
+
+    def _run(self, op, value):
+        if op == "replace":
+            self.store.replace(self.dataset, value)
+        else:
+            self.store.apply(self.dataset, value)
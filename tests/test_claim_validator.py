@@ -0,0 +1,75 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from claim_validator import (ClaimTables, validate_record, validate_file, OK, UNKNOWN_CODE, WRONG_SYSTEM,
+                             DELETED_CODE, CATEGORY_MISMATCH, MALFORMED_LINE)
+
+ICD10_CODES = {"Endocrine (E00–E89)": {"E11.9": "Type 2 diabetes mellitus without complications"}}
+CPT_CODES = {"Medicine": {"90686": "Influenza vaccine"}, "Surgery": {"27447": "Total knee arthroplasty"}}
+PREVIOUS_CPT = {"Surgery": {"27447": "Total knee arthroplasty", "27445": "Retired arthroplasty"}}
+
+
+class ClaimValidatorTest(unittest.TestCase):
+    def setUp(self):
+        self.tables = ClaimTables(ICD10_CODES, CPT_CODES, previous_cpt=PREVIOUS_CPT)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def statuses(self, record):
+        return [(field, status) for field, status, _ in validate_record(self.tables, record)]
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", newline="") as file:
+            file.write(text)
+        return path
+
+    def test_valid_line(self):
+        self.assertEqual(self.statuses({"dx": "E11.9", "px": "90686"}), [])
+        self.assertEqual(self.statuses({"Diagnosis": "e119", "CPT": " 90686 "}), [])
+
+    def test_problems(self):
+        self.assertEqual(self.tables.check("CPT", "99999"), (UNKNOWN_CODE, "99999 is not in CPT"))
+        self.assertEqual(self.statuses({"dx": "90686", "px": "27445"}), [("diagnosis", WRONG_SYSTEM), ("procedure", DELETED_CODE)])
+        self.assertEqual(self.statuses({"dx": "E11.9", "px": "27447", "cpt_category": "Medicine"}), [("procedure", CATEGORY_MISMATCH)])
+        self.assertEqual(self.tables.check("CPT", "27447", "Surgery"), (OK, None))
+
+    def test_numeric_values(self):
+        self.assertEqual(self.statuses({"dx": "E11.9", "cpt": 90686}), [])
+        self.assertEqual(self.statuses({"dx": "E11.9", "cpt": 12345}), [("procedure", UNKNOWN_CODE)])
+
+    def test_missing_or_empty_codes_are_malformed(self):
+        self.assertEqual(self.statuses({"cpt": "90686"}), [("diagnosis", MALFORMED_LINE)])
+        self.assertEqual(self.statuses({"dx": "", "px": "  "}), [("diagnosis", MALFORMED_LINE), ("procedure", MALFORMED_LINE)])
+        self.assertEqual(self.statuses({"dx": ["E11.9"], "px": True}), [("diagnosis", MALFORMED_LINE), ("procedure", MALFORMED_LINE)])
+
+    def test_csv_file(self):
+        path = self.write("claims.csv", 'dx,px,note\nE11.9,90686,ok\n,\n"E11.9","27447","two\nlines"\n\nD50,\n')
+        results = [(line, [status for _, status, _ in problems]) for line, problems in validate_file(path, self.tables, workers=1)]
+        self.assertEqual(results, [
+            (2, []),
+            (3, [MALFORMED_LINE, MALFORMED_LINE]),
+            (4, []),  # A quoted field spanning lines is one row, numbered by its first line
+            (7, [UNKNOWN_CODE, MALFORMED_LINE]),
+        ])
+
+    def test_csv_file_in_small_chunks(self):
+        path = self.write("claims.csv", "dx,px\n" + "E11.9,90686\n" * 5 + "E11.9,1\n")
+        results = list(validate_file(path, self.tables, workers=1, chunk_lines=2))
+        self.assertEqual([line for line, _ in results], list(range(2, 8)))
+        self.assertEqual(results[-1][1][0][1], UNKNOWN_CODE)
+
+    def test_jsonl_file(self):
+        lines = [json.dumps({"dx": "E11.9", "px": 90686}), "not json", "", json.dumps(["E11.9"]), json.dumps({"dx": "E11.9"})]
+        path = self.write("claims.jsonl", "\n".join(lines) + "\n")
+        results = [(line, [status for _, status, _ in problems]) for line, problems in validate_file(path, self.tables, workers=1)]
+        self.assertEqual(results, [(1, []), (2, [MALFORMED_LINE]), (4, [MALFORMED_LINE]), (5, [MALFORMED_LINE])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+
+import code_benchmark
+from code_benchmark import (HeadlessTree, generate_code_sets, write_data_dir, stats, traced_peak, compare,
+                            benchmark_size, ICD10_CHAPTERS)
+from code_hierarchy import parse_category_range
+from search_index import cpt_from_records
+
+
+def count(codes):
+    return sum(len(category_codes) for category_codes in codes.values())
+
+
+class GenerateTest(unittest.TestCase):
+    def test_sizes(self):
+        for size in (10, 1000):
+            icd10_codes, cpt_codes = generate_code_sets(size)
+            self.assertEqual(count(icd10_codes) + count(cpt_codes), size)
+            self.assertEqual(count(cpt_codes), int(size * code_benchmark.CPT_SHARE))
+
+    def test_deterministic(self):
+        self.assertEqual(generate_code_sets(500), generate_code_sets(500))
+        self.assertNotEqual(generate_code_sets(500, seed=1), generate_code_sets(500))
+
+    def test_codes_sit_in_their_chapter(self):
+        icd10_codes, _ = generate_code_sets(2000)
+        self.assertEqual(len(icd10_codes), len(ICD10_CHAPTERS))
+        for category, category_codes in icd10_codes.items():
+            start, end = parse_category_range(category)
+            for code in category_codes:
+                self.assertTrue(start <= code[:3] <= end, (category, code))
+            self.assertEqual(list(category_codes), sorted(category_codes))
+
+    def test_write_data_dir(self):
+        directory = tempfile.mkdtemp()
+        try:
+            icd10_count, cpt_count = write_data_dir(directory, 300)
+            self.assertEqual(icd10_count + cpt_count, 300)
+            with open(os.path.join(directory, "config.json")) as file:
+                config = json.load(file)
+            with open(config["CPT_FILE"]) as file:
+                self.assertEqual(count(cpt_from_records(json.load(file))), cpt_count)
+            with open(config["USER_DB_FILE"]) as file:
+                self.assertEqual(json.load(file), {})
+            self.assertEqual(os.path.dirname(config["SNAPSHOT_FILE"]), directory)
+        finally:
+            shutil.rmtree(directory)
+
+
+class StatsTest(unittest.TestCase):
+    def test_stats(self):
+        summary = stats([0.3, 0.1, 0.2], peak=5.0)
+        self.assertEqual((summary["min"], summary["max"], summary["median"], summary["rounds"]), (0.1, 0.3, 0.2, 3))
+        self.assertAlmostEqual(summary["mean"], 0.2)
+        self.assertAlmostEqual(summary["stddev"], 0.1)
+        self.assertEqual(summary["peak_mb"], 5.0)
+        self.assertEqual(stats([0.5])["stddev"], 0.0)
+
+    def test_traced_peak(self):
+        self.assertGreater(traced_peak(lambda: bytearray(4 * 2 ** 20)), 3.5)
+
+    def result(self, size, **medians):
+        return {"size": size, "benchmarks": {name: stats([median]) for name, median in medians.items()}}
+
+    def test_compare(self):
+        baseline = {"results": [self.result(1000, search=0.010, load=0.100, gone=1.0)]}
+        results = [self.result(1000, search=0.013, load=0.105, new=1.0), self.result(5000, search=1.0)]
+        output = io.StringIO()
+        with redirect_stdout(output):
+            regressions = compare(results, baseline, 0.2)
+        self.assertEqual(regressions, ["1000:search"])
+        self.assertIn("REGRESSION", output.getvalue())
+        self.assertNotIn("5,000", output.getvalue())  # No baseline for that size
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(compare(results, baseline, 0.5), [])
+
+
+class HeadlessTreeTest(unittest.TestCase):
+    def test_insert_and_delete(self):
+        tree = HeadlessTree()
+        parent = tree.insert("", "end", text="Category")
+        child = tree.insert(parent, "end", text="Code", values=("A00",))
+        self.assertEqual(tree.get_children(), (parent,))
+        self.assertEqual(tree.get_children(parent), (child,))
+        tree.item(child, text="Renamed")
+        self.assertEqual(tree.items[child], {"text": "Renamed", "values": ("A00",)})
+        tree.delete(parent)
+        self.assertEqual(tree.get_children(), ())
+        self.assertNotIn(child, tree.items)
+
+
+class BenchmarkRunTest(unittest.TestCase):
+    def test_small_run(self):
+        with redirect_stderr(io.StringIO()):
+            result = benchmark_size(200, 1, 1)
+        self.assertEqual(result["icd10"] + result["cpt"], 200)
+        self.assertIn(result["tree"], ("tk", "headless"))
+        for name in ("load.json", "load.snapshot", "search.typed", "tree.populate", "save.single_change"):
+            self.assertEqual(result["benchmarks"][name]["rounds"], 1)
+            self.assertIsNotNone(result["benchmarks"][name]["peak_mb"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+
+from code_details import (CodeDetailCache, build_code_detail, format_code_detail, _neighbours,
+                          DOCUMENTATION_TIPS, RELATED_LIMIT)
+from code_hierarchy import CodeHierarchy
+from code_locator import CodeLocator
+from search_index import ICD10_SYSTEM, CPT_SYSTEM
+
+BLOOD = "Diseases of the Blood (D50–D89)"
+ICD10_CODES = {
+    BLOOD: {
+        "D50": "Iron deficiency anemia",
+        "D50.0": "Iron deficiency anemia secondary to blood loss (chronic)",
+        "D50.1": "Sideropenic dysphagia",
+        "D50.9": "Iron deficiency anemia, unspecified",
+        "D51.0": "Vitamin B12 deficiency anemia due to intrinsic factor deficiency",
+        "D64.9": "Anemia, unspecified",
+    },
+}
+CPT_CODES = {
+    "Category III Codes": {"0545T": "Transcatheter tricuspid valve annulus reconstruction",
+                           "0546T": "Radiofrequency spectroscopy", "0001F": "Heart failure assessed"},
+    "Evaluation and Management (E/M)": {str(99201 + number): f"Visit {number}" for number in range(15)},
+}
+
+
+class CodeDetailTest(unittest.TestCase):
+    def setUp(self):
+        self.hierarchy = CodeHierarchy(ICD10_CODES)
+        self.locator = CodeLocator()
+        self.locator.rebuild(ICD10_CODES, CPT_CODES)
+
+    def detail(self, system, code):
+        codes = ICD10_CODES if system == ICD10_SYSTEM else CPT_CODES
+        return build_code_detail(system, code, codes, self.locator, self.hierarchy)
+
+    def test_unknown_code(self):
+        self.assertIsNone(self.detail(ICD10_SYSTEM, "Z00.0"))
+        self.assertIsNone(self.detail(CPT_SYSTEM, "D50.9"))
+
+    def test_icd10_category_lists_its_subcodes(self):
+        detail = self.detail(ICD10_SYSTEM, "D50")
+        self.assertEqual(detail.category, BLOOD)
+        self.assertEqual(detail.description, "Iron deficiency anemia")
+        self.assertEqual(detail.parents, [BLOOD])
+        self.assertEqual([code for code, _ in detail.related], ["D50.0", "D50.1", "D50.9"])
+        self.assertEqual(detail.related[1], ("D50.1", "Sideropenic dysphagia"))
+        self.assertEqual(detail.tips[0], "D50 has 3 more specific codes; report the most specific one that applies.")
+        self.assertEqual(detail.tips[1:], DOCUMENTATION_TIPS[ICD10_SYSTEM])
+
+    def test_icd10_subcode_lists_its_siblings(self):
+        detail = self.detail(ICD10_SYSTEM, "D50.1")
+        self.assertEqual(detail.parents, [BLOOD, "D50"])
+        self.assertEqual([code for code, _ in detail.related], ["D50.0", "D50.9"])
+        self.assertEqual(detail.tips, DOCUMENTATION_TIPS[ICD10_SYSTEM])
+
+    def test_icd10_lone_code_lists_its_block_neighbours(self):
+        detail = self.detail(ICD10_SYSTEM, "D64.9")
+        self.assertEqual(detail.parents, [BLOOD, "D64"])
+        self.assertEqual([code for code, _ in detail.related], ["D50", "D50.0", "D50.1", "D50.9", "D51.0"])
+
+    def test_cpt_neighbours_in_code_order(self):
+        detail = self.detail(CPT_SYSTEM, "99207")
+        self.assertEqual(detail.parents, ["Evaluation and Management (E/M)"])
+        self.assertEqual([code for code, _ in detail.related],
+                         ["99202", "99203", "99204", "99205", "99206", "99208", "99209", "99210", "99211", "99212"])
+        self.assertEqual(detail.tips, DOCUMENTATION_TIPS[CPT_SYSTEM])
+
+    def test_cpt_suffix_tips(self):
+        detail = self.detail(CPT_SYSTEM, "0545T")
+        self.assertTrue(detail.tips[0].startswith("Category III code"))
+        self.assertEqual([code for code, _ in detail.related], ["0001F", "0546T"])
+        self.assertTrue(self.detail(CPT_SYSTEM, "0001F").tips[0].startswith("Category II code"))
+
+    def test_neighbours(self):
+        codes = [str(number) for number in range(10, 30)]
+        self.assertEqual(_neighbours(codes, "10"), ["11", "12", "13", "14", "15"])
+        self.assertEqual(_neighbours(codes, "20"), ["15", "16", "17", "18", "19", "21", "22", "23", "24", "25"])
+        self.assertEqual(len(_neighbours(codes, "29")), RELATED_LIMIT // 2)
+        self.assertEqual(_neighbours(codes, "20.5"), [])
+        self.assertEqual(_neighbours(codes, "99"), [])
+
+    def test_format(self):
+        text = format_code_detail(self.detail(ICD10_SYSTEM, "D50.1"))
+        self.assertEqual(text.splitlines()[:3], ["ICD-10 Code: D50.1", "Description: Sideropenic dysphagia",
+                                                 f"Under: {BLOOD} > D50"])
+        self.assertIn("Documentation Tips:\n- Document diagnosis with specificity.", text)
+        self.assertTrue(text.endswith("Related Codes:\n- D50.0: Iron deficiency anemia secondary to blood loss (chronic)\n"
+                                      "- D50.9: Iron deficiency anemia, unspecified"))
+
+    def test_format_without_related_codes(self):
+        detail = self.detail(CPT_SYSTEM, "0546T")._replace(related=[])
+        self.assertNotIn("Related Codes", format_code_detail(detail))
+
+
+class CodeDetailCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.builds = []
+
+    def builder(self, value):
+        def build():
+            self.builds.append(value)
+            return value
+        return build
+
+    def test_builds_once(self):
+        cache = CodeDetailCache()
+        self.assertEqual(cache.get("a", 1, self.builder("A")), "A")
+        self.assertEqual(cache.get("a", 1, self.builder("other")), "A")
+        self.assertEqual(self.builds, ["A"])
+
+    def test_least_recently_used_goes_first(self):
+        cache = CodeDetailCache(2)
+        cache.get("a", 1, self.builder("A"))
+        cache.get("b", 1, self.builder("B"))
+        cache.get("a", 1, self.builder("A"))
+        cache.get("c", 1, self.builder("C"))
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        cache.get("b", 1, self.builder("B"))
+        self.assertEqual(self.builds, ["A", "B", "C", "B"])
+
+    def test_new_version_rebuilds(self):
+        cache = CodeDetailCache()
+        cache.get("a", 1, self.builder("A"))
+        self.assertEqual(cache.get("a", 2, self.builder("A2")), "A2")
+        cache.clear()
+        self.assertEqual(cache.get("a", 2, self.builder("A3")), "A3")
+
+    def test_missing_codes_are_not_cached(self):
+        cache = CodeDetailCache()
+        self.assertIsNone(cache.get("z", 1, self.builder(None)))
+        self.assertIsNone(cache.get("z", 1, self.builder(None)))
+        self.assertEqual(self.builds, [None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import io
+import os
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from code_export import iter_export_rows, export_codes, write_csv, write_jsonl, parse_code_range, in_code_range
+from search_index import ICD10_SYSTEM, CPT_SYSTEM
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+BLOOD = "Diseases of the Blood (D50–D89)"
+NEOPLASMS = "Neoplasms (C00–D49)"
+ICD10_CODES = {
+    BLOOD: {"D50.9": "Iron deficiency anemia", "D64.9": "Anemia, unspecified", "D89.9": "Immune disorder"},
+    NEOPLASMS: {"C34.1": "Malignant neoplasm of upper lobe", "D49.9": "Neoplasm of unspecified behavior"},
+}
+CPT_CODES = {
+    "Surgery": {"27447": "Total knee arthroplasty"},
+    "Pathology and Laboratory": {"85025": "Complete blood count"},
+}
+
+
+class RecordingLock:
+    """Context manager that notes whether it is held."""
+
+    def __init__(self):
+        self.held = False
+        self.entered = 0
+
+    def __enter__(self):
+        self.held = True
+        self.entered += 1
+
+    def __exit__(self, *exc_info):
+        self.held = False
+
+
+class CodeRangeTest(unittest.TestCase):
+    def test_parse(self):
+        self.assertIsNone(parse_code_range(""))
+        self.assertEqual(parse_code_range("d50-D89"), ("D50", "D89"))
+        self.assertEqual(parse_code_range("A00.1-"), ("A001", ""))
+        self.assertEqual(parse_code_range("-B99"), ("", "B99"))
+
+    def test_in_range(self):
+        self.assertTrue(in_code_range("D50.9", ("D50", "D89")))
+        self.assertTrue(in_code_range("d89.9", ("D50", "D89")))  # The end matches as a prefix
+        self.assertFalse(in_code_range("D49.9", ("D50", "D89")))
+        self.assertFalse(in_code_range("D90", ("D50", "D89")))
+        self.assertTrue(in_code_range("Z99", ("D50", "")))
+        self.assertTrue(in_code_range("A00", ("", "D89")))
+
+
+class ExportRowsTest(unittest.TestCase):
+    def rows(self, **kwargs):
+        return list(iter_export_rows(ICD10_CODES, CPT_CODES, **kwargs))
+
+    def test_all_rows_in_file_order(self):
+        rows = self.rows()
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0], (ICD10_SYSTEM, BLOOD, "D50.9", "Iron deficiency anemia"))
+        self.assertEqual(rows[-1], (CPT_SYSTEM, "Pathology and Laboratory", "85025", "Complete blood count"))
+        self.assertEqual([row[2] for row in rows[:5]], ["D50.9", "D64.9", "D89.9", "C34.1", "D49.9"])
+
+    def test_filters(self):
+        self.assertEqual({row[0] for row in self.rows(systems=(CPT_SYSTEM,))}, {CPT_SYSTEM})
+        self.assertEqual([row[2] for row in self.rows(categories={NEOPLASMS, "Surgery"})], ["C34.1", "D49.9", "27447"])
+        self.assertEqual([row[2] for row in self.rows(systems=(ICD10_SYSTEM,), code_range=("D49", "D64"))],
+                         ["D50.9", "D64.9", "D49.9"])
+        self.assertEqual([row[2] for row in self.rows(query="anemia")], ["D50.9", "D64.9"])
+        self.assertEqual([row[2] for row in self.rows(query="blood", systems=(CPT_SYSTEM,))], ["85025"])
+        self.assertEqual(self.rows(query="anemia", systems=(CPT_SYSTEM,)), [])
+
+    def test_rows_are_lazy(self):
+        rows = iter_export_rows(ICD10_CODES, CPT_CODES)
+        self.assertEqual(next(rows)[2], "D50.9")
+        # Rows come from per-category copies, so edits elsewhere don't break the walk
+        codes = {category: dict(category_codes) for category, category_codes in ICD10_CODES.items()}
+        rows = iter_export_rows(codes, {}, systems=(ICD10_SYSTEM,))
+        next(rows)
+        codes[BLOOD]["D51.0"] = "Vitamin B12 deficiency anemia"
+        codes[NEOPLASMS]["C00.0"] = "Malignant neoplasm of external upper lip"
+        self.assertEqual([row[2] for row in rows], ["D64.9", "D89.9", "C34.1", "D49.9", "C00.0"])
+
+    def test_lock_is_released_between_categories(self):
+        lock = RecordingLock()
+        for row in iter_export_rows(ICD10_CODES, CPT_CODES, lock=lock):
+            self.assertFalse(lock.held)
+        # Once for each system's category names, once for each category
+        self.assertEqual(lock.entered, 2 + len(ICD10_CODES) + len(CPT_CODES))
+
+
+class ExportFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rows = list(iter_export_rows(ICD10_CODES, CPT_CODES))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_csv(self):
+        path = os.path.join(self.directory, "codes.csv")
+        self.assertEqual(export_codes(iter(self.rows), path, "csv"), 7)
+        with open(path, newline="", encoding="utf-8") as file:
+            lines = list(csv.reader(file))
+        self.assertEqual(lines[0], ["system", "category", "code", "description"])
+        self.assertEqual([tuple(line) for line in lines[1:]], self.rows)
+
+    def test_jsonl(self):
+        path = os.path.join(self.directory, "codes.jsonl")
+        self.assertEqual(export_codes(iter(self.rows), path, "jsonl"), 7)
+        with open(path, encoding="utf-8") as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(records[0], {"system": ICD10_SYSTEM, "category": BLOOD, "code": "D50.9",
+                                      "description": "Iron deficiency anemia"})
+        self.assertEqual(len(records), 7)
+
+    def test_writers_stream(self):
+        written = []
+
+        def rows():
+            for row in self.rows:
+                written.append(file.getvalue().count("\n"))
+                yield row
+
+        file = io.StringIO()
+        write_jsonl(rows(), file)
+        # Each row is written before the next one is asked for
+        self.assertEqual(written, list(range(7)))
+        file = io.StringIO()
+        self.assertEqual(write_csv(iter([]), file), 0)
+        self.assertEqual(file.getvalue().strip(), "system,category,code,description")
+
+    def test_stdout(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(export_codes(iter(self.rows[:2]), "-", "jsonl"), 2)
+        self.assertEqual(len(output.getvalue().splitlines()), 2)
+        with self.assertRaises(ValueError):
+            export_codes(iter(self.rows), "-", "parquet")
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        path = os.path.join(self.directory, "codes.parquet")
+        self.assertEqual(export_codes(iter(self.rows), path, "parquet"), 7)
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.column_names, ["system", "category", "code", "description"])
+        self.assertEqual([tuple(row.values()) for row in table.to_pylist()], self.rows)
+
+    @unittest.skipIf(pyarrow is not None, "pyarrow is installed")
+    def test_parquet_needs_pyarrow(self):
+        with self.assertRaises(RuntimeError):
+            export_codes(iter(self.rows), os.path.join(self.directory, "codes.parquet"), "parquet")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from code_hierarchy import CodeHierarchy, parse_category_range, code_key
+
+ICD10_CODES = {
+    "Certain Infectious and Parasitic Diseases (A00–B99)": {"A00": "Cholera", "A00.0": "Cholera due to Vibrio cholerae 01",
+                                                            "A00.9": "Cholera, unspecified", "B01.9": "Varicella"},
+    "Intestinal infectious diseases (A00–A09)": {"A09": "Infectious gastroenteritis"},
+    "Diseases of the Blood (D50–D89)": {"D50.9": "Iron deficiency anemia", "D64.9": "Anemia", "D89.9": "Immune disorder"},
+    "Neoplasms (C00–D49)": {"C34.1": "Malignant neoplasm of upper lobe", "D49.9": "Neoplasm of unspecified behavior"},
+}
+
+
+class CodeHierarchyTest(unittest.TestCase):
+    def setUp(self):
+        self.hierarchy = CodeHierarchy(ICD10_CODES)
+
+    def test_parse_category_range(self):
+        self.assertEqual(parse_category_range("Neoplasms (C00–D49)"), ("C00", "D49"))
+        self.assertEqual(parse_category_range("Neoplasms (C00-D49)"), ("C00", "D49"))
+        self.assertIsNone(parse_category_range("Other"))
+        self.assertEqual(code_key(" c34.1 "), "C341")
+
+    def test_chapters_and_blocks(self):
+        self.assertEqual(self.hierarchy.chapter_of("A05.2"), "Certain Infectious and Parasitic Diseases (A00–B99)")
+        self.assertEqual(self.hierarchy.block_of("A05.2"), "Intestinal infectious diseases (A00–A09)")
+        self.assertEqual(self.hierarchy.block_of("B01.9"), "Certain Infectious and Parasitic Diseases (A00–B99)")
+        self.assertIsNone(self.hierarchy.chapter_of("Z00.0"))
+        self.assertEqual(self.hierarchy.path("A00.0"), [
+            "Certain Infectious and Parasitic Diseases (A00–B99)", "Intestinal infectious diseases (A00–A09)", "A00", "A00.0"])
+
+    def test_codes_in_range(self):
+        self.assertEqual(self.hierarchy.codes_in_range("D50", "D89"), ["D50.9", "D64.9", "D89.9"])
+        # The end of a range includes its subcodes, and ranges are inclusive across chapters
+        self.assertEqual(self.hierarchy.codes_in_range("D49", "D50"), ["D49.9", "D50.9"])
+        self.assertEqual(self.hierarchy.codes_in_range("a00.0", "A00.9"), ["A00.0", "A00.9"])
+        self.assertEqual(self.hierarchy.codes_in_range("E00", "E89"), [])
+        self.assertEqual(len(self.hierarchy.codes_in_range("", "")), 10)
+
+    def test_children_and_neighbours(self):
+        self.assertEqual(self.hierarchy.children("A00"), ["A00.0", "A00.9"])
+        self.assertEqual(self.hierarchy.children("A00.0"), [])
+        self.assertEqual(self.hierarchy.neighbours("D64.9", "D50", "D89", 1), ["D50.9", "D89.9"])
+        self.assertEqual(self.hierarchy.neighbours("D50.9", "D50", "D89", 5), ["D64.9", "D89.9"])
+        self.assertEqual(self.hierarchy.neighbours("Z00.0", "D50", "D89", 5), [])
+
+    def test_add_and_remove(self):
+        self.hierarchy.add_code("D50.0")
+        self.assertEqual(self.hierarchy.codes_in_range("D50", "D50"), ["D50.0", "D50.9"])
+        self.hierarchy.remove_code("D50.9")
+        self.assertEqual(self.hierarchy.codes_in_range("D50", "D50"), ["D50.0"])
+        self.hierarchy.remove_code("D50.9")  # Already gone
+        self.assertEqual(self.hierarchy.codes_in_range("D50", "D50"), ["D50.0"])
+
+    def test_codes_with_the_same_key_are_separate(self):
+        self.hierarchy.add_code("A000")
+        self.assertEqual(self.hierarchy.children("A00"), ["A00.0", "A000", "A00.9"])
+        self.hierarchy.remove_code("A000")
+        self.assertEqual(self.hierarchy.children("A00"), ["A00.0", "A00.9"])
+
+
+if __name__ == "__main__":
+    unittest.main()
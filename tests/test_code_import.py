@@ -0,0 +1,84 @@
+import os
+import copy
+import unittest
+
+from code_import import read_code_file, merge_codes, CodeMerger, CodeClassifier, format_icd10_code
+from search_index import ICD10_SYSTEM, CPT_SYSTEM
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+ICD10_CODES = {
+    "Certain Infectious and Parasitic Diseases (A00–B99)": {"A00.0": "Cholera (old description)"},
+    "Endocrine, Nutritional and Metabolic Diseases (E00–E89)": {},
+    "Diseases of the Respiratory System (J00–J99)": {},
+}
+
+
+class CodeImportTest(unittest.TestCase):
+    def test_format_icd10_code(self):
+        self.assertEqual(format_icd10_code("a000"), "A00.0")
+        self.assertEqual(format_icd10_code("S72001A"), "S72.001A")
+        self.assertEqual(format_icd10_code("I10"), "I10")
+
+    def test_read_order_file(self):
+        entries = list(read_code_file(os.path.join(SAMPLES, "icd10cm_order_sample.txt")))
+        self.assertEqual(len(entries), 13)
+        self.assertEqual(entries[1], ("A000", "Cholera due to Vibrio cholerae 01, biovar cholerae"))
+        billable = list(read_code_file(os.path.join(SAMPLES, "icd10cm_order_sample.txt"), billable_only=True))
+        self.assertEqual([code for code, _ in entries if code not in dict(billable)], ["A00"])
+
+    def test_read_csv(self):
+        entries = list(read_code_file(os.path.join(SAMPLES, "cpt_sample.csv")))
+        self.assertEqual(len(entries), 9)
+        self.assertEqual(entries[0], ("99497", "Advance care planning, first 30 minutes"))
+        self.assertIn(("0545T", "Transcatheter tricuspid valve annulus reconstruction"), entries)
+
+    def test_classify_cpt(self):
+        classifier = CodeClassifier(CPT_SYSTEM, ())
+        self.assertEqual(classifier.classify("27447"), "Surgery")
+        self.assertEqual(classifier.classify("99213"), "Evaluation and Management (E/M)")
+        self.assertEqual(classifier.classify("1036F"), "Category II Codes")
+        self.assertEqual(classifier.classify("0545T"), "Category III Codes")
+        self.assertIsNone(classifier.classify("99999"))
+
+    def test_merge_order_file(self):
+        codes = copy.deepcopy(ICD10_CODES)
+        with self.assertLogs(level="WARNING"):
+            added, updated, unclassified = merge_codes(ICD10_SYSTEM, codes, read_code_file(os.path.join(SAMPLES, "icd10cm_order_sample.txt")))
+        self.assertEqual((added, updated, unclassified), (5, 1, 7))
+        self.assertEqual(codes["Certain Infectious and Parasitic Diseases (A00–B99)"]["A00.0"], "Cholera due to Vibrio cholerae 01, biovar cholerae")
+        self.assertIn("E11.9", codes["Endocrine, Nutritional and Metabolic Diseases (E00–E89)"])
+        self.assertIn("J06.9", codes["Diseases of the Respiratory System (J00–J99)"])
+
+    def test_batches_match_one_merge(self):
+        whole = copy.deepcopy(ICD10_CODES)
+        with self.assertLogs(level="WARNING"):
+            expected = merge_codes(ICD10_SYSTEM, whole, read_code_file(os.path.join(SAMPLES, "icd10cm_order_sample.txt")))
+        batched = copy.deepcopy(ICD10_CODES)
+        merger = CodeMerger(ICD10_SYSTEM, batched)
+        entries = list(read_code_file(os.path.join(SAMPLES, "icd10cm_order_sample.txt")))
+        for start in range(0, len(entries), 4):
+            merger.merge(entries[start:start + 4])
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(merger.counts(), expected)
+        self.assertEqual(batched, whole)
+
+    def test_mixed_case_codes_match_the_stored_code(self):
+        codes = {"Diseases of the Digestive System (K00–K95)": {"k29.4": "Chronic gastritis"}}
+        self.assertEqual(merge_codes(ICD10_SYSTEM, codes, [("K294", "Chronic gastritis")]), (0, 0, 0))
+        self.assertEqual(merge_codes(ICD10_SYSTEM, codes, [("K29.4", "Chronic atrophic gastritis")]), (0, 1, 0))
+        self.assertEqual(codes["Diseases of the Digestive System (K00–K95)"], {"k29.4": "Chronic atrophic gastritis"})
+        cpt_codes = {"Category III Codes": {"0545t": "Tricuspid annulus reconstruction"}}
+        self.assertEqual(merge_codes(CPT_SYSTEM, cpt_codes, [(" 0545T", "Tricuspid annulus reconstruction")]), (0, 0, 0))
+        self.assertEqual(cpt_codes, {"Category III Codes": {"0545t": "Tricuspid annulus reconstruction"}})
+
+    def test_merge_cpt_csv(self):
+        codes = {"Surgery": {"27447": "Total knee arthroplasty"}}
+        added, updated, unclassified = merge_codes(CPT_SYSTEM, codes, read_code_file(os.path.join(SAMPLES, "cpt_sample.csv")))
+        self.assertEqual((added, updated, unclassified), (8, 0, 0))
+        self.assertEqual(codes["Category III Codes"], {"0545T": "Transcatheter tricuspid valve annulus reconstruction"})
+        self.assertEqual(codes["Anesthesia"], {"00102": "Anesthesia for procedures on plastic repair of cleft lip"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from code_locator import CodeLocator
+from search_index import ICD10_SYSTEM, CPT_SYSTEM
+
+ICD10_CODES = {
+    "Diseases of the Blood (D50–D89)": {"D64.9": "Anemia, unspecified", "D50.9": "Iron deficiency anemia"},
+    "Neoplasms (C00–D49)": {"C34.1": "Malignant neoplasm of upper lobe"},
+}
+CPT_CODES = {
+    "Surgery": {"27447": "Total knee arthroplasty", "27130": "Total hip arthroplasty"},
+    "Medicine": {"90686": "Influenza vaccine"},
+}
+
+
+class CodeLocatorTest(unittest.TestCase):
+    def setUp(self):
+        self.locator = CodeLocator()
+        self.locator.rebuild(ICD10_CODES, CPT_CODES)
+
+    def test_category_of(self):
+        self.assertEqual(self.locator.category_of(ICD10_SYSTEM, "D50.9"), "Diseases of the Blood (D50–D89)")
+        self.assertEqual(self.locator.category_of(CPT_SYSTEM, "90686"), "Medicine")
+        self.assertIsNone(self.locator.category_of(CPT_SYSTEM, "D50.9"))
+        self.assertIsNone(self.locator.category_of(ICD10_SYSTEM, "Z00.0"))
+
+    def test_codes_in_category_are_sorted(self):
+        self.assertEqual(self.locator.codes_in_category(ICD10_SYSTEM, "Diseases of the Blood (D50–D89)"),
+                         ["D50.9", "D64.9"])
+        self.assertEqual(self.locator.codes_in_category(CPT_SYSTEM, "Surgery"), ["27130", "27447"])
+        self.assertEqual(self.locator.codes_in_category(CPT_SYSTEM, "Radiology"), [])
+
+    def test_add_and_remove(self):
+        self.locator.add(CPT_SYSTEM, "27200", "Surgery")
+        self.assertEqual(self.locator.category_of(CPT_SYSTEM, "27200"), "Surgery")
+        self.assertEqual(self.locator.codes_in_category(CPT_SYSTEM, "Surgery"), ["27130", "27200", "27447"])
+
+        self.locator.remove(CPT_SYSTEM, "27130")
+        self.assertIsNone(self.locator.category_of(CPT_SYSTEM, "27130"))
+        self.assertEqual(self.locator.codes_in_category(CPT_SYSTEM, "Surgery"), ["27200", "27447"])
+        self.locator.remove(CPT_SYSTEM, "27130")  # Unknown codes are ignored
+
+    def test_add_moves_between_categories(self):
+        self.locator.add(CPT_SYSTEM, "27447", "Medicine")
+        self.assertEqual(self.locator.category_of(CPT_SYSTEM, "27447"), "Medicine")
+        self.assertEqual(self.locator.codes_in_category(CPT_SYSTEM, "Surgery"), ["27130"])
+        self.assertEqual(self.locator.codes_in_category(CPT_SYSTEM, "Medicine"), ["27447", "90686"])
+
+    def test_add_to_new_category(self):
+        self.locator.add(ICD10_SYSTEM, "E11.9", "Endocrine Diseases (E00–E89)")
+        self.assertEqual(self.locator.codes_in_category(ICD10_SYSTEM, "Endocrine Diseases (E00–E89)"), ["E11.9"])
+
+    def test_systems_are_separate(self):
+        self.locator.add(ICD10_SYSTEM, "27447", "Neoplasms (C00–D49)")
+        self.assertEqual(self.locator.category_of(CPT_SYSTEM, "27447"), "Surgery")
+        self.locator.remove(ICD10_SYSTEM, "27447")
+        self.assertEqual(self.locator.category_of(CPT_SYSTEM, "27447"), "Surgery")
+
+    def test_rebuild_system(self):
+        self.locator.rebuild_system(CPT_SYSTEM, {"Radiology": {"71046": "Chest X-ray"}})
+        self.assertEqual(self.locator.category_of(CPT_SYSTEM, "71046"), "Radiology")
+        self.assertIsNone(self.locator.category_of(CPT_SYSTEM, "27447"))
+        self.assertEqual(self.locator.codes_in_category(CPT_SYSTEM, "Surgery"), [])
+        # The other system is untouched
+        self.assertEqual(self.locator.category_of(ICD10_SYSTEM, "C34.1"), "Neoplasms (C00–D49)")
+        self.assertEqual(self.locator.codes_in_category(ICD10_SYSTEM, "Diseases of the Blood (D50–D89)"),
+                         ["D50.9", "D64.9"])
+
+
+if __name__ == "__main__":
+    unittest.main()
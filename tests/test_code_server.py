@@ -0,0 +1,252 @@
+import copy
+import json
+import socket
+import asyncio
+import threading
+import unittest
+
+import explorer_core
+from code_server import CodeServer, ResponseCache
+
+ICD10_CODES = {
+    "Diseases of the Blood (D50–D89)": {
+        "D50.0": "Iron deficiency anemia secondary to blood loss (chronic)",
+        "D50.9": "Iron deficiency anemia, unspecified",
+    },
+}
+CPT_CODES = {
+    "Evaluation and Management (E/M)": {
+        "99213": "Office visit, established patient, low complexity",
+    },
+}
+
+
+def read_response(sock, head_only=False):
+    """Read one response off the socket: (status, headers, body)."""
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    head, _, body = data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = 0 if head_only else int(headers.get("content-length", 0))
+    while len(body) < length:
+        body += sock.recv(4096)
+    return int(lines[0].split(" ")[1]), headers, body
+
+
+def is_closed(sock):
+    sock.settimeout(5)
+    return sock.recv(1) == b""
+
+
+class CodeServerTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (dict(explorer_core.ICD10_CODES), dict(explorer_core.CPT_CODES),
+                      explorer_core.DATA_LOADED, explorer_core.INDEX_LOADED)
+        explorer_core.ICD10_CODES.clear()
+        explorer_core.ICD10_CODES.update(copy.deepcopy(ICD10_CODES))
+        explorer_core.CPT_CODES.clear()
+        explorer_core.CPT_CODES.update(copy.deepcopy(CPT_CODES))
+        explorer_core.SEARCH_INDEX.rebuild(explorer_core.ICD10_CODES, explorer_core.CPT_CODES)
+        explorer_core.CODE_LOCATOR.rebuild(explorer_core.ICD10_CODES, explorer_core.CPT_CODES)
+        explorer_core.CODE_HIERARCHY.rebuild(explorer_core.ICD10_CODES)
+        explorer_core.DATA_LOADED = explorer_core.INDEX_LOADED = True
+
+        self.server = CodeServer("127.0.0.1", 0)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.sockets = []
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+
+        async def stop():
+            self.server.server.close()
+            await self.server.server.wait_closed()
+            # Let the connection handlers see their clients go away
+            pending = asyncio.all_tasks() - {asyncio.current_task()}
+            if pending:
+                await asyncio.wait(pending, timeout=5)
+
+        asyncio.run_coroutine_threadsafe(stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+        icd10_codes, cpt_codes, explorer_core.DATA_LOADED, explorer_core.INDEX_LOADED = self.saved
+        explorer_core.ICD10_CODES.clear()
+        explorer_core.ICD10_CODES.update(icd10_codes)
+        explorer_core.CPT_CODES.clear()
+        explorer_core.CPT_CODES.update(cpt_codes)
+        explorer_core.SEARCH_INDEX.rebuild(explorer_core.ICD10_CODES, explorer_core.CPT_CODES)
+        explorer_core.CODE_LOCATOR.rebuild(explorer_core.ICD10_CODES, explorer_core.CPT_CODES)
+        explorer_core.CODE_HIERARCHY.rebuild(explorer_core.ICD10_CODES)
+
+    def connect(self):
+        sock = socket.create_connection(("127.0.0.1", self.server.port), timeout=5)
+        self.sockets.append(sock)
+        return sock
+
+    def request(self, sock, target, method="GET", version="HTTP/1.1", headers=()):
+        lines = [f"{method} {target} {version}", "Host: localhost"] + list(headers)
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        return read_response(sock, head_only=method == "HEAD")
+
+    def get(self, target, **kwargs):
+        return self.request(self.connect(), target, headers=["Connection: close"], **kwargs)
+
+    def test_lookup(self):
+        status, headers, body = self.get("/lookup?code=d50.9&code=99213&code=Z99")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json; charset=utf-8")
+        results = json.loads(body)["results"]
+        self.assertEqual([result["code"] for result in results], ["d50.9", "99213", "Z99"])
+        self.assertEqual(results[0]["matches"], [{"system": "ICD-10", "category": "Diseases of the Blood (D50–D89)",
+                                                  "description": "Iron deficiency anemia, unspecified"}])
+        self.assertEqual(results[1]["matches"][0]["system"], "CPT")
+        self.assertEqual(results[2]["matches"], [])
+
+    def test_lookup_needs_a_code(self):
+        status, _, body = self.get("/lookup")
+        self.assertEqual(status, 400)
+        self.assertIn("code is required", json.loads(body)["error"])
+
+    def test_search(self):
+        status, _, body = self.get("/search?q=anemia&system=ICD-10&limit=1")
+        self.assertEqual(status, 200)
+        result = json.loads(body)
+        self.assertEqual(result["query"], "anemia")
+        self.assertEqual(len(result["results"]), 1)
+        self.assertEqual(result["results"][0]["system"], "ICD-10")
+
+    def test_search_bad_limit(self):
+        status, _, body = self.get("/search?q=anemia&limit=lots")
+        self.assertEqual(status, 400)
+        self.assertIn("limit", json.loads(body)["error"])
+
+    def test_autocomplete(self):
+        status, _, body = self.get("/autocomplete?prefix=D50")
+        self.assertEqual(status, 200)
+        result = json.loads(body)
+        self.assertEqual([code["code"] for code in result["codes"]], ["D50.0", "D50.9"])
+        status, _, body = self.get("/autocomplete?prefix=anem")
+        self.assertIn("anemia", json.loads(body)["terms"])
+
+    def test_unknown_path_and_method(self):
+        self.assertEqual(self.get("/nowhere")[0], 404)
+        self.assertEqual(self.get("/lookup?code=D50.9", method="POST")[0], 405)
+
+    def test_head_has_no_body(self):
+        sock = self.connect()
+        status, headers, body = self.request(sock, "/health", method="HEAD")
+        self.assertEqual(status, 200)
+        self.assertGreater(int(headers["content-length"]), 0)
+        self.assertEqual(body, b"")
+        # The connection is still usable, so nothing was left unread
+        status, _, body = self.request(sock, "/health")
+        self.assertEqual(json.loads(body)["codes"], 3)
+
+    def test_etag_and_not_modified(self):
+        sock = self.connect()
+        status, headers, body = self.request(sock, "/lookup?code=D50.9")
+        etag = headers["etag"]
+        self.assertEqual(headers["cache-control"], "no-cache")
+
+        status, headers, body = self.request(sock, "/lookup?code=D50.9", headers=[f"If-None-Match: {etag}"])
+        self.assertEqual(status, 304)
+        self.assertEqual(headers["etag"], etag)
+        self.assertEqual(headers["content-length"], "0")
+        self.assertEqual(body, b"")
+
+        status, _, _ = self.request(sock, "/lookup?code=D50.9", headers=['If-None-Match: "stale"'])
+        self.assertEqual(status, 200)
+
+    def test_etag_changes_with_the_data(self):
+        _, headers, _ = self.get("/lookup?code=D50.9")
+        category = "Diseases of the Blood (D50–D89)"
+        explorer_core.ICD10_CODES[category]["D50.9"] = "Iron deficiency anemia"
+        explorer_core.SEARCH_INDEX.add("ICD-10", "D50.9", category, "Iron deficiency anemia")
+        status, headers_after, body = self.get("/lookup?code=D50.9")
+        self.assertNotEqual(headers_after["etag"], headers["etag"])
+        self.assertEqual(json.loads(body)["results"][0]["matches"][0]["description"], "Iron deficiency anemia")
+
+    def test_keep_alive_by_default(self):
+        sock = self.connect()
+        for _ in range(3):
+            status, headers, _ = self.request(sock, "/health")
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["connection"], "keep-alive")
+            self.assertIn("timeout=", headers["keep-alive"])
+
+    def test_connection_close(self):
+        sock = self.connect()
+        _, headers, _ = self.request(sock, "/health", headers=["Connection: close"])
+        self.assertEqual(headers["connection"], "close")
+        self.assertTrue(is_closed(sock))
+
+    def test_http_10_closes_unless_asked(self):
+        sock = self.connect()
+        _, headers, _ = self.request(sock, "/health", version="HTTP/1.0")
+        self.assertEqual(headers["connection"], "close")
+        self.assertTrue(is_closed(sock))
+
+        sock = self.connect()
+        _, headers, _ = self.request(sock, "/health", version="HTTP/1.0", headers=["Connection: keep-alive"])
+        self.assertEqual(headers["connection"], "keep-alive")
+        self.assertEqual(self.request(sock, "/health", version="HTTP/1.0")[0], 200)
+
+    def test_bad_content_length(self):
+        for length in ("abc", "-1"):
+            sock = self.connect()
+            status, headers, _ = self.request(sock, "/health", headers=[f"Content-Length: {length}"])
+            self.assertEqual(status, 400)
+            self.assertEqual(headers["connection"], "close")
+            self.assertTrue(is_closed(sock))
+
+    def test_body_is_skipped(self):
+        sock = self.connect()
+        sock.sendall(b"GET /health HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello")
+        self.assertEqual(read_response(sock)[0], 200)
+        self.assertEqual(self.request(sock, "/health")[0], 200)
+
+    def test_malformed_request_line(self):
+        sock = self.connect()
+        sock.sendall(b"NONSENSE\r\n\r\n")
+        status, _, body = read_response(sock)
+        self.assertEqual(status, 400)
+        self.assertTrue(is_closed(sock))
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_lru(self):
+        cache = ResponseCache(2)
+        self.assertIsNone(cache.get("a", 1))
+        cache.put("a", 1, "A")
+        cache.put("b", 1, "B")
+        self.assertEqual(cache.get("a", 1), "A")
+        cache.put("c", 1, "C")
+        self.assertIsNone(cache.get("b", 1))
+        self.assertEqual(cache.get("a", 1), "A")
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_new_version_drops_everything(self):
+        cache = ResponseCache()
+        cache.get("a", 1)
+        cache.put("a", 1, "A")
+        self.assertIsNone(cache.get("a", 2))
+        cache.put("b", 1, "B")  # Built from the old data
+        self.assertIsNone(cache.get("b", 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from code_snapshot import build_snapshot, open_fresh_snapshot, snapshot_sources
+from journal import ChangeJournal, set_change
+from search_index import SearchIndex, ICD10_SYSTEM, CPT_SYSTEM, cpt_to_records
+
+ICD10_CODES = {"Diseases of the Blood (D50–D89)": {"D50.9": "Iron deficiency anemia, unspecified", "D64.9": "Anemia, unspecified"}}
+CPT_CODES = {"Medicine": {"90686": "Influenza vaccine"}, "Surgery": {}}
+
+
+class CodeSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.icd10_path = os.path.join(self.directory, "icd10_codes.json")
+        self.cpt_path = os.path.join(self.directory, "cpt_codes.json")
+        self.snapshot_path = os.path.join(self.directory, "codes.snapshot")
+        with open(self.icd10_path, "w") as file:
+            json.dump(ICD10_CODES, file)
+        with open(self.cpt_path, "w") as file:
+            json.dump(cpt_to_records(CPT_CODES), file)
+        build_snapshot(self.snapshot_path, ICD10_CODES, CPT_CODES, snapshot_sources(self.icd10_path, self.cpt_path))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open(self):
+        snapshot = open_fresh_snapshot(self.snapshot_path)
+        if snapshot is not None:
+            self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_round_trip(self):
+        snapshot = self.open()
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(snapshot.code_sets(), (ICD10_CODES, CPT_CODES))
+        self.assertEqual(snapshot.lookup(ICD10_SYSTEM, "D64.9"), ("Diseases of the Blood (D50–D89)", "Anemia, unspecified"))
+        self.assertEqual(snapshot.lookup(CPT_SYSTEM, "90686"), ("Medicine", "Influenza vaccine"))
+        self.assertIsNone(snapshot.lookup(CPT_SYSTEM, "D64.9"))
+
+    def test_restored_index_matches_a_rebuilt_one(self):
+        restored = SearchIndex()
+        self.open().restore_index(restored)
+        rebuilt = SearchIndex()
+        rebuilt.rebuild(ICD10_CODES, CPT_CODES)
+        self.assertEqual(restored.entries, rebuilt.entries)
+        self.assertEqual(restored.postings, rebuilt.postings)
+        self.assertEqual(restored.search("anemia"), rebuilt.search("anemia"))
+
+    def test_touched_but_unchanged_source_stays_fresh(self):
+        stat = os.stat(self.icd10_path)
+        os.utime(self.icd10_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNotNone(self.open())
+
+    def test_edited_source_invalidates(self):
+        with open(self.icd10_path, "w") as file:
+            json.dump({"Other": {}}, file)
+        self.assertIsNone(self.open())
+
+    def test_journal_record_invalidates(self):
+        ChangeJournal(self.cpt_path).record({}, set_change(["Surgery", "27447"], "Total knee arthroplasty"))
+        self.assertIsNone(self.open())
+
+    def test_unreadable_snapshot_is_ignored(self):
+        with open(self.snapshot_path, "wb") as file:
+            file.write(b"not a snapshot")
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.open())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from PIL import Image
+    import image_cache
+    from image_cache import ThumbnailCache
+except ImportError:  # Pillow is optional outside the GUI
+    Image = None
+
+
+@unittest.skipIf(Image is None, "needs Pillow")
+class ThumbnailCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_directory = os.path.join(self.directory, "thumbnails")
+        self.source = self.image("logo.png", (400, 300), "red")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def image(self, name, size, color, mode="RGB"):
+        path = os.path.join(self.directory, name)
+        Image.new(mode, size, color).save(path)
+        return path
+
+    def cached_files(self):
+        return sorted(name for name in os.listdir(self.cache_directory) if name.endswith(".png"))
+
+    def test_first_call_scales_and_stores(self):
+        cache = ThumbnailCache(self.cache_directory, (150, 150))
+        key, image = cache.thumbnail(self.source)
+        self.assertEqual(image.size, (150, 150))
+        self.assertEqual(self.cached_files(), [key + ".png"])
+        self.assertIs(cache.thumbnail(self.source)[1], image)  # From memory
+
+    def test_second_instance_reads_from_disk(self):
+        key, _ = ThumbnailCache(self.cache_directory, (150, 150)).thumbnail(self.source)
+        cache = ThumbnailCache(self.cache_directory, (150, 150))
+        cache.render = self.fail  # Must not decode the source again
+        self.assertEqual(cache.thumbnail(self.source)[0], key)
+
+    def test_changed_source_or_size_gets_a_new_key(self):
+        cache = ThumbnailCache(self.cache_directory, (150, 150))
+        key = cache.key(self.source)
+        self.assertEqual(cache.key(self.source), key)
+        self.assertNotEqual(ThumbnailCache(self.cache_directory, (64, 64)).key(self.source), key)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertNotEqual(cache.key(self.source), key)
+
+    def test_palette_images_are_converted(self):
+        source = self.image("logo.gif", (40, 40), 3, mode="P")
+        _, image = ThumbnailCache(self.cache_directory, (20, 20)).thumbnail(source)
+        self.assertEqual(image.mode, "RGBA")
+
+    def test_prune_keeps_the_newest_files(self):
+        cache = ThumbnailCache(self.cache_directory, (10, 10))
+        limit = image_cache.THUMBNAIL_LIMIT
+        image_cache.THUMBNAIL_LIMIT = 3
+        self.addCleanup(setattr, image_cache, "THUMBNAIL_LIMIT", limit)
+        keys = []
+        for number in range(5):
+            path = self.image(f"logo{number}.png", (20, 20), "blue")
+            keys.append(cache.thumbnail(path)[0])
+            os.utime(os.path.join(self.cache_directory, keys[-1] + ".png"), (number, number))
+        cache.prune()
+        self.assertEqual(self.cached_files(), sorted(key + ".png" for key in keys[2:]))
+
+    def test_missing_source(self):
+        with self.assertRaises(FileNotFoundError):
+            ThumbnailCache(self.cache_directory, (10, 10)).thumbnail(os.path.join(self.directory, "gone.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+from io_executor import IOExecutor, IO_POLL_MS
+from journal import ChangeJournal, set_change
+
+
+class FakeWidget:
+    """Records after() calls instead of running a Tk event loop."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay_ms, callback):
+        self.scheduled.append((delay_ms, callback))
+        return len(self.scheduled)
+
+
+class IOExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.executor = IOExecutor()
+        self.release = threading.Event()
+        self.ran = []
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown()
+
+    def blocked(self, name):
+        """A job that waits for self.release, so later jobs for its key have to queue."""
+        started = threading.Event()
+
+        def job():
+            started.set()
+            self.release.wait(5)
+            self.ran.append(name)
+            return name
+        return job, started
+
+    def record(self, name):
+        self.ran.append(name)
+        return name
+
+    def finish(self):
+        self.release.set()
+        self.executor.shutdown()
+        self.executor.poll()
+
+    def test_waiting_job_is_replaced_by_a_newer_one(self):
+        results = []
+        job, started = self.blocked("first")
+        self.executor.submit("settings.json", job, callback=results.append)
+        self.assertTrue(started.wait(5))
+        self.executor.submit("settings.json", self.record, "second", callback=results.append)
+        self.executor.submit("settings.json", self.record, "third", callback=results.append)
+        self.assertEqual(self.executor.pending(), 2)
+        self.assertEqual(self.executor.coalesced, 1)
+        self.finish()
+        self.assertEqual(self.ran, ["first", "third"])
+        # The replaced job's callback still hears about the write that covered it
+        self.assertEqual(results, ["first", "third", "third"])
+        self.assertEqual(self.executor.pending(), 0)
+
+    def test_same_key_runs_in_order_and_other_keys_do_not_wait(self):
+        job, started = self.blocked("slow")
+        self.executor.submit("a.json", job)
+        self.assertTrue(started.wait(5))
+        other = threading.Event()
+        self.executor.submit("b.json", other.set)
+        self.assertTrue(other.wait(5))
+        self.executor.submit("a.json", self.record, "after slow")
+        self.finish()
+        self.assertEqual(self.ran, ["slow", "after slow"])
+
+    def test_none_key_never_coalesces(self):
+        job, started = self.blocked("blocked")
+        self.executor.submit(None, job)
+        self.assertTrue(started.wait(5))
+        self.executor.submit(None, self.record, "one")
+        self.executor.submit(None, self.record, "two")
+        self.finish()
+        self.assertEqual(sorted(self.ran), ["blocked", "one", "two"])
+        self.assertEqual(self.executor.coalesced, 0)
+
+    def test_errors_go_to_the_error_callback(self):
+        errors = []
+
+        def fail():
+            raise OSError("disk full")
+        with self.assertLogs(level="ERROR"):
+            self.executor.submit("a.json", fail, callback=self.fail, error=errors.append)
+            self.finish()
+        self.assertEqual([str(e) for e in errors], ["disk full"])
+
+    def test_callbacks_only_run_from_poll(self):
+        results = []
+        widget = FakeWidget()
+        changes = []
+        self.executor.attach(widget, changes.append)
+        job, started = self.blocked("done")
+        self.executor.submit("a.json", job, callback=results.append)
+        self.assertEqual(widget.scheduled[0][0], IO_POLL_MS)
+        self.assertEqual(changes, [1])
+        self.release.set()
+        self.executor.shutdown()
+        self.assertEqual(results, [])
+        widget.scheduled[0][1]()
+        self.assertEqual(results, ["done"])
+        self.assertEqual(changes, [1, 0])
+
+    def test_journal_writes_in_the_background(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "codes.json")
+        journal = ChangeJournal(path, executor=self.executor)
+        data = {}
+        journal.record(data, set_change(["A"], {}))
+        journal.compact(data, force=True)
+        journal.record(data, set_change(["B"], {}))
+        journal.record(data, set_change(["C"], {}))
+        self.finish()
+        with open(path) as file:
+            self.assertEqual(json.load(file), {"A": {}})
+        with open(journal.journal_path) as file:
+            self.assertEqual(len(file.readlines()), 2)
+        with open(path) as file:
+            self.assertEqual(ChangeJournal(path).replay(json.load(file)), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from journal import ChangeJournal, apply_change, set_change, delete_change
+from search_index import cpt_from_records, cpt_to_records
+
+CPT_RECORDS = {
+    "Surgery": [{"code": "27447", "description": "Total knee arthroplasty"}],
+    "Medicine": [{"code": "90686", "description": "Influenza vaccine"}],
+}
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "codes.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        with open(self.path, "w") as file:
+            json.dump(data, file)
+
+    def read(self):
+        with open(self.path) as file:
+            return json.load(file)
+
+    def journal_lines(self, journal):
+        with open(journal.journal_path) as file:
+            return file.readlines()
+
+    def test_apply_change(self):
+        data = {"A": {"A00": "Cholera"}}
+        apply_change(data, set_change(["B", "B01"], "Varicella"))
+        apply_change(data, delete_change(["A", "A00"]))
+        apply_change(data, delete_change(["A", "A00"]))  # Idempotent
+        self.assertEqual(data, {"A": {}, "B": {"B01": "Varicella"}})
+
+    def test_record_replay_and_compact(self):
+        self.write({"A": {"A00": "Cholera"}})
+        journal = ChangeJournal(self.path)
+        data = journal.replay(self.read())
+        journal.record(data, set_change(["A", "A01"], "Typhoid"))
+        journal.record(data, delete_change(["A", "A00"]), set_change(["A", "A02"], "Salmonella"))
+        self.assertEqual(len(self.journal_lines(journal)), 2)
+        self.assertEqual(self.read(), {"A": {"A00": "Cholera"}})  # Snapshot untouched until compaction
+
+        reopened = ChangeJournal(self.path)
+        self.assertEqual(reopened.replay(self.read()), data)
+        self.assertEqual(reopened.pending, 2)
+        reopened.compact(data)
+        self.assertEqual(self.read(), {"A": {"A01": "Typhoid", "A02": "Salmonella"}})
+        self.assertEqual(self.journal_lines(reopened), [])
+        self.assertEqual(ChangeJournal(self.path).replay(self.read()), data)
+
+    def test_compacts_every_n_records(self):
+        self.write({})
+        journal = ChangeJournal(self.path, compact_every=3)
+        data = journal.replay(self.read())
+        for number in range(4):
+            journal.record(data, set_change([f"C{number}"], {}))
+        self.assertEqual(self.read(), {"C0": {}, "C1": {}, "C2": {}})
+        self.assertEqual(len(self.journal_lines(journal)), 1)
+
+    def test_torn_last_record_is_dropped(self):
+        self.write({})
+        journal = ChangeJournal(self.path)
+        journal.record({}, set_change(["A"], {}))
+        with open(journal.journal_path, "a") as file:
+            file.write('[{"op": "set", "path": ["B"]')
+        with self.assertLogs(level="WARNING"):
+            data = ChangeJournal(self.path).replay(self.read())
+        self.assertEqual(data, {"A": {}})
+        self.assertEqual(len(self.journal_lines(journal)), 1)
+
+    def test_count_records(self):
+        self.write({})
+        journal = ChangeJournal(self.path)
+        self.assertEqual(journal.count_records(), 0)
+        journal.record({}, set_change(["A"], {}))
+        journal.record({}, set_change(["B"], {}))
+        self.assertEqual(ChangeJournal(self.path).count_records(), 2)
+
+    def test_cpt_list_format_round_trip(self):
+        self.write(CPT_RECORDS)
+        journal = ChangeJournal(self.path, encode=cpt_to_records)
+        codes = journal.replay(cpt_from_records(self.read()))
+        self.assertEqual(codes["Surgery"], {"27447": "Total knee arthroplasty"})
+        journal.record(codes, set_change(["Surgery", "27446"], "Partial knee arthroplasty"))
+        journal.record(codes, delete_change(["Medicine", "90686"]))
+
+        replayed = ChangeJournal(self.path, encode=cpt_to_records).replay(cpt_from_records(self.read()))
+        self.assertEqual(replayed, codes)
+        journal.compact(codes)
+        self.assertEqual(self.read(), {
+            "Surgery": [{"code": "27447", "description": "Total knee arthroplasty"},
+                        {"code": "27446", "description": "Partial knee arthroplasty"}],
+            "Medicine": [],
+        })
+        self.assertEqual(cpt_from_records(self.read()), codes)
+
+    def test_duplicate_cpt_records_keep_the_first(self):
+        records = {"Surgery": [{"code": "27447", "description": "first"}, {"code": "27447", "description": "second"}]}
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(cpt_from_records(records), {"Surgery": {"27447": "first"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+
+from log_setup import configure_logging, shutdown_logging, parse_level, read_error_log
+
+
+class LogSetupTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.directory, "app.log")
+        self.error_log = os.path.join(self.directory, "errors.jsonl")
+        root = logging.getLogger()
+        self.saved = (list(root.handlers), root.level)
+
+    def tearDown(self):
+        shutdown_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handlers, level = self.saved
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+        logging.getLogger("noisy").setLevel(logging.NOTSET)
+        shutil.rmtree(self.directory)
+
+    def configure(self, **config):
+        configure_logging(dict(LOG_FILE=self.log_file, ERROR_LOG_FILE=self.error_log, **config))
+
+    def read_lines(self, path):
+        with open(path, encoding="utf-8") as file:
+            return file.read().splitlines()
+
+    def test_records_reach_both_files_after_shutdown(self):
+        self.configure()
+        logging.info("loaded %d codes", 12)
+        logging.debug("not at INFO")
+        try:
+            raise KeyError("A00")
+        except KeyError:
+            logging.exception("lookup failed", extra={"solution": "Rebuild the index"})
+        shutdown_logging()
+
+        lines = self.read_lines(self.log_file)
+        self.assertTrue(lines[0].endswith("INFO - loaded 12 codes"))
+        self.assertTrue(lines[1].endswith("ERROR - lookup failed"))
+        self.assertNotIn("not at INFO", "\n".join(lines))
+
+        entries = list(read_error_log(self.error_log))
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["message"], "lookup failed")
+        self.assertEqual(entries[0]["level"], "ERROR")
+        self.assertEqual(entries[0]["solution"], "Rebuild the index")
+        self.assertIn("KeyError: 'A00'", entries[0]["traceback"])
+
+    def test_levels_from_config(self):
+        self.configure(LOG_LEVEL="debug", LOG_LEVELS={"noisy": "WARNING"})
+        logging.debug("root debug")
+        logging.getLogger("noisy").info("quiet please")
+        shutdown_logging()
+        text = "\n".join(self.read_lines(self.log_file))
+        self.assertIn("root debug", text)
+        self.assertNotIn("quiet please", text)
+
+    def test_reconfiguring_replaces_the_handlers(self):
+        self.configure()
+        self.configure()
+        self.assertEqual(len(logging.getLogger().handlers), 1)
+        logging.warning("once")
+        shutdown_logging()
+        self.assertEqual(len(self.read_lines(self.log_file)), 1)
+
+    def test_log_files_rotate(self):
+        self.configure(LOG_MAX_BYTES=200, LOG_BACKUPS=2)
+        for number in range(20):
+            logging.warning("line %d of a log that is long enough to rotate", number)
+        shutdown_logging()
+        self.assertTrue(os.path.exists(self.log_file + ".1"))
+        self.assertFalse(os.path.exists(self.log_file + ".3"))
+
+    def test_parse_level(self):
+        self.assertEqual(parse_level("warning"), logging.WARNING)
+        self.assertEqual(parse_level(15), 15)
+        with self.assertRaises(ValueError):
+            parse_level("loud")
+
+    def test_read_error_log_skips_bad_lines(self):
+        with open(self.error_log, "w") as file:
+            file.write(json.dumps({"message": "one"}) + "\n{torn\n" + json.dumps({"message": "two"}) + "\n")
+        self.assertEqual([entry["message"] for entry in read_error_log(self.error_log)], ["one", "two"])
+        self.assertEqual(list(read_error_log(os.path.join(self.directory, "missing.jsonl"))), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import unittest
+
+from perf_metrics import LatencyHistogram, MetricsRegistry, BUCKET_GROWTH
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def test_quantiles_are_within_a_bucket(self):
+        histogram = LatencyHistogram()
+        for millisecond in range(1, 1001):
+            histogram.observe(millisecond / 1000)
+        for q, exact in ((0.5, 0.5), (0.95, 0.95), (0.99, 0.99)):
+            estimate = histogram.quantile(q)
+            self.assertLess(abs(estimate - exact) / exact, BUCKET_GROWTH - 1, q)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.total, 500.5)
+        self.assertEqual(histogram.max, 1.0)
+
+    def test_edges(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        histogram.observe(0.0)
+        histogram.observe(10 ** 6)  # Past the last bucket
+        self.assertEqual(histogram.quantile(0.99), 10 ** 6)
+        self.assertLessEqual(histogram.quantile(0.5), histogram.max)
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+
+    def test_timed_records_every_call_even_on_error(self):
+        @self.metrics.timed("core.lookup")
+        def lookup(code):
+            if not code:
+                raise ValueError("empty")
+            return code
+
+        self.assertEqual(lookup("A00"), "A00")
+        with self.assertRaises(ValueError):
+            lookup("")
+        self.assertEqual(self.metrics.snapshot()["core.lookup"]["count"], 2)
+        self.assertEqual(lookup.__name__, "lookup")
+
+    def test_timed_defaults_to_the_qualified_name(self):
+        @self.metrics.timed()
+        def save():
+            pass
+        save()
+        self.assertEqual(list(self.metrics.snapshot()), [save.__qualname__])
+
+    def test_timer_and_snapshot(self):
+        with self.metrics.timer("search"):
+            pass
+        self.metrics.observe("search", 0.25)
+        summary = self.metrics.snapshot()["search"]
+        self.assertEqual(summary["count"], 2)
+        self.assertEqual(summary["max"], 0.25)
+        self.assertEqual(set(summary), {"count", "sum", "max", "p50", "p95", "p99"})
+        self.assertIn("search", json.loads(self.metrics.to_json())["metrics"])
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+
+    def test_prometheus_text(self):
+        self.metrics.observe('odd "name"', 0.5)
+        lines = self.metrics.to_prometheus().splitlines()
+        self.assertEqual(lines[1], "# TYPE icd10_explorer_duration_seconds summary")
+        self.assertIn('icd10_explorer_duration_seconds{operation="odd _name_",quantile="0.5"} 0.5', lines)
+        self.assertIn('icd10_explorer_duration_seconds_count{operation="odd _name_"} 1', lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
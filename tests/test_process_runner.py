@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import unittest
+
+from process_runner import ProcessRunner, STDOUT, STDERR, EXIT
+
+PYTHON = sys.executable
+
+
+def run_to_exit(runner, timeout=10):
+    """Collect events until EXIT; returns them in order."""
+    events = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        events.extend(runner.events())
+        if events and events[-1][0] == EXIT:
+            return events
+        time.sleep(0.01)
+    raise AssertionError(f"{runner.command} did not exit")
+
+
+class ProcessRunnerTest(unittest.TestCase):
+    def stopped(self, pid, timeout=5):
+        """True once pid has exited (a zombie nobody has reaped yet counts)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with open(f"/proc/{pid}/stat") as file:
+                    if file.read().rsplit(")", 1)[1].split()[0] == "Z":
+                        return True
+            except FileNotFoundError:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_streams_stdout_and_stderr(self):
+        runner = ProcessRunner([PYTHON, "-c", "import sys; print('one'); print('two', file=sys.stderr); print('three'); sys.exit(3)"]).start()
+        events = run_to_exit(runner)
+        self.assertEqual([value for name, value in events if name == STDOUT], ["one\n", "three\n"])
+        self.assertEqual([value for name, value in events if name == STDERR], ["two\n"])
+        self.assertEqual(events[-1], (EXIT, 3))
+        self.assertFalse(runner.running())
+        self.assertGreater(runner.elapsed(), 0)
+
+    def test_lines_arrive_while_the_process_runs(self):
+        runner = ProcessRunner([PYTHON, "-c", "import time; print('ready'); time.sleep(30)"]).start()
+        try:
+            deadline = time.monotonic() + 10
+            events = []
+            while not events and time.monotonic() < deadline:
+                events = runner.events()
+                time.sleep(0.01)
+            self.assertEqual(events, [(STDOUT, "ready\n")])
+            self.assertTrue(runner.running())
+        finally:
+            runner.kill()
+        self.assertEqual(run_to_exit(runner)[-1][0], EXIT)
+
+    def test_events_limit(self):
+        runner = ProcessRunner([PYTHON, "-c", "for n in range(5): print(n)"]).start()
+        while runner.running():
+            time.sleep(0.01)
+        self.assertEqual(len(runner.events(limit=2)), 2)
+        self.assertEqual(len(runner.events()), 4)
+
+    @unittest.skipUnless(os.path.isdir("/proc"), "process groups, signals and /proc")
+    def test_cancel_stops_the_whole_process_group(self):
+        # The child starts a grandchild; both must go
+        script = "import subprocess, sys, time; child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); print(child.pid, flush=True); time.sleep(30)"
+        runner = ProcessRunner([PYTHON, "-c", script]).start()
+        events = []
+        while not events:
+            events = runner.events()
+            time.sleep(0.01)
+        grandchild = int(events[0][1])
+        started = time.monotonic()
+        runner.cancel()
+        events = run_to_exit(runner)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(runner.cancelled)
+        self.assertLess(events[-1][1], 0)  # Killed by a signal
+        self.assertTrue(self.stopped(grandchild))
+
+    @unittest.skipUnless(os.name == "posix", "process groups and signals")
+    def test_kill_does_not_wait_for_the_grace_period(self):
+        runner = ProcessRunner([PYTHON, "-c", "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(30)"]).start()
+        while not runner.events():
+            time.sleep(0.01)
+        started = time.monotonic()
+        runner.kill()
+        self.assertEqual(run_to_exit(runner)[-1][1], -9)
+        self.assertLess(time.monotonic() - started, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import unittest
+
+from search_index import SearchIndex, ICD10_SYSTEM, CPT_SYSTEM
+from search_engine import SearchEngine, IncrementalSearch
+
+ICD10_CODES = {
+    "Diseases of the Blood (D50–D89)": {
+        "D50.0": "Iron deficiency anemia secondary to blood loss (chronic)",
+        "D50.9": "Iron deficiency anemia, unspecified",
+        "D64.9": "Anemia, unspecified",
+    },
+    "Endocrine, Nutritional and Metabolic Diseases (E00–E89)": {
+        "E11.9": "Type 2 diabetes mellitus without complications",
+    },
+}
+CPT_CODES = {
+    "Evaluation and Management (E/M)": {
+        "99213": "Office visit, established patient, low complexity",
+    },
+    "Pathology and Laboratory": {
+        "85025": "Complete blood count with automated differential",
+    },
+}
+
+
+def keys(results):
+    return [(result.system, result.code) for result in results]
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.rebuild(ICD10_CODES, CPT_CODES)
+
+    def test_code_prefix(self):
+        self.assertEqual(self.index.search("D50"), {(ICD10_SYSTEM, "D50.0"), (ICD10_SYSTEM, "D50.9")})
+        self.assertEqual(self.index.search("d50.9"), {(ICD10_SYSTEM, "D50.9")})
+
+    def test_every_word_must_prefix_match(self):
+        self.assertEqual(self.index.search("iron anem"), {(ICD10_SYSTEM, "D50.0"), (ICD10_SYSTEM, "D50.9")})
+        self.assertEqual(self.index.search("iron diabetes"), set())
+
+    def test_system_filter(self):
+        self.assertEqual(self.index.search("blood", CPT_SYSTEM), {(CPT_SYSTEM, "85025")})
+
+    def test_add_remove_and_sync(self):
+        version = self.index.version
+        self.index.add(ICD10_SYSTEM, "D51.0", "Diseases of the Blood (D50–D89)", "Vitamin B12 deficiency anemia")
+        self.assertIn((ICD10_SYSTEM, "D51.0"), self.index.search("vitamin"))
+        self.index.remove(ICD10_SYSTEM, "D51.0")
+        self.assertEqual(self.index.search("vitamin"), set())
+        self.assertNotIn("vitamin", self.index.vocabulary)
+        self.index.sync(CPT_SYSTEM, [("99213", "Evaluation and Management (E/M)", "Office visit")])
+        self.assertIsNone(self.index.get(CPT_SYSTEM, "85025"))
+        self.assertEqual(self.index.get(CPT_SYSTEM, "99213"), ("Evaluation and Management (E/M)", "Office visit"))
+        self.assertGreater(self.index.version, version)
+
+
+class SearchEngineTest(unittest.TestCase):
+    def setUp(self):
+        index = SearchIndex()
+        index.rebuild(ICD10_CODES, CPT_CODES)
+        self.engine = SearchEngine(index)
+
+    def test_exact_code_ranks_first(self):
+        results = self.engine.search("D50.9")
+        self.assertEqual(keys(results)[0], (ICD10_SYSTEM, "D50.9"))
+
+    def test_bm25_prefers_shorter_description(self):
+        # "anemia" is in three descriptions; the shortest one scores highest
+        results = self.engine.search("anemia")
+        self.assertEqual(keys(results)[0], (ICD10_SYSTEM, "D64.9"))
+        self.assertEqual(len(results), 3)
+        self.assertEqual([result.score for result in results], sorted((result.score for result in results), reverse=True))
+
+    def test_limit_and_systems(self):
+        self.assertEqual(len(self.engine.search("anemia", limit=2)), 2)
+        self.assertEqual(keys(self.engine.search("blood", systems=(CPT_SYSTEM,))), [(CPT_SYSTEM, "85025")])
+
+    def test_within(self):
+        results = self.engine.search("iron", within={(ICD10_SYSTEM, "D50.9")})
+        self.assertEqual(keys(results), [(ICD10_SYSTEM, "D50.9")])
+
+    def test_fuzzy_matches_a_typo(self):
+        self.assertEqual(self.engine.search("diabtes"), [])
+        self.assertEqual(keys(self.engine.search("diabtes", fuzzy=True)), [(ICD10_SYSTEM, "E11.9")])
+
+
+class IncrementalSearchTest(unittest.TestCase):
+    def setUp(self):
+        index = SearchIndex()
+        index.rebuild(ICD10_CODES, CPT_CODES)
+        self.engine = SearchEngine(index)
+        self.search = IncrementalSearch(self.engine)
+
+    def test_narrowing_matches_a_full_search(self):
+        for query in ("a", "an", "ane", "anemia", "anemia u", "anemia unspec"):
+            self.assertEqual(self.search.search(query), self.engine.search(query), query)
+        self.assertEqual(self.search.last_query, "anemia unspec")
+        self.assertEqual(self.search.last_candidates, {(ICD10_SYSTEM, "D50.9"), (ICD10_SYSTEM, "D64.9")})
+
+    def test_narrows_from_the_previous_candidates(self):
+        self.search.search("iron")
+        # A code the previous query did not match can't come back while narrowing
+        self.search.last_candidates = {(ICD10_SYSTEM, "D50.9")}
+        self.assertEqual(keys(self.search.search("iron d")), [(ICD10_SYSTEM, "D50.9")])
+
+    def test_index_change_falls_back_to_a_full_search(self):
+        self.search.search("iron")
+        self.engine.index.add(ICD10_SYSTEM, "D50.8", "Diseases of the Blood (D50–D89)", "Other iron deficiency anemias")
+        self.assertIn((ICD10_SYSTEM, "D50.8"), keys(self.search.search("iron d")))
+
+    def test_cancelled(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        self.assertIsNone(self.search.search("anemia", cancelled=cancelled))
+
+
+if __name__ == "__main__":
+    unittest.main()
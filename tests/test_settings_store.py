@@ -0,0 +1,122 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from io_executor import IOExecutor
+from settings_store import SettingsStore, SETTINGS_FLUSH_MS
+
+DEFAULTS = {"theme": "light", "font_size": 12}
+
+
+class FakeWidget:
+    """after()/after_cancel() bookkeeping without a Tk event loop."""
+
+    def __init__(self):
+        self.scheduled = {}
+        self.last_id = 0
+
+    def after(self, delay_ms, callback):
+        self.last_id += 1
+        self.scheduled[self.last_id] = (delay_ms, callback)
+        return self.last_id
+
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+
+    def run_scheduled(self):
+        scheduled, self.scheduled = self.scheduled, {}
+        for _, callback in scheduled.values():
+            callback()
+
+
+class SettingsStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "settings", "settings.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self):
+        with open(self.path) as file:
+            return json.load(file)
+
+    def open(self):
+        with self.assertLogs(level="ERROR"):  # The file doesn't exist yet
+            return SettingsStore(self.path, DEFAULTS)
+
+    def test_missing_file_gets_the_defaults(self):
+        settings = self.open()
+        self.assertEqual(self.read(), DEFAULTS)
+        self.assertEqual(settings["theme"], "light")
+        self.assertEqual(settings.get("missing", 1), 1)
+        self.assertEqual(SettingsStore(self.path, {}).values, DEFAULTS)
+
+    def test_unreadable_file_gets_the_defaults(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as file:
+            file.write("{not json")
+        self.open()
+        self.assertEqual(self.read(), DEFAULTS)
+
+    def test_without_a_widget_changes_are_written_at_once(self):
+        settings = self.open()
+        settings["theme"] = "dark"
+        self.assertEqual(self.read()["theme"], "dark")
+        os.remove(self.path)
+        settings.set("theme", "dark")  # Unchanged, so nothing to write
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_flush_is_debounced_into_one_atomic_write(self):
+        settings = self.open()
+        widget = FakeWidget()
+        settings.attach(widget)
+        settings["theme"] = "dark"
+        settings["font_size"] = 14
+        settings.update({"font_size": 16, "language": "en"})
+        self.assertEqual(len(widget.scheduled), 1)  # Each change replaced the pending flush
+        self.assertEqual(next(iter(widget.scheduled.values()))[0], SETTINGS_FLUSH_MS)
+        self.assertEqual(self.read(), DEFAULTS)
+        self.assertEqual(settings.dirty, {"theme", "font_size", "language"})
+
+        widget.run_scheduled()
+        self.assertEqual(self.read(), {"theme": "dark", "font_size": 16, "language": "en"})
+        self.assertEqual(settings.dirty, set())
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["settings.json"])  # No temp file left
+
+    def test_flush_now_cancels_the_pending_flush(self):
+        settings = self.open()
+        widget = FakeWidget()
+        settings.attach(widget)
+        settings["theme"] = "dark"
+        settings.flush()
+        self.assertEqual(widget.scheduled, {})
+        self.assertEqual(self.read()["theme"], "dark")
+
+    def test_write_runs_on_the_executor(self):
+        settings = self.open()
+        executor = IOExecutor()
+        settings.attach(FakeWidget(), executor)
+        settings["theme"] = "dark"
+        settings.flush()
+        executor.shutdown()
+        self.assertEqual(self.read()["theme"], "dark")
+
+    def test_subscribers(self):
+        settings = self.open()
+        seen = []
+        settings.subscribe("theme", seen.append)
+        settings.subscribe("theme", lambda value: 1 / 0)
+        with self.assertLogs(level="ERROR"):
+            settings["theme"] = "dark"
+        settings["font_size"] = 14
+        settings.unsubscribe("theme", seen.append)
+        with self.assertLogs(level="ERROR"):
+            settings["theme"] = "light"
+        self.assertEqual(seen, ["dark"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+from io_executor import IOExecutor
+from journal import set_change, delete_change
+from search_index import ICD10_SYSTEM, CPT_SYSTEM
+from sqlite_store import SQLiteCodeStore, SQLiteTable, ICD10_DATASET, CPT_DATASET, USERS_DATASET
+
+ICD10_CODES = {
+    "Diseases of the Blood (D50–D89)": {
+        "D50.0": "Iron deficiency anemia secondary to blood loss (chronic)",
+        "D50.9": "Iron deficiency anemia, unspecified",
+        "D64.9": "Anemia, unspecified",
+    },
+    "Diseases of the Digestive System (K00–K95)": {
+        "k29.4": "Chronic atrophic gastritis",  # Stored in lower case, as in the bundled data
+        "K21.9": "Gastro-esophageal reflux disease without esophagitis",
+    },
+}
+CPT_CODES = {
+    "Pathology and Laboratory": {
+        "85025": "Complete blood count with automated differential",
+    },
+    "Evaluation and Management (E/M)": {
+        "99213": "Office visit, established patient, low complexity",
+    },
+}
+USERS = {
+    "admin": {"password": "x", "role": "admin"},
+    "coder": {"password": "y", "role": "user"},
+}
+
+
+def keys(results):
+    return [(result.system, result.code) for result in results]
+
+
+class SQLiteCodeStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SQLiteCodeStore(os.path.join(self.directory, "codes.db"))
+        with self.assertLogs(level="INFO"):
+            self.store.import_json(ICD10_CODES, CPT_CODES, USERS)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_import_round_trip(self):
+        self.assertEqual(self.store.load(ICD10_DATASET), ICD10_CODES)
+        self.assertEqual(list(self.store.load(CPT_DATASET)), list(CPT_CODES))  # Category order is kept
+        self.assertEqual(self.store.load(CPT_DATASET), CPT_CODES)
+        self.assertEqual(self.store.load(USERS_DATASET), USERS)
+
+    def test_is_empty(self):
+        self.assertFalse(self.store.is_empty())
+        empty = SQLiteCodeStore(os.path.join(self.directory, "empty.db"))
+        self.assertTrue(empty.is_empty())
+        empty.close()
+
+    def test_reopen(self):
+        self.store.close()
+        self.store = SQLiteCodeStore(self.store.path)
+        self.assertEqual(self.store.load(ICD10_DATASET), ICD10_CODES)
+
+    def test_lookup(self):
+        self.assertEqual(self.store.lookup(ICD10_SYSTEM, "D64.9"), [("Diseases of the Blood (D50–D89)", "Anemia, unspecified")])
+        self.assertEqual(self.store.lookup(ICD10_SYSTEM, "k29.4")[0][1], "Chronic atrophic gastritis")
+        self.assertEqual(self.store.lookup(CPT_SYSTEM, "D64.9"), [])
+
+    def test_search_exact_code_first(self):
+        results = self.store.search("D50.9")
+        self.assertEqual(keys(results)[0], (ICD10_SYSTEM, "D50.9"))
+        self.assertEqual(results[0].category, "Diseases of the Blood (D50–D89)")
+
+    def test_search_code_prefix(self):
+        self.assertEqual(set(keys(self.store.search("D50"))), {(ICD10_SYSTEM, "D50.0"), (ICD10_SYSTEM, "D50.9")})
+
+    def test_search_code_ignores_case(self):
+        self.assertEqual(keys(self.store.search("K29"))[0], (ICD10_SYSTEM, "k29.4"))
+        self.assertEqual(keys(self.store.search("k29.4"))[0], (ICD10_SYSTEM, "k29.4"))
+        self.assertEqual(keys(self.store.search("d64.9"))[0], (ICD10_SYSTEM, "D64.9"))
+
+    def test_search_words(self):
+        results = self.store.search("anemia unspecified")
+        self.assertEqual(set(keys(results)), {(ICD10_SYSTEM, "D50.9"), (ICD10_SYSTEM, "D64.9")})
+        self.assertTrue(all(result.score > 0 for result in results))
+
+    def test_search_word_prefix(self):
+        self.assertEqual(set(keys(self.store.search("gastr"))), {(ICD10_SYSTEM, "k29.4"), (ICD10_SYSTEM, "K21.9")})
+
+    def test_search_ranking(self):
+        # The shorter description matches "anemia" more strongly under bm25
+        self.assertEqual(keys(self.store.search("anemia"))[0], (ICD10_SYSTEM, "D64.9"))
+
+    def test_search_system_and_limit(self):
+        self.assertEqual(keys(self.store.search("blood", CPT_SYSTEM)), [(CPT_SYSTEM, "85025")])
+        self.assertEqual(len(self.store.search("anemia", limit=2)), 2)
+        self.assertEqual(self.store.search("   "), [])
+        self.assertEqual(self.store.search("nothing like this"), [])
+
+    def test_apply_code_changes(self):
+        category = "Diseases of the Blood (D50–D89)"
+        self.store.apply(ICD10_DATASET, [
+            set_change([category, "D50.9"], "Iron deficiency anemia"),
+            set_change([category, "D51.0"], "Vitamin B12 deficiency anemia"),
+            delete_change([category, "D64.9"]),
+            set_change(["New Category"], {"Z00.0": "General adult medical examination"}),
+        ])
+        data = self.store.load(ICD10_DATASET)
+        self.assertEqual(list(data[category].items()), [
+            ("D50.0", "Iron deficiency anemia secondary to blood loss (chronic)"),
+            ("D50.9", "Iron deficiency anemia"),
+            ("D51.0", "Vitamin B12 deficiency anemia"),
+        ])
+        self.assertEqual(list(data)[-1], "New Category")
+        # The FTS table follows the triggers
+        self.assertIn((ICD10_SYSTEM, "D51.0"), keys(self.store.search("vitamin")))
+        self.assertNotIn((ICD10_SYSTEM, "D64.9"), keys(self.store.search("anemia")))
+        self.assertNotIn((ICD10_SYSTEM, "D50.9"), keys(self.store.search("unspecified")))
+
+        self.store.apply(ICD10_DATASET, [delete_change(["New Category"])])
+        self.assertNotIn("New Category", self.store.load(ICD10_DATASET))
+        self.assertEqual(self.store.search("examination"), [])
+
+    def test_apply_user_changes(self):
+        self.store.apply(USERS_DATASET, [
+            set_change(["coder", "role"], "admin"),
+            set_change(["guest"], {"password": "z", "role": "user"}),
+            delete_change(["admin"]),
+        ])
+        self.assertEqual(self.store.load(USERS_DATASET), {
+            "coder": {"password": "y", "role": "admin"},
+            "guest": {"password": "z", "role": "user"},
+        })
+
+    def test_replace(self):
+        self.store.replace(CPT_DATASET, {"Surgery": {"27447": "Total knee arthroplasty"}})
+        self.assertEqual(self.store.load(CPT_DATASET), {"Surgery": {"27447": "Total knee arthroplasty"}})
+        self.assertEqual(self.store.search("blood", CPT_SYSTEM), [])
+        self.assertEqual(self.store.load(ICD10_DATASET), ICD10_CODES)
+
+    def test_export_json(self):
+        path = os.path.join(self.directory, "cpt.json")
+        self.store.export_json(CPT_DATASET, path)
+        with open(path) as file:
+            records = json.load(file)
+        self.assertEqual(records["Pathology and Laboratory"],
+                         [{"code": "85025", "description": "Complete blood count with automated differential"}])
+
+
+class SQLiteTableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SQLiteCodeStore(os.path.join(self.directory, "codes.db"))
+        self.store.replace(CPT_DATASET, CPT_CODES)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_record_writes_through(self):
+        table = SQLiteTable(self.store, CPT_DATASET)
+        data = table.replay(self.store.load(CPT_DATASET))
+        table.record(data, set_change(["Surgery", "27447"], "Total knee arthroplasty"))
+        self.assertEqual(data["Surgery"], {"27447": "Total knee arthroplasty"})
+        self.assertEqual(self.store.load(CPT_DATASET), data)
+
+    def test_recorded_values_are_copied(self):
+        table = SQLiteTable(self.store, CPT_DATASET)
+        value = {"27447": "Total knee arthroplasty"}
+        executor = IOExecutor()
+        table.executor = executor
+        release = threading.Event()
+        executor.submit((self.store.path, CPT_DATASET), release.wait)
+        table.record({}, set_change(["Surgery"], value))
+        value["27447"] = "Edited afterwards"
+        release.set()
+        executor.shutdown()
+        self.assertEqual(self.store.load(CPT_DATASET)["Surgery"], {"27447": "Total knee arthroplasty"})
+
+    def test_executor_keeps_order(self):
+        executor = IOExecutor()
+        table = SQLiteTable(self.store, CPT_DATASET, executor)
+        data = self.store.load(CPT_DATASET)
+        for number in range(20):
+            table.record(data, set_change(["Surgery", "27447"], f"Version {number}"))
+        table.record(data, set_change(["Surgery", "27130"], "Total hip arthroplasty"))
+        executor.shutdown()
+        self.assertEqual(self.store.load(CPT_DATASET), data)
+        self.assertEqual(data["Surgery"]["27447"], "Version 19")
+
+    def test_replace_drops_waiting_changes(self):
+        executor = IOExecutor()
+        table = SQLiteTable(self.store, CPT_DATASET, executor)
+        release = threading.Event()
+        executor.submit((self.store.path, CPT_DATASET), release.wait)
+        data = self.store.load(CPT_DATASET)
+        table.record(data, set_change(["Surgery", "27447"], "Total knee arthroplasty"))
+        table.compact(data)  # Not forced: nothing to do
+        self.assertEqual(len(table.waiting), 1)
+        table.compact(data, force=True)
+        self.assertEqual(table.waiting, [("replace", data)])
+        release.set()
+        executor.shutdown()
+        self.assertEqual(self.store.load(CPT_DATASET), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+from tkinter import ttk
+
+from perf_metrics import timed
+
+PLACEHOLDER_TEXT = "Loading..."
+VIRTUAL_TREE_HEIGHT = 20
+WHEEL_STEP = 3
+
+
+class LazyCodeTree:
+    """View model for a category/code Treeview.
+
+    Only the category rows are inserted up front. Each non-empty category gets
+    a placeholder child so Tk still draws its expand arrow, and the real code
+    rows are inserted the first time the category is opened.
+
+    The model keeps category -> item id and code -> item id maps (and the
+    reverse), so an edit is applied as one targeted insert, update or delete
+    instead of rebuilding the tree, and a selected row's code never has to be
+    parsed back out of its text; open categories and the scroll position are
+    left untouched.
+    Mutators take the code set that was changed and ignore changes to a code
+    set that is not the one being shown.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.codes = None
+        self.categories = {}  # category item id -> category name
+        self.category_items = {}  # category name -> category item id
+        self.code_items = {}  # code -> code item id (loaded categories only)
+        self.item_codes = {}  # code item id -> code
+        self.placeholders = {}  # category item id -> placeholder item id
+        tree.bind("<<TreeviewOpen>>", self.on_open, add="+")
+
+    @timed("tree.populate")
+    def populate(self, codes):
+        tree = self.tree
+        tree.delete(*tree.get_children())
+        self.codes = codes
+        self.categories = {}
+        self.category_items = {}
+        self.code_items = {}
+        self.item_codes = {}
+        self.placeholders = {}
+        for category, category_codes in codes.items():
+            self._insert_category(category, category_codes)
+
+    def on_open(self, event=None):
+        self.load_children(self.tree.focus())
+
+    @timed("tree.load_children")
+    def load_children(self, item):
+        """Replace a category's placeholder with its code rows."""
+        placeholder = self.placeholders.pop(item, None)
+        if placeholder is None:
+            return
+        self.tree.delete(placeholder)
+        for code, description in self.codes[self.categories[item]].items():
+            self._insert_code(item, code, description)
+
+    def showing(self, codes):
+        return codes is self.codes
+
+    def code_of(self, item):
+        """Return the code shown by a row, or None for a category row."""
+        return self.item_codes.get(item)
+
+    def category_of(self, item):
+        """Return the category shown by a row, or None for a code row."""
+        return self.categories.get(item)
+
+    def insert_category(self, codes, category):
+        if self.showing(codes) and category not in self.category_items:
+            self._insert_category(category, codes[category])
+
+    def delete_category(self, codes, category):
+        if not self.showing(codes):
+            return
+        item = self.category_items.pop(category, None)
+        if item is None:
+            return
+        del self.categories[item]
+        self.placeholders.pop(item, None)
+        for child in self.tree.get_children(item):
+            code = self.item_codes.pop(child, None)
+            if code is not None:
+                del self.code_items[code]
+        self.tree.delete(item)
+
+    def insert_code(self, codes, category, code, description):
+        """Show a new (or overwritten) code under category."""
+        if not self.showing(codes):
+            return
+        if code in self.code_items:
+            self.update_code(codes, code, code, description)
+            return
+        parent = self.category_items.get(category)
+        if parent is None:
+            parent = self._insert_category(category, codes[category])
+        elif parent in self.placeholders:
+            return  # Not loaded yet; the code appears when the category opens
+        self._insert_code(parent, code, description)
+
+    def update_code(self, codes, old_code, code, description):
+        if not self.showing(codes):
+            return
+        item = self.code_items.pop(old_code, None)
+        if item is None:
+            return
+        self.tree.item(item, text=f"{code}: {description}")
+        self.code_items[code] = item
+        self.item_codes[item] = code
+
+    def delete_code(self, codes, code):
+        if not self.showing(codes):
+            return
+        item = self.code_items.pop(code, None)
+        if item is not None:
+            del self.item_codes[item]
+            self.tree.delete(item)
+
+    def _insert_code(self, parent, code, description):
+        item = self.tree.insert(parent, 'end', text=f"{code}: {description}")
+        self.code_items[code] = item
+        self.item_codes[item] = code
+
+    def _insert_category(self, category, category_codes):
+        parent = self.tree.insert('', 'end', text=category, open=False)
+        self.categories[parent] = category
+        self.category_items[category] = parent
+        if category_codes:
+            self.placeholders[parent] = self.tree.insert(parent, 'end', text=PLACEHOLDER_TEXT)
+        return parent
+
+
+class VirtualTreeview(ttk.Frame):
+    """Flat, headings-only Treeview that renders just the visible window of rows.
+
+    Rows are kept in a Python list and the Treeview only ever holds `height`
+    items, whose values are swapped as the user scrolls. Opening a table of
+    70k codes therefore costs the same number of Tk calls as one of 20.
+    """
+
+    def __init__(self, master, columns, height=VIRTUAL_TREE_HEIGHT):
+        super().__init__(master)
+        self.rows = []
+        self.first = 0
+        self.height = height
+        self.selected_index = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height, selectmode="browse")
+        for column in columns:
+            self.tree.heading(column, text=column)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scroll)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.first - WHEEL_STEP))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.first + WHEEL_STEP))
+        self.tree.bind("<Up>", lambda event: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self.move_selection(1))
+
+    def set_rows(self, rows):
+        self.rows = list(rows)
+        self.selected_index = None
+        self.scroll_to(0)
+
+    def append(self, row):
+        """Add a row and scroll so it is visible."""
+        self.rows.append(row)
+        self.scroll_to(len(self.rows))
+
+    def selected_row(self):
+        if self.selected_index is None or self.selected_index >= len(self.rows):
+            return None
+        return self.rows[self.selected_index]
+
+    def scroll_to(self, first):
+        self.first = max(0, min(first, len(self.rows) - self.height))
+        self.render()
+
+    def render(self):
+        window = self.rows[self.first:self.first + self.height]
+        items = self.tree.get_children()
+        for position, values in enumerate(window):
+            if position < len(items):
+                self.tree.item(items[position], values=values)
+            else:
+                self.tree.insert('', 'end', values=values)
+        if len(items) > len(window):
+            self.tree.delete(*items[len(window):])
+
+        # The selection belongs to a row, not to the recycled Tk item
+        items = self.tree.get_children()
+        position = None if self.selected_index is None else self.selected_index - self.first
+        if position is not None and 0 <= position < len(items):
+            if self.tree.selection() != (items[position],):
+                self.tree.selection_set(items[position])
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.first / total, (self.first + len(window)) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.selected_index = self.first + self.tree.index(selection[0])
+
+    def on_scroll(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * len(self.rows)))
+        elif action == "scroll":
+            step = self.height if args[1] == "pages" else 1
+            self.scroll_to(self.first + int(args[0]) * step)
+
+    def on_mousewheel(self, event):
+        self.scroll_to(self.first - WHEEL_STEP if event.delta > 0 else self.first + WHEEL_STEP)
+
+    def move_selection(self, offset):
+        """Arrow keys move through all rows, scrolling at the window edges."""
+        if not self.rows:
+            return "break"
+        index = 0 if self.selected_index is None else self.selected_index + offset
+        self.selected_index = max(0, min(index, len(self.rows) - 1))
+        if self.selected_index < self.first:
+            self.scroll_to(self.selected_index)
+        elif self.selected_index >= self.first + self.height:
+            self.scroll_to(self.selected_index - self.height + 1)
+        else:
+            self.render()
+        return "break"